@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import sys
 import os
 
@@ -6,9 +7,13 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
 try:
-    from risk_analyser import load_data, analyze_k_anonymity, QUASI_IDENTIFIERS
+    from risk_analyser import load_data, iter_data, QUASI_IDENTIFIERS
+    from hierarchies import compile_hierarchies, IntervalHierarchy
+    from artefact_store import save_dataset
+    from tracing import span
+    from parallel import SharedArrays, SHARED, use_workers, generalize_codes, equivalence_class_stats
 except ImportError:
-    sys.exit("❌ Error: risk_analyser.py not found")
+    sys.exit("❌ Error: risk_analyser.py / hierarchies.py not found")
 
 # CONFIGURATION
 SENSITIVE_ATTRIBUTE = "income"
@@ -16,64 +21,297 @@ SENSITIVE_ATTRIBUTE = "income"
 INTERMEDIATE_PATH = os.path.join(current_dir, "../data/adult_anonymized_intermediate.csv")
 # Final file (Generalized AND Suppressed - safe)
 FINAL_PATH = os.path.join(current_dir, "../data/adult_anonymized.csv")
+# Columnar copies ("parquet" / "feather", need pyarrow) read by the visualisers; "csv" to disable
+STORE_FORMAT = "parquet"
+EXPORT_CSV = True
+# "full-domain" (one hierarchy level per QI for every row) or "mondrian" (multidimensional partitioning)
+ANONYMIZATION_MODE = "full-domain"
+MONDRIAN_K = 5
+MONDRIAN_L = 2
+MONDRIAN_WORKERS = os.cpu_count() or 1
+# Processes for full-domain generalization and the class statistics (see parallel.py)
+WORKERS = 1
+# Streaming (full-domain mode only): read the raw file in chunks, memory bounded by chunk size + classes
+STREAMING = False
+STREAM_CHUNK_SIZE = 500_000
 
 # --- GENERALIZATION LOGIC ---
-def generalize_age_group(age):
-    age = int(age)
-    if age < 30: return "<30"
-    elif age < 50: return "30-49"
-    elif age < 70: return "50-69"
-    else: return "70+"
-
-def anonymize_dataset(df):
+# Level applied to each QI, as defined in hierarchies.HIERARCHIES (0 = raw)
+GENERALIZATION_LEVELS = {
+    "age": 2,             # <30 / 30-49 / 50-69 / 70+
+    "native-country": 1,  # US / Non-US
+    "marital-status": 2,  # Married / Single
+    "race": 1,            # White / Other
+    "sex": 1,             # Person
+}
+
+def anonymize_dataset(df, levels=GENERALIZATION_LEVELS, registry=None, verbose=True, workers=1):
+    df_anon = df.copy()
+    with span("generalize.encode", rows_in=len(df_anon)):
+        compiled = compile_hierarchies(df_anon, list(levels), registry)
+    # With workers, the level codes of all QIs are computed by a process pool over row ranges
+    codes = None
+    if use_workers(len(df_anon), workers):
+        with span("generalize.workers", rows_in=len(df_anon), workers=workers):
+            codes = generalize_codes(compiled, levels, workers)
+    for j, (qi, level) in enumerate(levels.items()):
+        if verbose: print(f"   🔹 Generalizing {qi} (level {level})...")
+        with span(f"generalize.{qi}", rows_in=len(df_anon), level=level):
+            if codes is None:
+                df_anon[qi] = compiled[qi].generalize(level)
+            else:
+                df_anon[qi] = pd.Categorical.from_codes(codes[:, j], categories=compiled[qi].labels[level])
+    return df_anon
+
+# --- MONDRIAN LOGIC ---
+# Rows are never copied: every partition is a contiguous range [lo, hi) of one
+# permutation array ("order") of row indices, reordered in place at each cut.
+# Each QI is encoded to ordinal codes; categorical values are ordered by their
+# ancestors in the hierarchy, so every subtree of the hierarchy is a code range.
+
+def _ordinal_codes(compiled):
+    """Ordinal code of every row plus the ordinal -> raw slot table (missing = last slot)."""
+    n_slots = len(compiled.uniques) + 1
+    slots = compiled.codes % n_slots
+    if isinstance(compiled.hierarchy, IntervalHierarchy):
+        return slots, np.arange(n_slots)
+    keys = [np.arange(n_slots)] + [compiled.maps[lvl] for lvl in range(1, compiled.height + 1)]
+    slot_order = np.lexsort(keys)
+    rank = np.empty(n_slots, dtype=np.int64)
+    rank[slot_order] = np.arange(n_slots)
+    return rank[slots], slot_order
+
+def _n_distinct(values, n_values):
+    return np.count_nonzero(np.bincount(values, minlength=n_values))
+
+def _find_cut(codes, sensitive, idx, cards, k, l, n_values):
+    """Median cut of the partition idx on its widest QI. Returns the mask of the left half or None."""
+    part = codes[idx]
+    low, high = part.min(axis=0), part.max(axis=0)
+    widths = (high - low) / np.maximum(cards - 1, 1)
+    for dim in np.argsort(-widths, kind='stable'):
+        if high[dim] == low[dim]: break
+        col = part[:, dim]
+        cum = np.cumsum(np.bincount(col - low[dim]))
+        cut = int(np.searchsorted(cum, len(idx) / 2))
+        if cum[cut] == len(idx): cut -= 1
+        n_left = int(cum[cut])
+        if n_left < k or len(idx) - n_left < k: continue
+        left = col <= low[dim] + cut
+        if l and (_n_distinct(sensitive[idx[left]], n_values) < l or _n_distinct(sensitive[idx[~left]], n_values) < l):
+            continue
+        return left
+    return None
+
+def _partition(codes, sensitive, order, cards, lo, hi, k, l, n_values, defer_below=0):
+    """Splits [lo, hi) until no cut is allowable. Ranges smaller than defer_below are returned unsplit."""
+    leaves, deferred = [], []
+    stack = [(lo, hi)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < defer_below:
+            deferred.append((a, b))
+            continue
+        idx = order[a:b]
+        left = _find_cut(codes, sensitive, idx, cards, k, l, n_values)
+        if left is None:
+            leaves.append((a, b))
+            continue
+        n_left = int(np.count_nonzero(left))
+        order[a:b] = np.concatenate((idx[left], idx[~left]))
+        stack.append((a + n_left, b))
+        stack.append((a, a + n_left))
+    return leaves, deferred
+
+def _partition_subtree(lo, hi, cards, k, l, n_values):
+    codes, sensitive, order = (SHARED[name][1] for name in ("codes", "sensitive", "order"))
+    leaves, _ = _partition(codes, sensitive, order, cards, lo, hi, k, l, n_values)
+    return leaves
+
+def _partition_parallel(codes, sensitive, cards, k, l, n_values, workers):
+    """Splits the top of the tree in-process, then the independent subtrees on a process pool."""
+    with SharedArrays() as shared:
+        codes = shared.add("codes", codes)
+        sensitive = shared.add("sensitive", sensitive)
+        order = shared.add("order", np.arange(len(codes)))
+        leaves, deferred = _partition(codes, sensitive, order, cards, 0, len(codes), k, l, n_values,
+                                      defer_below=len(codes) // (workers * 4) + 1)
+        with shared.pool(workers) as pool:
+            futures = [pool.submit(_partition_subtree, a, b, cards, k, l, n_values) for a, b in deferred]
+            for future in futures:
+                leaves.extend(future.result())
+        return leaves, order.copy()
+
+def _summaries(compiled, slot_of, low, high):
+    """Label of every (min, max) ordinal pair: a value range for numeric QIs, the lowest common ancestor otherwise."""
+    values = list(compiled.uniques) + [np.nan]
+    labels = []
+    for a, b in zip(slot_of[low], slot_of[high]):
+        if isinstance(compiled.hierarchy, IntervalHierarchy):
+            labels.append(str(values[a]) if a == b else f"{values[a]}-{values[b]}")
+            continue
+        for level in range(compiled.height + 1):
+            if compiled.maps[level][a] == compiled.maps[level][b]:
+                labels.append(str(values[a]) if level == 0 else compiled.labels[level][compiled.maps[level][a]])
+                break
+    return labels
+
+def mondrian_anonymize(df, qi_list, sensitive_col, k=MONDRIAN_K, l=MONDRIAN_L, workers=1, registry=None):
+    """Mondrian multidimensional partitioning: median cuts on the QIs while both halves stay k-anonymous and l-diverse."""
     df_anon = df.copy()
-    print("   🔹 Generalizing Age...")
-    df_anon['age'] = df_anon['age'].apply(generalize_age_group)
-    print("   🔹 Generalizing Native Country...")
-    df_anon['native-country'] = df_anon['native-country'].apply(lambda x: "US" if str(x).strip() == "United-States" else "Non-US")
-    print("   🔹 Generalizing Marital Status...")
-    df_anon['marital-status'] = df_anon['marital-status'].apply(lambda x: "Married" if str(x).strip().startswith("Married") else "Single")
-    print("   🔹 Generalizing Race...")
-    df_anon['race'] = df_anon['race'].apply(lambda x: "White" if str(x).strip() == "White" else "Other")
-    print("   🔹 Masking Sex...")
-    df_anon['sex'] = "Person"
+    compiled = compile_hierarchies(df_anon, qi_list, registry)
+    ordinals = [_ordinal_codes(compiled[qi]) for qi in qi_list]
+    codes = np.column_stack([o[0] for o in ordinals]).astype(np.int32)
+    cards = np.array([len(o[1]) for o in ordinals])
+    sensitive, sensitive_values = pd.factorize(df_anon[sensitive_col], use_na_sentinel=False)
+    sensitive = sensitive.astype(np.int32)
+    n_values = len(sensitive_values)
+
+    print(f"   🔹 Partitioning {len(df_anon)} rows (k={k}, l={l}, workers={workers})...")
+    with span("mondrian.partition", rows_in=len(df_anon), workers=workers) as s:
+        if workers > 1:
+            leaves, order = _partition_parallel(codes, sensitive, cards, k, l, n_values, workers)
+        else:
+            order = np.arange(len(df_anon))
+            leaves, _ = _partition(codes, sensitive, order, cards, 0, len(df_anon), k, l, n_values)
+        s.set(partitions=len(leaves))
+    leaves.sort()
+    starts = np.array([a for a, _ in leaves], dtype=np.int64)
+    lengths = np.array([b - a for a, b in leaves], dtype=np.int64)
+    print(f"   🔹 {len(leaves)} partitions (smallest: {lengths.min()} rows)")
+
+    # Leaf id of every row, then one label per distinct (min, max) range per QI
+    leaf_of_row = np.empty(len(df_anon), dtype=np.int64)
+    leaf_of_row[order] = np.repeat(np.arange(len(leaves)), lengths)
+    sorted_codes = codes[order]
+    for j, qi in enumerate(qi_list):
+        low = np.minimum.reduceat(sorted_codes[:, j], starts).astype(np.int64)
+        high = np.maximum.reduceat(sorted_codes[:, j], starts).astype(np.int64)
+        pair_ids, pairs = pd.factorize(low * cards[j] + high)
+        labels = _summaries(compiled[qi], ordinals[j][1], pairs // cards[j], pairs % cards[j])
+        label_index, label_ids = np.unique(np.asarray(labels, dtype=object), return_inverse=True)
+        df_anon[qi] = pd.Categorical.from_codes(label_ids[pair_ids][leaf_of_row], categories=label_index)
     return df_anon
 
-def enforce_l_diversity(df, qi_list, sensitive_col, min_l=2):
+def enforce_l_diversity(df, qi_list, sensitive_col, min_l=2, stats=None, workers=1):
     print(f"\n[*] Enforcing l-diversity (Suppressing groups with l < {min_l})...")
     initial_count = len(df)
     
-    # Calculate l-score for each group
-    df['l_score'] = df.groupby(qi_list)[sensitive_col].transform('nunique')
-    
-    # Keep only those with l >= min_l
-    df_safe = df[df['l_score'] >= min_l].copy()
-    df_safe = df_safe.drop(columns=['l_score'])
+    # Calculate l-score for each group and keep only those with l >= min_l
+    with span("suppress", rows_in=initial_count, min_l=min_l) as s:
+        stats = stats or equivalence_class_stats(df, qi_list, sensitive_col, workers)
+        df_safe = df[stats.row_mask(stats.l_distinct() >= min_l)]
+        s.rows_out = len(df_safe)
     
     dropped = initial_count - len(df_safe)
     print(f"   ✂️  SUPPRESSION: Dropped {dropped} rows ({dropped/initial_count:.1%}).")
     return df_safe
 
+# --- STREAMING LOGIC ---
+def class_histograms(df_gen, qi_list, sensitive_col):
+    """Rows per (equivalence class, sensitive value) - the only state kept between chunks."""
+    return df_gen.groupby(qi_list + [sensitive_col], observed=True).size()
+
+def anonymize_stream(qi_list, sensitive_col, min_l=2, chunksize=STREAM_CHUNK_SIZE, levels=GENERALIZATION_LEVELS,
+                     intermediate_path=INTERMEDIATE_PATH, final_path=FINAL_PATH):
+    """Two-pass, chunked version of anonymize_dataset + enforce_l_diversity.
+
+    Pass 1 generalizes every chunk, appends it to the intermediate file and merges
+    the per-chunk class histograms. Pass 2 re-reads the raw file and writes only
+    the rows of the classes with l >= min_l. Returns (rows, rows kept, k).
+    """
+    print(f"[*] Pass 1: generalizing in chunks of {chunksize} rows...")
+    histograms = None
+    reader = iter_data(chunksize)
+    if reader is None: return None
+    with reader:
+        for i, chunk in enumerate(reader):
+            df_gen = anonymize_dataset(chunk, levels, verbose=False)
+            df_gen.to_csv(intermediate_path, index=False, header=False, mode='w' if i == 0 else 'a')
+            counts = class_histograms(df_gen, qi_list, sensitive_col)
+            histograms = counts if histograms is None else histograms.add(counts, fill_value=0)
+    print(f"💾 Saved intermediate file (Pre-Suppression): {intermediate_path}")
+
+    per_class = histograms.unstack(sensitive_col, fill_value=0)
+    sizes = per_class.sum(axis=1)
+    l_scores = (per_class > 0).sum(axis=1)
+    safe_classes = per_class.index[l_scores >= min_l]
+    total = int(sizes.sum())
+    kept = int(sizes[l_scores >= min_l].sum())
+    print(f"\n[*] Enforcing l-diversity (Suppressing groups with l < {min_l})...")
+    print(f"   ✂️  SUPPRESSION: Dropped {total - kept} rows ({(total - kept)/total:.1%}).")
+
+    print(f"[*] Pass 2: writing the rows of the {len(safe_classes)} surviving classes...")
+    with iter_data(chunksize) as reader:
+        for i, chunk in enumerate(reader):
+            df_gen = anonymize_dataset(chunk, levels, verbose=False)
+            mask = pd.MultiIndex.from_frame(df_gen[qi_list]).isin(safe_classes)
+            df_gen[mask].to_csv(final_path, index=False, header=False, mode='w' if i == 0 else 'a')
+    print(f"💾 Saved final anonymized file: {final_path}")
+    k = int(sizes[l_scores >= min_l].min()) if kept else 0
+    return total, kept, k
+
+def release_metadata(stats):
+    """Settings and achieved k, l, t of a dataset, embedded in its columnar copy."""
+    empty = stats.n_classes == 0
+    return {
+        "mode": ANONYMIZATION_MODE,
+        "levels": GENERALIZATION_LEVELS if ANONYMIZATION_MODE != "mondrian" else None,
+        "quasi_identifiers": QUASI_IDENTIFIERS,
+        "sensitive": SENSITIVE_ATTRIBUTE,
+        "rows": stats.n_rows,
+        "k": stats.k,
+        "l": 0 if empty else int(stats.l_distinct().min()),
+        "t": 0.0 if empty else float(stats.t_variational().max()),
+    }
+
+def save_outputs(df_gen, df_final, stats, stats_final):
+    """Writes the intermediate and final datasets (CSV export and/or columnar copy)."""
+    outputs = [
+        (df_gen, stats, INTERMEDIATE_PATH, "intermediate file (Pre-Suppression)"),
+        (df_final, stats_final, FINAL_PATH, "final anonymized file"),
+    ]
+    for df_out, df_stats, path, label in outputs:
+        # CSV first, so that the columnar copy is the most recent one
+        if EXPORT_CSV or STORE_FORMAT == "csv":
+            saved = save_dataset(df_out, path, "csv")
+        if STORE_FORMAT != "csv":
+            saved = save_dataset(df_out, path, STORE_FORMAT, release_metadata(df_stats))
+        print(f"💾 Saved {label}: {saved}")
+
+def run_anonymization(df, save=True):
+    """Generalization + suppression of a loaded dataset.
+
+    Returns (generalized frame, final frame, class stats of the generalized frame).
+    """
+    # 1. GENERALIZATION
+    if ANONYMIZATION_MODE == "mondrian":
+        print("[*] Applying Mondrian Partitioning:")
+        df_gen = mondrian_anonymize(df, QUASI_IDENTIFIERS, SENSITIVE_ATTRIBUTE, workers=MONDRIAN_WORKERS)
+    else:
+        print("[*] Applying Generalization Hierarchies:")
+        df_gen = anonymize_dataset(df, workers=WORKERS)
+    
+    # 2. SUPPRESSION
+    stats = equivalence_class_stats(df_gen, QUASI_IDENTIFIERS, SENSITIVE_ATTRIBUTE, WORKERS)
+    df_final = enforce_l_diversity(df_gen, QUASI_IDENTIFIERS, SENSITIVE_ATTRIBUTE, min_l=2, stats=stats)
+    
+    # 3. FINAL CHECK & SAVE (the surviving classes are exactly the l-diverse ones)
+    stats_final = stats.subset(stats.l_distinct() >= 2)
+    print(f"✅ FINAL k-anonymity: {stats_final.k}")
+    
+    if save:
+        save_outputs(df_gen, df_final, stats, stats_final)
+    return df_gen, df_final, stats
+
 if __name__ == "__main__":
     print("\n🎭 --- ANONYMIZER ENGINE ---")
+    if STREAMING and ANONYMIZATION_MODE != "mondrian":
+        result = anonymize_stream(QUASI_IDENTIFIERS, SENSITIVE_ATTRIBUTE, min_l=2)
+        if result is None: sys.exit(1)
+        print(f"✅ FINAL k-anonymity: {result[2]}")
+        sys.exit(0)
+
     df = load_data()
     if df is not None:
-        df = df.astype(str)
-
-        # 1. GENERALIZATION
-        print("[*] Applying Generalization Hierarchies:")
-        df_gen = anonymize_dataset(df)
-        
-        # 2. SAVE INTERMEDIATE
-        df_gen.to_csv(INTERMEDIATE_PATH, index=False, header=False)
-        print(f"💾 Saved intermediate file (Pre-Suppression): {INTERMEDIATE_PATH}")
-
-        # 3. SUPPRESSION
-        df_final = enforce_l_diversity(df_gen, QUASI_IDENTIFIERS, SENSITIVE_ATTRIBUTE, min_l=2)
-        
-        # 4. FINAL CHECK & SAVE
-        k_final, _, _ = analyze_k_anonymity(df_final, QUASI_IDENTIFIERS)
-        print(f"✅ FINAL k-anonymity: {k_final}")
-        
-        df_final.to_csv(FINAL_PATH, index=False, header=False)
-        print(f"💾 Saved final anonymized file: {FINAL_PATH}")
\ No newline at end of file
+        run_anonymization(df)
\ No newline at end of file
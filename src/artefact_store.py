@@ -0,0 +1,87 @@
+import pandas as pd
+import json
+import os
+
+from tracing import span
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+# Key of the DataShield metadata in the Arrow schema metadata
+METADATA_KEY = b"datashield"
+EXTENSIONS = {"parquet": ".parquet", "feather": ".arrow", "csv": ".csv"}
+
+def store_path(csv_path, fmt):
+    """Path of the copy of a dataset in the given format (same name, different extension)."""
+    return os.path.splitext(csv_path)[0] + EXTENSIONS[fmt]
+
+def _to_table(df, metadata):
+    # Repeated strings are stored as dictionaries (categoricals) instead of plain text
+    df = df.astype({c: "category" for c in df.columns
+                    if pd.api.types.is_object_dtype(df[c]) or pd.api.types.is_string_dtype(df[c])})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    schema_meta = dict(table.schema.metadata or {})
+    schema_meta[METADATA_KEY] = json.dumps(metadata or {}, default=str).encode()
+    return table.replace_schema_metadata(schema_meta)
+
+def save_dataset(df, csv_path, fmt="parquet", metadata=None):
+    """Writes df as Parquet / Arrow IPC (Feather) next to csv_path, or as headerless CSV. Returns the path."""
+    if fmt != "csv" and pa is None:
+        print(f"⚠️  pyarrow not installed, saving {os.path.basename(csv_path)} as CSV instead of {fmt}.")
+        fmt = "csv"
+    path = store_path(csv_path, fmt)
+    with span("io.save", rows_in=len(df), path=path):
+        if fmt == "parquet":
+            pq.write_table(_to_table(df, metadata), path)
+        elif fmt == "feather":
+            # Uncompressed so that reads can memory-map the buffers without copying
+            feather.write_feather(_to_table(df, metadata), path, compression="uncompressed")
+        else:
+            df.to_csv(path, index=False, header=False)
+    return path
+
+def _read_table(path, columns):
+    if path.endswith(EXTENSIONS["parquet"]):
+        return pq.read_table(path, columns=columns, memory_map=True)
+    # Zero-copy: the table buffers point into the mapped file (and keep it open)
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return table.select(columns) if columns else table
+
+def read_metadata(path):
+    if path.endswith(EXTENSIONS["parquet"]):
+        schema = pq.read_schema(path)
+    else:
+        schema = pa.ipc.open_file(pa.memory_map(path)).schema
+    return json.loads((schema.metadata or {}).get(METADATA_KEY, b"{}"))
+
+def read_columnar(path, columns=None):
+    """Reads a Parquet / Arrow IPC file (memory-mapped). Returns (df, metadata)."""
+    table = _read_table(path, columns)
+    return table.to_pandas(), json.loads((table.schema.metadata or {}).get(METADATA_KEY, b"{}"))
+
+def dataset_path(csv_path):
+    """The copy of a dataset load_dataset reads: the most recently written one (None when there is none)."""
+    candidates = [store_path(csv_path, fmt) for fmt in ("feather", "parquet", "csv")]
+    candidates = [p for p in candidates if os.path.exists(p) and (pa is not None or p.endswith(".csv"))]
+    return max(candidates, key=os.path.getmtime) if candidates else None
+
+def load_dataset(csv_path, names, columns=None):
+    """Loads a dataset from its columnar copy when there is one, from the CSV otherwise.
+
+    The most recently written copy wins (dataset_path). Only the requested columns are read.
+    Returns (df, metadata); metadata is {} for CSV.
+    """
+    path = dataset_path(csv_path)
+    if path is None:
+        return None, {}
+    with span("io.load", path=path) as s:
+        if not path.endswith(".csv"):
+            df, metadata = read_columnar(path, columns)
+        else:
+            df, metadata = pd.read_csv(csv_path, names=names, usecols=columns, skipinitialspace=True), {}
+        s.rows_out = len(df)
+    return df, metadata
@@ -0,0 +1,71 @@
+import pandas as pd
+import time
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import load_data
+    from anonymiser import anonymize_dataset
+except ImportError:
+    sys.exit("❌ Error: risk_analyser.py / anonymiser.py not found")
+
+# CONFIGURATION
+SCALE_FACTORS = [1, 10, 30]
+REPEATS = 3
+
+# --- LEGACY IMPLEMENTATION (row-by-row .apply, kept as reference) ---
+def generalize_age_group(age):
+    age = int(age)
+    if age < 30: return "<30"
+    elif age < 50: return "30-49"
+    elif age < 70: return "50-69"
+    else: return "70+"
+
+def legacy_anonymize(df):
+    df_anon = df.astype(str)
+    df_anon['age'] = df_anon['age'].apply(generalize_age_group)
+    df_anon['native-country'] = df_anon['native-country'].apply(lambda x: "US" if str(x).strip() == "United-States" else "Non-US")
+    df_anon['marital-status'] = df_anon['marital-status'].apply(lambda x: "Married" if str(x).strip().startswith("Married") else "Single")
+    df_anon['race'] = df_anon['race'].apply(lambda x: "White" if str(x).strip() == "White" else "Other")
+    df_anon['sex'] = "Person"
+    return df_anon
+
+def best_time(func, df):
+    best = float("inf")
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def same_output(a, b):
+    """Compares the two results the way they end up on disk (all values as strings)."""
+    return a.astype(str).equals(b.astype(str))
+
+if __name__ == "__main__":
+    print("\n⏱️  --- GENERALIZATION BENCHMARK ---")
+    base = load_data()
+    if base is None: sys.exit(1)
+
+    print(f"{'Rows':>12} | {'Legacy rows/s':>14} | {'Vectorized rows/s':>17} | {'Speed-up':>8} | Identical")
+    print("-" * 75)
+    for factor in SCALE_FACTORS:
+        df = pd.concat([base] * factor, ignore_index=True)
+        n = len(df)
+
+        # Silence the progress prints of anonymize_dataset while timing
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        try:
+            t_legacy, out_legacy = best_time(legacy_anonymize, df)
+            t_fast, out_fast = best_time(anonymize_dataset, df)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+        identical = "✅" if same_output(out_legacy, out_fast) else "❌"
+        print(f"{n:>12} | {n / t_legacy:>14,.0f} | {n / t_fast:>17,.0f} | {t_legacy / t_fast:>7.1f}x | {identical}")
@@ -0,0 +1,61 @@
+import pandas as pd
+import numpy as np
+import time
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import load_data, analyze_k_anonymity, QUASI_IDENTIFIERS
+    from anonymiser import anonymize_dataset, enforce_l_diversity, SENSITIVE_ATTRIBUTE
+except ImportError:
+    sys.exit("❌ Error: risk_analyser.py / anonymiser.py not found")
+
+# CONFIGURATION
+SCALE_FACTOR = 30  # ~1M rows
+REPEATS = 3
+# 1, 2, 4, ... up to every core
+WORKER_COUNTS = sorted({min(2 ** i, os.cpu_count() or 1) for i in range(8)})
+
+def best_time(func):
+    best = float("inf")
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+if __name__ == "__main__":
+    print("\n⏱️  --- PARALLEL SCALING BENCHMARK ---")
+    base = load_data()
+    if base is None: sys.exit(1)
+    df = pd.concat([base] * SCALE_FACTOR, ignore_index=True)
+    print(f"[*] {len(df)} rows, {os.cpu_count()} cores, workers: {WORKER_COUNTS}")
+
+    # Silence the progress prints while timing
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        timings, reference = {}, None
+        for workers in WORKER_COUNTS:
+            t_gen, df_gen = best_time(lambda: anonymize_dataset(df, verbose=False, workers=workers))
+            t_k, (k, groups, uniques) = best_time(lambda: analyze_k_anonymity(df, QUASI_IDENTIFIERS, workers=workers))
+            t_l, df_safe = best_time(lambda: enforce_l_diversity(df_gen, QUASI_IDENTIFIERS, SENSITIVE_ATTRIBUTE, workers=workers))
+            result = (df_gen, groups, df_safe.index.to_numpy(), (k, uniques))
+            if reference is None: reference = result
+            identical = (result[0].equals(reference[0]) and result[1].equals(reference[1])
+                         and np.array_equal(result[2], reference[2]) and result[3] == reference[3])
+            timings[workers] = (t_gen, t_k, t_l, identical)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"{'Workers':>7} | {'anonymize (s)':>13} | {'k-anonymity (s)':>15} | {'l-diversity (s)':>15} | {'Speed-up':>8} | Identical")
+    print("-" * 82)
+    serial = sum(timings[WORKER_COUNTS[0]][:3])
+    for workers, (t_gen, t_k, t_l, identical) in timings.items():
+        print(f"{workers:>7} | {t_gen:>13.2f} | {t_k:>15.2f} | {t_l:>15.2f} | "
+              f"{serial / (t_gen + t_k + t_l):>7.2f}x | {'✅' if identical else '❌'}")
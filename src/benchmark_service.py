@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import load_data, QUASI_IDENTIFIERS
+    from anonymiser import SENSITIVE_ATTRIBUTE
+    from service import HOST, PORT, MicroBatcher, score_batches, _init_worker
+except ImportError:
+    sys.exit("❌ Error: risk_analyser.py / service.py not found")
+
+# CONFIGURATION
+REQUESTS = 2000
+CONCURRENCY = 32        # clients, one keep-alive connection each
+RECORDS_PER_REQUEST = 10
+STARTUP_TIMEOUT = 60
+
+async def request(reader, writer, method, path, payload=None):
+    body = b"" if payload is None else json.dumps(payload).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length": length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+async def get(port, path):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        return await request(reader, writer, "GET", path)
+    finally:
+        writer.close()
+
+async def wait_ready(port, process):
+    deadline = time.perf_counter() + STARTUP_TIMEOUT
+    while time.perf_counter() < deadline:
+        if process is not None and process.poll() is not None:
+            sys.exit("❌ Error: the service exited during start-up.")
+        try:
+            return await get(port, "/health")
+        except OSError:
+            await asyncio.sleep(0.2)
+    sys.exit("❌ Error: the service did not start in time.")
+
+async def load(port, endpoint, batches, concurrency):
+    """Sends the batches from `concurrency` clients; returns the latency of every request (s)."""
+    queue = list(reversed(batches))
+    latencies = []
+
+    async def client():
+        reader, writer = await asyncio.open_connection(HOST, port)
+        try:
+            while queue:
+                records = queue.pop()
+                start = time.perf_counter()
+                status, _ = await request(reader, writer, "POST", endpoint, {"records": records})
+                latencies.append(time.perf_counter() - start)
+                if status != 200: raise RuntimeError(f"{endpoint} answered {status}")
+        finally:
+            writer.close()
+
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return latencies
+
+async def check_mixed_batch(port, record):
+    """Good and bad requests sent together: only the bad ones fail, the good ones are still scored."""
+    bad = [{**record, "age": "abc"}, {**record, "age": None}]
+
+    async def post(records):
+        reader, writer = await asyncio.open_connection(HOST, port)
+        try:
+            return (await request(reader, writer, "POST", "/score", {"records": records}))[0]
+        finally:
+            writer.close()
+
+    statuses = await asyncio.gather(*[post([r]) for r in [record, *bad, record]])
+    if statuses != [200, 400, 400, 200]:
+        sys.exit(f"❌ Error: mixed good/bad requests answered {statuses}, expected [200, 400, 400, 200]")
+    # Past validation, a request failing inside a merged call must not fail the other requests of the call
+    _init_worker()
+    batcher = MicroBatcher(score_batches, None, 1)
+    task = asyncio.create_task(batcher.run())
+    results = await asyncio.gather(*[batcher.submit([r]) for r in [record, bad[0], record]], return_exceptions=True)
+    task.cancel()
+    if [isinstance(r, Exception) for r in results] != [False, True, False]:
+        sys.exit(f"❌ Error: a failing request failed its micro-batch: {results}")
+    print("[*] Mixed good/bad batch: ✅ only the bad requests fail")
+
+async def main(args):
+    process = None
+    if not args.connect:
+        # The service runs in its own process, as in production
+        process = subprocess.Popen([sys.executable, os.path.join(current_dir, "service.py"), str(args.port), str(args.workers)],
+                                   stdout=subprocess.DEVNULL)
+    try:
+        _, health = await wait_ready(args.port, process)
+        print(f"[*] Service up: {health['reference']['rows']} reference rows, {health['workers']} workers.")
+
+        df = load_data(columns=QUASI_IDENTIFIERS + [SENSITIVE_ATTRIBUTE])
+        rng = np.random.default_rng(0)
+        sample = df.astype(object).to_dict(orient="records")
+        batches = [[sample[i] for i in rng.integers(0, len(sample), args.records)] for _ in range(args.requests)]
+        await check_mixed_batch(args.port, sample[0])
+
+        print(f"{'Endpoint':<11} | {'Requests':>8} | {'Req/s':>8} | {'Records/s':>10} | {'p50 (ms)':>8} | {'p99 (ms)':>8}")
+        print("-" * 70)
+        for endpoint in ("/score", "/anonymize"):
+            start = time.perf_counter()
+            latencies = np.asarray(await load(args.port, endpoint, batches, args.concurrency)) * 1000
+            elapsed = time.perf_counter() - start
+            print(f"{endpoint:<11} | {len(latencies):>8} | {len(latencies) / elapsed:>8.0f} | "
+                  f"{len(latencies) * args.records / elapsed:>10,.0f} | {np.percentile(latencies, 50):>8.2f} | "
+                  f"{np.percentile(latencies, 99):>8.2f}")
+
+        _, stats = await get(args.port, "/stats")
+        print("\n[*] Server side:")
+        for endpoint, r in stats.items():
+            print(f"   {endpoint:<11} p50 {r['p50_ms']:>7.2f} ms  p99 {r['p99_ms']:>7.2f} ms  "
+                  f"requests per call {r['requests_per_call']}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the local risk service (service.py).")
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--records", type=int, default=RECORDS_PER_REQUEST, help="records per request")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes of the spawned service")
+    parser.add_argument("--port", type=int, default=PORT + 1)
+    parser.add_argument("--connect", action="store_true", help="use a service already running on --port")
+    args = parser.parse_args()
+
+    print("\n⏱️  --- SERVICE LOAD TEST ---")
+    asyncio.run(main(args))
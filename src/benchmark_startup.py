@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(current_dir, "datashield.py")
+
+# CONFIGURATION
+REPEATS = 5
+# Start-up budget of every subcommand (interpreter + imports, seconds, best of REPEATS)
+STARTUP_BUDGET_S = 1.5
+# subcommand -> whether it may load the plotting libraries
+SUBCOMMANDS = {
+    "risk": False,
+    "anonymize": False,
+    "cube": False,
+    "link voters.csv": False,
+    "audit-l --no-plot": False,
+    "audit-t --no-plot": False,
+    "plot": True,
+}
+
+def timed_run(cmd):
+    start = time.perf_counter()
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, out.stdout
+
+def startup(args):
+    """Best and median wall time of `datashield --startup-only <args>`, and the heavy modules it loaded."""
+    runs = [timed_run([sys.executable, CLI, "--startup-only", *args]) for _ in range(REPEATS)]
+    times = [t for t, _ in runs]
+    return min(times), float(np.median(times)), json.loads(runs[-1][1].strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    # Exits 1 when a subcommand exceeds the budget or a non-plotting one loads matplotlib / seaborn
+    print("\n⏱️  --- CLI START-UP TIME ---")
+    bare = min(timed_run([sys.executable, "-c", "pass"])[0] for _ in range(REPEATS))
+    print(f"[*] Bare interpreter: {bare:.3f}s")
+    print(f"{'Subcommand':<20} | {'Best (s)':>8} | {'Median (s)':>10} | {'Plotting libs':>13} | Status")
+    print("-" * 70)
+    failures = []
+    for command, may_plot in SUBCOMMANDS.items():
+        best, median, loaded = startup(command.split())
+        plotting = loaded["matplotlib"] or loaded["seaborn"]
+        problems = ([f"over budget ({STARTUP_BUDGET_S}s)"] if best > STARTUP_BUDGET_S else []) + \
+                   (["loads plotting libraries"] if plotting and not may_plot else [])
+        failures += [f"{command}: {p}" for p in problems]
+        print(f"{command:<20} | {best:>8.3f} | {median:>10.3f} | {'yes' if plotting else 'no':>13} | "
+              f"{'❌ ' + ', '.join(problems) if problems else '✅'}")
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        sys.exit(1)
@@ -0,0 +1,139 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import load_data, analyze_k_anonymity, QUASI_IDENTIFIERS, PRIVACY_COLUMNS
+    from anonymiser import anonymize_dataset, enforce_l_diversity, SENSITIVE_ATTRIBUTE
+    from visualise_t_closeness import calculate_t_values
+    from synthetic_data import generate, synthetic_path, SEED
+except ImportError:
+    sys.exit("❌ Error: pipeline scripts not found in src/")
+
+# CONFIGURATION
+SIZES = [100_000, 1_000_000, 10_000_000]
+REPEATS = 3
+RESULTS_DIR = os.path.join(current_dir, "../data/benchmarks")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+# A result regresses when it is slower than the baseline by both margins (the second one absorbs timer noise)
+REGRESSION_TOLERANCE = 0.20
+MIN_REGRESSION_SECONDS = 0.05
+
+def measure(func, track_memory=True):
+    """Best wall time over REPEATS runs, then the tracemalloc peak of one extra run. Returns (seconds, peak MB, result)."""
+    best, result = float("inf"), None
+    for _ in range(REPEATS):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+    peak_mb = None
+    if track_memory:
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                func()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return best, peak_mb, result
+
+def run_size(n_rows, seed=SEED, track_memory=True):
+    """Times the pipeline functions on n_rows synthetic rows (the file is generated once and reused)."""
+    path = synthetic_path(n_rows, seed)
+    if not os.path.exists(path):
+        generate(n_rows, path, seed=seed)
+
+    results = []
+    def case(name, func):
+        seconds, peak_mb, result = measure(func, track_memory)
+        results.append({"function": name, "rows": n_rows, "seconds": round(seconds, 4),
+                        "rows_per_s": round(n_rows / seconds), "peak_mb": None if peak_mb is None else round(peak_mb, 1)})
+        print(f"   {name:<22} {seconds:>9.3f}s  {n_rows / seconds:>14,.0f} rows/s"
+              + ("" if peak_mb is None else f"  {peak_mb:>9.1f} MB"))
+        return result
+
+    print(f"\n[*] {n_rows:,} rows ({os.path.basename(path)})")
+    df = case("load_data", lambda: load_data(path, cache=False))
+    case("load_data_projected", lambda: load_data(path, columns=PRIVACY_COLUMNS, cache=False))
+    load_data(path)  # writes the parsed copy
+    case("load_data_cached", lambda: load_data(path))
+    df_gen = case("anonymize_dataset", lambda: anonymize_dataset(df, verbose=False))
+    df_safe = case("enforce_l_diversity", lambda: enforce_l_diversity(df_gen, QUASI_IDENTIFIERS, SENSITIVE_ATTRIBUTE))
+    case("analyze_k_anonymity", lambda: analyze_k_anonymity(df, QUASI_IDENTIFIERS))
+    case("calculate_t_values", lambda: calculate_t_values(df_safe, SENSITIVE_ATTRIBUTE))
+    return results
+
+def environment():
+    return {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count()}
+
+def compare(results, baseline):
+    """Prints every result against the baseline. Returns the regressions."""
+    reference = {(r["function"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'Function':<22} | {'Rows':>11} | {'Baseline (s)':>12} | {'Now (s)':>9} | {'Change':>8} | Status")
+    print("-" * 82)
+    for r in results:
+        base = reference.get((r["function"], r["rows"]))
+        if base is None:
+            print(f"{r['function']:<22} | {r['rows']:>11,} | {'-':>12} | {r['seconds']:>9.3f} | {'-':>8} | new")
+            continue
+        change = r["seconds"] / base["seconds"] - 1 if base["seconds"] else 0.0
+        slower = change > REGRESSION_TOLERANCE and r["seconds"] - base["seconds"] > MIN_REGRESSION_SECONDS
+        if slower: regressions.append(r)
+        status = "⚠️  REGRESSION" if slower else ("🚀 faster" if change < -REGRESSION_TOLERANCE else "✅ ok")
+        print(f"{r['function']:<22} | {r['rows']:>11,} | {base['seconds']:>12.3f} | {r['seconds']:>9.3f} | "
+              f"{change:>+7.0%} | {status}")
+    if baseline.get("environment") != environment():
+        print("ℹ️  The baseline was recorded on a different environment, compare with care.")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times and memory-profiles the pipeline on synthetic data.")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in SIZES),
+                        help="comma-separated row counts (e.g. 1e5,1e6)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run (faster)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    print("\n⏱️  --- PIPELINE BENCHMARK SUITE ---")
+    sizes = [int(float(s)) for s in args.sizes.split(",")]
+    results = [r for n in sizes for r in run_size(n, args.seed, not args.no_memory)]
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "seed": args.seed, "repeats": REPEATS,
+              "environment": environment(), "results": results}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"results_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to: {out_path}")
+
+    regressions = []
+    if os.path.exists(BASELINE_PATH) and not args.save_baseline:
+        with open(BASELINE_PATH) as f:
+            regressions = compare(results, json.load(f))
+    if args.save_baseline or not os.path.exists(BASELINE_PATH):
+        if not args.save_baseline:
+            # Nothing was compared: say so rather than report a pass
+            print(f"\nℹ️  No baseline found at {BASELINE_PATH}: no regression check was made, "
+                  f"this run is stored as the new baseline.")
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline saved to: {BASELINE_PATH}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) against the baseline.")
+        sys.exit(1)
@@ -0,0 +1,308 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import load_data, source_signature, DATA_PATH, COLUMNS, QUASI_IDENTIFIERS
+    from anonymiser import FINAL_PATH, SENSITIVE_ATTRIBUTE
+    from artefact_store import dataset_path, load_dataset
+    from parallel import equivalence_class_stats
+except ImportError:
+    sys.exit("❌ Error: risk_analyser.py / anonymiser.py not found")
+
+# --- LAYOUT ---
+# One directory per indexed dataset (data/adult_anonymized.index/ next to the file):
+#   keys.npy     composite key of every class, sorted: mixed-radix number of its QI
+#                codes, first QI most significant (codes index the sorted values in meta.json)
+#   offsets.npy  class c owns row_ids[offsets[c]:offsets[c + 1]] (so sizes = diff(offsets))
+#   row_ids.npy  row positions in the dataset, grouped by class
+#   counts.npy   classes x sensitive values histogram
+#   meta.json    QIs, value dictionaries, sensitive values and the source file signature
+# The arrays are memory-mapped on open: a query touches only the pages it reads.
+ARRAYS = ("keys", "offsets", "row_ids", "counts")
+
+def index_path(dataset_path):
+    return os.path.splitext(dataset_path)[0] + ".index"
+
+def _composite(codes, cards):
+    key = np.zeros(len(codes[0]) if codes else 0, dtype=np.int64)
+    for c, card in zip(codes, cards):
+        key = key * card + c
+    return key
+
+
+class ClassIndex:
+    """Memory-mapped equivalence-class index of a dataset (see LAYOUT)."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        self.qi_list = self.meta["qi_list"]
+        self.sensitive_col = self.meta["sensitive_col"]
+        self.values = self.meta["values"]
+        self.dictionaries = {qi: np.asarray(self.meta["dictionaries"][qi], dtype=object) for qi in self.qi_list}
+        self.cards = [max(len(self.dictionaries[qi]), 1) for qi in self.qi_list]
+        # strides[j] = product of the cardinalities of the QIs after j
+        self.strides = [int(np.prod(self.cards[j + 1:], dtype=np.int64)) for j in range(len(self.cards))]
+        self._codes = {qi: {v: i for i, v in enumerate(self.meta["dictionaries"][qi])} for qi in self.qi_list}
+
+    @classmethod
+    def build(cls, df, path, qi_list=QUASI_IDENTIFIERS, sensitive_col=SENSITIVE_ATTRIBUTE, source=None, workers=1):
+        """Indexes df (row ids = positions in df) into the directory path and opens it."""
+        qi_list = list(qi_list)
+        stats = equivalence_class_stats(df, qi_list, sensitive_col, workers=workers)
+        encoded = [pd.factorize(stats.keys[qi], sort=True, use_na_sentinel=False) for qi in qi_list]
+        cards = [max(len(uniques), 1) for _, uniques in encoded]
+        if np.prod(np.asarray(cards, dtype=float)) >= 2 ** 63:
+            raise ValueError("too many QI value combinations for 64-bit class keys")
+        keys = _composite([codes.astype(np.int64) for codes, _ in encoded], cards)
+        order = np.argsort(keys, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        counts = stats.counts[order]
+        row_ids = np.argsort(rank[stats.group_ids], kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(counts.sum(axis=1))]).astype(np.int64)
+
+        meta = {"qi_list": qi_list, "sensitive_col": sensitive_col, "n_rows": len(df),
+                "values": pd.Index(stats.values).tolist(),
+                "dictionaries": {qi: pd.Index(uniques).tolist() for qi, (_, uniques) in zip(qi_list, encoded)},
+                "source": source and os.path.abspath(source),
+                "source_signature": source and source_signature(source),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        # Written to a temporary directory, then swapped in: readers never see a partial index
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        arrays = {"keys": keys[order], "offsets": offsets, "row_ids": row_ids.astype(np.int64), "counts": counts}
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, f"{name}.npy"), arrays[name])
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f, default=str)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        return cls(path)
+
+    @property
+    def n_classes(self):
+        return len(self.keys)
+
+    @property
+    def n_rows(self):
+        return self.meta["n_rows"]
+
+    def is_stale(self):
+        """True when the indexed file changed since the index was built."""
+        source = self.meta.get("source")
+        return bool(source) and (not os.path.exists(source) or source_signature(source) != self.meta["source_signature"])
+
+    def sizes(self, class_ids=None):
+        class_ids = np.arange(self.n_classes) if class_ids is None else np.asarray(class_ids)
+        return self.offsets[class_ids + 1] - self.offsets[class_ids]
+
+    # --- ENCODING ---
+    def _code(self, qi, value):
+        codes = self._codes[qi]
+        if value in codes:
+            return codes[value]
+        if isinstance(value, str):  # command line values of numeric QIs
+            for cast in (int, float):
+                try:
+                    if cast(value) in codes: return codes[cast(value)]
+                except ValueError:
+                    pass
+        return None
+
+    def _allowed(self, qi, condition):
+        """Boolean mask over the dictionary of qi: value, list/set of values, or (low, high) inclusive."""
+        allowed = np.zeros(len(self.dictionaries[qi]), dtype=bool)
+        if isinstance(condition, tuple):
+            low, high = condition
+            for code, value in enumerate(self.dictionaries[qi]):
+                try:
+                    allowed[code] = (low is None or value >= type(value)(low)) and (high is None or value <= type(value)(high))
+                except (TypeError, ValueError):
+                    pass
+            return allowed
+        for value in (condition if isinstance(condition, (list, set, frozenset)) else [condition]):
+            code = self._code(qi, value)
+            if code is not None: allowed[code] = True
+        return allowed
+
+    def _digits(self, keys, j):
+        return (keys // self.strides[j]) % self.cards[j]
+
+    # --- QUERIES ---
+    def point(self, values):
+        """Class id of a full QI combination ({qi: value}), or None when no row has it."""
+        codes = [self._code(qi, values[qi]) for qi in self.qi_list]
+        if any(c is None for c in codes):
+            return None
+        key = int(_composite([np.array([c]) for c in codes], self.cards)[0])
+        pos = int(np.searchsorted(self.keys, key))
+        return pos if pos < self.n_classes and self.keys[pos] == key else None
+
+    def lookup(self, frame):
+        """Class id of every row of frame (its QI columns), -1 when no indexed row has its combination."""
+        found = np.ones(len(frame), dtype=bool)
+        codes = []
+        for qi in self.qi_list:
+            column = frame[qi]
+            dictionary = pd.Index(self.dictionaries[qi])
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                # Encode the categories once, then take the row codes
+                mapping = np.append(dictionary.get_indexer(column.cat.categories.astype(object)), -1)
+                qi_codes = mapping[column.cat.codes.to_numpy()]
+            else:
+                qi_codes = dictionary.get_indexer(column.to_numpy(dtype=object))
+            found &= qi_codes >= 0
+            codes.append(np.where(qi_codes >= 0, qi_codes, 0).astype(np.int64))
+        keys = _composite(codes, self.cards)
+        pos = np.minimum(np.searchsorted(self.keys, keys), max(self.n_classes - 1, 0))
+        found &= np.asarray(self.keys[pos]) == keys if self.n_classes else False
+        return np.where(found, pos, -1)
+
+    def scan(self, conditions):
+        """Ids of the classes matching every condition ({qi: value | [values] | (low, high)}); other QIs are free."""
+        lo, hi = 0, self.n_classes
+        masks = {self.qi_list.index(qi): self._allowed(qi, cond) for qi, cond in conditions.items()}
+        if 0 in masks:
+            # The first QI is the most significant digit: its allowed codes bound a contiguous key range
+            allowed = np.flatnonzero(masks[0])
+            if not len(allowed):
+                return np.array([], dtype=np.int64)
+            lo = int(np.searchsorted(self.keys, allowed[0] * self.strides[0]))
+            hi = int(np.searchsorted(self.keys, (allowed[-1] + 1) * self.strides[0]))
+        keys = np.asarray(self.keys[lo:hi])
+        match = np.ones(len(keys), dtype=bool)
+        for j, allowed in masks.items():
+            match &= allowed[self._digits(keys, j)]
+        return lo + np.flatnonzero(match)
+
+    def below(self, k):
+        """Ids of the classes with fewer than k rows."""
+        return np.flatnonzero(np.diff(self.offsets) < k)
+
+    def rows(self, class_ids):
+        """Sorted row positions of the given classes."""
+        class_ids = np.asarray(class_ids, dtype=np.int64)
+        if not len(class_ids):
+            return np.array([], dtype=np.int64)
+        starts, ends = self.offsets[class_ids], self.offsets[class_ids + 1]
+        # Row slots of every class range, concatenated without a Python loop
+        lengths = ends - starts
+        slots = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(lengths.sum())
+        return np.sort(self.row_ids[slots])
+
+    def classes(self, class_ids):
+        """QI values, size, sensitive histogram and distinct l of the given classes."""
+        class_ids = np.asarray(class_ids, dtype=np.int64)
+        keys = np.asarray(self.keys[class_ids])
+        frame = pd.DataFrame({qi: self.dictionaries[qi][self._digits(keys, j)] for j, qi in enumerate(self.qi_list)})
+        counts = np.asarray(self.counts[class_ids])
+        frame["group_size"] = counts.sum(axis=1)
+        for s, value in enumerate(self.values):
+            frame[value] = counts[:, s]
+        frame["l_distinct"] = np.count_nonzero(counts, axis=1)
+        frame.index = pd.Index(class_ids, name="class_id")
+        return frame
+
+
+def build_index(raw=False, path=None, workers=1):
+    """Indexes the anonymized release (or the raw data) and returns the opened index."""
+    source = path or (DATA_PATH if raw else FINAL_PATH)
+    columns = QUASI_IDENTIFIERS + [SENSITIVE_ATTRIBUTE]
+    df = load_data(source, columns=columns) if raw else load_dataset(source, COLUMNS, columns)[0]
+    if df is None:
+        raise FileNotFoundError(f"{source} not found, run the pipeline first")
+    # Signed on the copy that was read: the Parquet / Arrow one when the CSV is not exported
+    return ClassIndex.build(df, index_path(source), source=source if raw else dataset_path(source), workers=workers)
+
+def open_index(raw=False, path=None):
+    """Opens the index of the dataset, (re)building it when it is missing or out of date."""
+    source = path or (DATA_PATH if raw else FINAL_PATH)
+    if os.path.exists(os.path.join(index_path(source), "meta.json")):
+        index = ClassIndex(index_path(source))
+        # Also stale when a newer copy of the release (another format) was written since
+        read = source if raw else dataset_path(source)
+        if not index.is_stale() and index.meta.get("source") == (read and os.path.abspath(read)):
+            return index
+        print(f"♻️  {os.path.basename(source)} changed, rebuilding its index.")
+    return build_index(raw, source)
+
+def _parse_conditions(terms):
+    # qi=value, qi=a,b,c (any of), qi=low..high (inclusive range, either side optional)
+    conditions = {}
+    for term in terms:
+        qi, _, value = term.partition("=")
+        if ".." in value:
+            low, _, high = value.partition("..")
+            conditions[qi] = (low or None, high or None)
+        elif "," in value:
+            conditions[qi] = value.split(",")
+        else:
+            conditions[qi] = value
+    return conditions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Equivalence-class queries on a persistent index.")
+    parser.add_argument("--raw", action="store_true", help="query the raw data instead of the anonymized release")
+    parser.add_argument("--path", help="dataset to index (default: the anonymized release)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="(re)build the index")
+    point = commands.add_parser("point", help="class of a full QI combination: qi=value ...")
+    point.add_argument("terms", nargs="+")
+    scan = commands.add_parser("scan", help="classes matching qi=value, qi=a,b or qi=low..high")
+    scan.add_argument("terms", nargs="*")
+    below = commands.add_parser("below", help="classes with fewer than k rows")
+    below.add_argument("k", type=int)
+    for sub in (scan, below):
+        sub.add_argument("--rows", action="store_true", help="also list the row positions")
+    args = parser.parse_args()
+
+    print("\n🗂️  --- EQUIVALENCE CLASS INDEX ---")
+    start = time.perf_counter()
+    index = build_index(args.raw, args.path) if args.command == "build" else open_index(args.raw, args.path)
+    opened = time.perf_counter()
+    print(f"[*] {index.n_classes} classes over {index.n_rows} rows ({index.path}).")
+
+    conditions = _parse_conditions(getattr(args, "terms", []))
+    unknown = [qi for qi in conditions if qi not in index.qi_list]
+    if unknown:
+        sys.exit(f"❌ Error: not a quasi-identifier: {', '.join(unknown)} (QIs: {', '.join(index.qi_list)})")
+    if args.command == "point":
+        missing = [qi for qi in index.qi_list if qi not in conditions]
+        if missing:
+            sys.exit(f"❌ Error: a point query needs every QI, missing: {', '.join(missing)}")
+        class_id = index.point(conditions)
+        ids = [] if class_id is None else [class_id]
+    elif args.command == "scan":
+        ids = index.scan(conditions)
+    elif args.command == "below":
+        ids = index.below(args.k)
+    else:
+        ids = None
+
+    if ids is not None:
+        result = index.classes(ids)
+        elapsed = (time.perf_counter() - opened) * 1000
+        if not len(result):
+            print("   No matching class.")
+        else:
+            with pd.option_context("display.max_rows", 50, "display.width", 200):
+                print(result)
+            print(f"   {len(result)} classes, {int(result['group_size'].sum())} rows.")
+        if getattr(args, "rows", False):
+            rows = index.rows(ids)
+            print(f"   Rows: {rows[:50].tolist()}{' ...' if len(rows) > 50 else ''}")
+        print(f"⏱️  Query: {elapsed:.1f} ms (open: {(opened - start) * 1000:.1f} ms)")
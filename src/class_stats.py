@@ -0,0 +1,131 @@
+import pandas as pd
+import numpy as np
+
+# --- METRICS ON COUNT MATRICES ---
+# counts[g, s] = rows of equivalence class g with sensitive value s
+
+def l_distinct(counts):
+    """Distinct l-diversity of every class (number of sensitive values present)."""
+    return np.count_nonzero(counts, axis=1)
+
+def l_entropy(counts):
+    """Entropy l-diversity of every class, as the effective number of values exp(H)."""
+    p = counts / counts.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h = -np.where(p > 0, p * np.log(p), 0.0).sum(axis=1)
+    return np.exp(h)
+
+def recursive_cl(counts, c, l):
+    """Recursive (c,l)-diversity of every class: r1 < c * (r_l + ... + r_m), r sorted descending."""
+    r = -np.sort(-counts, axis=1)
+    tail = r[:, l - 1:].sum(axis=1) if l - 1 < r.shape[1] else np.zeros(len(r))
+    return r[:, 0] < c * tail
+
+def t_variational(counts, global_dist):
+    """Variational distance between every class distribution and the global one."""
+    p = counts / counts.sum(axis=1, keepdims=True)
+    return 0.5 * np.abs(p - global_dist).sum(axis=1)
+
+def t_emd(counts, global_dist):
+    """Earth Mover's Distance with the ordered ground distance |i - j| / (m - 1) (values sorted)."""
+    p = counts / counts.sum(axis=1, keepdims=True)
+    m = counts.shape[1]
+    if m < 2: return np.zeros(len(counts))
+    return np.abs(np.cumsum(p - global_dist, axis=1))[:, :-1].sum(axis=1) / (m - 1)
+
+
+class EquivalenceClassStats:
+    """Equivalence classes of a frame, computed in a single grouping pass.
+
+    group_ids   -> dense class id of every row (classes in sorted QI order)
+    keys        -> QI values of every class
+    counts      -> classes x sensitive values count matrix (sizes only if no sensitive column)
+    Every k, l and t metric is derived from these arrays, never by regrouping.
+    """
+
+    def __init__(self, df, qi_list, sensitive_col=None):
+        self.qi_list = list(qi_list)
+        self.sensitive_col = sensitive_col
+        grouped = df.groupby(self.qi_list, observed=True, dropna=False)
+        self.group_ids = grouped.ngroup().to_numpy()
+        self.keys = grouped.size().index.to_frame(index=False)
+        n_groups = len(self.keys)
+        if sensitive_col is None:
+            self.values = pd.Index(["*"])
+            self.counts = np.bincount(self.group_ids, minlength=n_groups)[:, None]
+        else:
+            codes, self.values = pd.factorize(df[sensitive_col], sort=True, use_na_sentinel=False)
+            n_values = len(self.values)
+            self.counts = np.bincount(self.group_ids * n_values + codes,
+                                      minlength=n_groups * n_values).reshape(n_groups, n_values)
+
+    @classmethod
+    def from_arrays(cls, qi_list, sensitive_col, group_ids, keys, counts, values):
+        stats = cls.__new__(cls)
+        stats.qi_list, stats.sensitive_col = list(qi_list), sensitive_col
+        stats.group_ids, stats.keys, stats.counts, stats.values = group_ids, keys, counts, values
+        return stats
+
+    # --- k ---
+    @property
+    def sizes(self):
+        return self.counts.sum(axis=1)
+
+    @property
+    def n_rows(self):
+        return int(self.counts.sum())
+
+    @property
+    def n_classes(self):
+        return len(self.counts)
+
+    @property
+    def k(self):
+        return int(self.sizes.min()) if self.n_classes else 0
+
+    @property
+    def uniques(self):
+        """Number of classes with a single row (records re-identifiable with certainty)."""
+        return int((self.sizes == 1).sum())
+
+    def groups_frame(self):
+        """The QI values of every class with its size (same layout as analyze_k_anonymity)."""
+        groups = self.keys.copy()
+        groups['group_size'] = self.sizes
+        return groups
+
+    # --- l ---
+    def l_distinct(self):
+        return l_distinct(self.counts)
+
+    def l_entropy(self):
+        return l_entropy(self.counts)
+
+    def recursive_cl(self, c, l):
+        return recursive_cl(self.counts, c, l)
+
+    # --- t ---
+    def global_distribution(self):
+        """Distribution of the sensitive attribute over the whole table, indexed by value."""
+        totals = self.counts.sum(axis=0)
+        return pd.Series(totals / totals.sum(), index=self.values)
+
+    def t_variational(self):
+        return t_variational(self.counts, self.global_distribution().to_numpy())
+
+    def t_emd(self):
+        return t_emd(self.counts, self.global_distribution().to_numpy())
+
+    # --- ROWS ---
+    def row_mask(self, class_mask):
+        """Boolean mask over the rows of the classes selected by class_mask."""
+        return np.asarray(class_mask)[self.group_ids]
+
+    def subset(self, class_mask):
+        """Stats restricted to the selected classes (e.g. after suppression), without regrouping."""
+        class_mask = np.asarray(class_mask)
+        new_ids = np.cumsum(class_mask) - 1
+        row_mask = self.row_mask(class_mask)
+        return EquivalenceClassStats.from_arrays(
+            self.qi_list, self.sensitive_col, new_ids[self.group_ids[row_mask]],
+            self.keys[class_mask].reset_index(drop=True), self.counts[class_mask], self.values)
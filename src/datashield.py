@@ -0,0 +1,144 @@
+import argparse
+import importlib
+import json
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+# --- SUBCOMMANDS ---
+# Nothing heavy is imported at module level: every subcommand declares the modules it
+# needs, which are imported once it is chosen. matplotlib / seaborn are only loaded by
+# the plotting functions, so `risk`, `anonymize` and the `--no-plot` audits never pay
+# for them.
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "matplotlib", "seaborn"]
+
+def run_risk(args):
+    from risk_analyser import load_data, report_risk, DATA_PATH, QUASI_IDENTIFIERS
+    if args.approx:
+        from risk_analyser import iter_batches
+        from approx_risk import sketch_risk, print_sketch_report
+        print_sketch_report(sketch_risk(iter_batches(args.input or DATA_PATH, QUASI_IDENTIFIERS)))
+        return 0
+    df = load_data(args.input or DATA_PATH, columns=QUASI_IDENTIFIERS)
+    if df is None: return 1
+    print(f"[*] Loaded dataset with {len(df)} rows.")
+    report_risk(df)
+    return 0
+
+def run_anonymize(args):
+    from risk_analyser import load_data, DATA_PATH
+    from anonymiser import run_anonymization
+    df = load_data(args.input or DATA_PATH)
+    if df is None: return 1
+    run_anonymization(df, save=not args.dry_run)
+    return 0
+
+def run_cube(args):
+    from risk_analyser import load_data, DATA_PATH, QUASI_IDENTIFIERS
+    from risk_cube import risk_cube, ranked, print_cells, CANDIDATE_COLUMNS
+    columns = args.columns.split(",") if args.columns else QUASI_IDENTIFIERS + CANDIDATE_COLUMNS
+    df = load_data(args.input or DATA_PATH, columns=columns)
+    if df is None: return 1
+    cube = risk_cube(df, columns, args.k)
+    print_cells(cube, ranked(cube.subsets(), args.top), args.k)
+    return 0
+
+def run_link(args):
+    from linkage import open_index, release_levels, load_auxiliary, link, summarise, print_summary, \
+        FINAL_PATH, SENSITIVE_ATTRIBUTE
+    try:
+        index = open_index(path=args.release)
+        levels = release_levels(args.release or FINAL_PATH)
+        aux = load_auxiliary(args.aux, list(levels))
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    truth = aux[SENSITIVE_ATTRIBUTE] if SENSITIVE_ATTRIBUTE in aux.columns else None
+    print_summary(summarise(link(index, aux, levels), truth, index.values))
+    return 0
+
+def run_audit_l(args):
+    from visualise_l_diversity import audit_l_diversity
+    violations = audit_l_diversity(args.min_l, plot=not args.no_plot)
+    if violations is None:
+        print("❌ Error: Missing data. Run `datashield anonymize` first.")
+        return 1
+    return 1 if violations and args.strict else 0
+
+def run_audit_t(args):
+    from risk_analyser import COLUMNS, QUASI_IDENTIFIERS
+    from artefact_store import load_dataset
+    from visualise_t_closeness import audit_t_closeness, INPUT_PATH, SENSITIVE_ATTR
+    df, _ = load_dataset(INPUT_PATH, COLUMNS, QUASI_IDENTIFIERS + [SENSITIVE_ATTR])
+    if df is None:
+        print(f"❌ Error: {INPUT_PATH} not found. Run `datashield anonymize` first.")
+        return 1
+    max_t = audit_t_closeness(df, plot=not args.no_plot)
+    return 1 if args.max_t is not None and max_t > args.max_t else 0
+
+def run_plot(args):
+    charts = ["k", "l", "t"] if args.chart == "all" else [args.chart]
+    if "k" in charts:
+        from risk_analyser import load_data
+        from visualise_k_anonimity import ClassTableWalker, plot_history, simulate_steps, QUASI_IDENTIFIERS, SENSITIVE
+        df = load_data()
+        if df is None: return 1
+        plot_history(simulate_steps(df, ClassTableWalker(df, QUASI_IDENTIFIERS, SENSITIVE)))
+    if "l" in charts and run_audit_l(argparse.Namespace(min_l=2, no_plot=False, strict=False)):
+        return 1
+    if "t" in charts and run_audit_t(argparse.Namespace(no_plot=False, max_t=None)):
+        return 1
+    return 0
+
+# name -> (modules imported before running, handler, help)
+COMMANDS = {
+    "risk": (["risk_analyser"], run_risk, "k-anonymity risk report of the raw dataset"),
+    "anonymize": (["anonymiser"], run_anonymize, "generalize + suppress, write the released files"),
+    "cube": (["risk_cube"], run_cube, "k / uniques of every QI subset, most identifying first"),
+    "link": (["linkage"], run_link, "linkage attack of the release with an auxiliary table"),
+    "audit-l": (["visualise_l_diversity"], run_audit_l, "l-diversity audit of the intermediate and final files"),
+    "audit-t": (["visualise_t_closeness"], run_audit_t, "t-closeness audit of the final file"),
+    "plot": (["visualise_k_anonimity", "visualise_l_diversity", "visualise_t_closeness"], run_plot,
+             "render the k / l / t charts"),
+}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="datashield", description="Privacy risk analysis and anonymization of the Adult dataset.")
+    # Imports the subcommand's modules and exits (start-up measurement, see benchmark_startup.py)
+    parser.add_argument("--startup-only", action="store_true", help=argparse.SUPPRESS)
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, (_, _, help_text) in COMMANDS.items():
+        commands.add_parser(name, help=help_text)
+    sub = commands.choices
+    sub["risk"].add_argument("--input", help="raw file (default: data/adult.data)")
+    sub["risk"].add_argument("--approx", action="store_true", help="one-pass sketch estimate (files too large for memory)")
+    sub["cube"].add_argument("--input", help="raw file (default: data/adult.data)")
+    sub["cube"].add_argument("--columns", help="comma-separated columns (default: QIs + candidate columns)")
+    sub["cube"].add_argument("-k", type=int, default=5)
+    sub["cube"].add_argument("--top", type=int, default=15)
+    sub["link"].add_argument("aux", help="auxiliary CSV (with header) / Parquet with raw QI columns")
+    sub["link"].add_argument("--release", help="anonymized release (default: data/adult_anonymized.csv)")
+    sub["anonymize"].add_argument("--input", help="raw file (default: data/adult.data)")
+    sub["anonymize"].add_argument("--dry-run", action="store_true", help="do not write the released files")
+    for name in ("audit-l", "audit-t"):
+        sub[name].add_argument("--no-plot", action="store_true", help="report only, no chart (no plotting libraries loaded)")
+    sub["audit-l"].add_argument("--min-l", type=int, default=2)
+    sub["audit-l"].add_argument("--strict", action="store_true", help="exit 1 when the release has groups below --min-l")
+    sub["audit-t"].add_argument("--max-t", type=float, help="exit 1 when the worst group exceeds this t")
+    sub["plot"].add_argument("chart", nargs="?", choices=["k", "l", "t", "all"], default="all")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    modules, handler, _ = COMMANDS[args.command]
+    for module in modules:
+        importlib.import_module(module)
+    if args.startup_only:
+        print(json.dumps({m: m in sys.modules for m in HEAVY_MODULES}))
+        return 0
+    return handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import pandas as pd
+import numpy as np
+import json
+
+# Label of the top level of a hierarchy (value fully suppressed)
+SUPPRESSED = "*"
+
+# --- HIERARCHY DEFINITIONS ---
+class IntervalHierarchy:
+    """Numeric QI. Every level above 0 (raw) is a set of right-open bins given by their edges."""
+    kind = "interval"
+
+    def __init__(self, levels):
+        # levels: [(edges, labels), ...] from the finest to the coarsest, len(labels) == len(edges) + 1
+        self.levels = [(np.asarray(edges, dtype=float), list(labels)) for edges, labels in levels]
+
+    @property
+    def height(self):
+        return len(self.levels)
+
+    def labels(self, level):
+        # Missing values are suppressed at every level, so every level has the SUPPRESSED label
+        labels = self.levels[level - 1][1]
+        return labels if SUPPRESSED in labels else labels + [SUPPRESSED]
+
+    def lookup(self, values, level):
+        """Label index (in labels(level)) of each raw value. Missing values get SUPPRESSED (searchsorted would bin NaN last)."""
+        edges, _ = self.levels[level - 1]
+        numbers = pd.to_numeric(pd.Series(values)).to_numpy(dtype=float)
+        bins = np.searchsorted(edges, numbers, side='right')
+        return np.where(np.isnan(numbers), self.labels(level).index(SUPPRESSED), bins)
+
+    def to_dict(self):
+        return {"type": self.kind, "levels": [{"edges": e.tolist(), "labels": l} for e, l in self.levels]}
+
+
+class CategoricalHierarchy:
+    """Categorical QI. Every level above 0 (raw) is a value -> ancestor table with a default ancestor."""
+    kind = "categorical"
+
+    def __init__(self, levels):
+        # levels: [(table, default), ...] from the finest to the coarsest
+        self.levels = [(dict(table), default) for table, default in levels]
+
+    @property
+    def height(self):
+        return len(self.levels)
+
+    def labels(self, level):
+        table, default = self.levels[level - 1]
+        return sorted(set(table.values()) | {default})
+
+    def lookup(self, values, level):
+        """Label index (in labels(level)) of each raw value. Unknown and missing values get the default."""
+        table, default = self.levels[level - 1]
+        index = {label: i for i, label in enumerate(self.labels(level))}
+        return np.array([index[table.get(str(v).strip(), default)] for v in values], dtype=np.int64)
+
+    def to_dict(self):
+        return {"type": self.kind, "levels": [{"map": t, "default": d} for t, d in self.levels]}
+
+
+def _decades():
+    edges = list(range(20, 100, 10))
+    labels = ["<20"] + [f"{lo}-{lo + 9}" for lo in edges[:-1]] + [f"{edges[-1]}+"]
+    return edges, labels
+
+MARITAL_STATUSES = [
+    "Married-civ-spouse", "Married-spouse-absent", "Married-AF-spouse",
+    "Divorced", "Separated", "Widowed", "Never-married"
+]
+
+# --- REGISTRY ---
+HIERARCHIES = {
+    "age": IntervalHierarchy([
+        _decades(),
+        ([30, 50, 70], ["<30", "30-49", "50-69", "70+"]),
+        ([], [SUPPRESSED]),
+    ]),
+    "sex": CategoricalHierarchy([
+        ({}, "Person"),
+    ]),
+    "race": CategoricalHierarchy([
+        ({"White": "White"}, "Other"),
+        ({}, SUPPRESSED),
+    ]),
+    "native-country": CategoricalHierarchy([
+        ({"United-States": "US"}, "Non-US"),
+        ({}, SUPPRESSED),
+    ]),
+    # Closed domain: unknown or misspelled statuses are suppressed, not merged into a real group
+    "marital-status": CategoricalHierarchy([
+        ({m: ("Married" if m.startswith("Married") else "Never-married" if m == "Never-married" else "Previously-married")
+          for m in MARITAL_STATUSES}, SUPPRESSED),
+        ({m: "Married" if m.startswith("Married") else "Single" for m in MARITAL_STATUSES}, SUPPRESSED),
+        ({}, SUPPRESSED),
+    ]),
+}
+
+def hierarchy_from_dict(spec):
+    if spec["type"] == IntervalHierarchy.kind:
+        return IntervalHierarchy([(lvl["edges"], lvl["labels"]) for lvl in spec["levels"]])
+    if spec["type"] == CategoricalHierarchy.kind:
+        return CategoricalHierarchy([(lvl["map"], lvl["default"]) for lvl in spec["levels"]])
+    raise ValueError(f"Unknown hierarchy type: {spec['type']}")
+
+def load_hierarchies(path):
+    """Loads a registry from a JSON file ({qi: {"type": ..., "levels": [...]}})."""
+    with open(path) as f:
+        return {name: hierarchy_from_dict(spec) for name, spec in json.load(f).items()}
+
+def save_hierarchies(path, registry=None):
+    registry = registry or HIERARCHIES
+    with open(path, "w") as f:
+        json.dump({name: h.to_dict() for name, h in registry.items()}, f, indent=2)
+
+
+# --- COMPILED FORM ---
+class CompiledHierarchy:
+    """A hierarchy bound to one column: one code per row plus one code map per level.
+
+    Every level is applied with a single array take (maps[level][codes]).
+    Categories are sorted lexically, so groupby order matches plain strings.
+    """
+
+    def __init__(self, hierarchy, column):
+        self.hierarchy = hierarchy
+        codes, uniques = pd.factorize(column, sort=True)
+        # Missing values get code -1, which indexes the extra last slot of every map
+        self.codes = codes
+        self.uniques = np.asarray(uniques)
+        raw_map = np.arange(len(uniques) + 1)
+        raw_map[-1] = -1
+        self.maps = [raw_map]
+        self.labels = [pd.Index(uniques)]
+
+        values = list(uniques) + [np.nan]
+        for level in range(1, hierarchy.height + 1):
+            labels = np.asarray(hierarchy.labels(level), dtype=object)
+            order = np.argsort(labels, kind='stable')
+            rank = np.empty(len(labels), dtype=np.int64)
+            rank[order] = np.arange(len(labels))
+            self.maps.append(rank[hierarchy.lookup(values, level)])
+            self.labels.append(pd.Index(labels[order]))
+
+    @property
+    def height(self):
+        return self.hierarchy.height
+
+    def level_codes(self, level):
+        """Integer label codes of every row at the given level."""
+        return self.maps[level][self.codes]
+
+    def generalize(self, level):
+        """The column generalized to the given level, as a categorical."""
+        return pd.Categorical.from_codes(self.level_codes(level), categories=self.labels[level])
+
+    def rollup(self, src, dst):
+        """Code map from level src to the coarser level dst (table[src_code] -> dst_code).
+
+        From the raw level the table is indexed by level_codes(0) (missing = -1 -> last slot).
+        Only labels observed in the column are mapped; the others point to 0.
+        """
+        if src == 0:
+            return self.maps[dst]
+        table = np.zeros(len(self.labels[src]), dtype=np.int64)
+        table[self.maps[src]] = self.maps[dst]
+        return table
+
+def compile_hierarchies(df, qi_list, registry=None):
+    registry = registry or HIERARCHIES
+    return {qi: CompiledHierarchy(registry[qi], df[qi]) for qi in qi_list}
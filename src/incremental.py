@@ -0,0 +1,295 @@
+import numpy as np
+import pandas as pd
+import json
+import os
+import sys
+from dataclasses import dataclass
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import COLUMNS, QUASI_IDENTIFIERS
+    from anonymiser import anonymize_dataset, GENERALIZATION_LEVELS, SENSITIVE_ATTRIBUTE, STORE_FORMAT
+    from artefact_store import save_dataset, load_dataset, dataset_path
+except ImportError:
+    sys.exit("❌ Error: risk_analyser.py / anonymiser.py not found")
+
+# CONFIGURATION
+# Persisted class statistics and the rows held back by suppression
+STATE_DIR = os.path.join(current_dir, "../data/incremental")
+# The feed's own outputs: the batch pipeline's release (anonymiser.FINAL_PATH) is never touched
+INTERMEDIATE_PATH = os.path.join(current_dir, "../data/adult_anonymized_incremental_intermediate.csv")
+FINAL_PATH = os.path.join(current_dir, "../data/adult_anonymized_incremental.csv")
+MIN_L = 2
+# The per-batch deltas are folded into a snapshot every COMPACT_EVERY batches
+COMPACT_EVERY = 50
+
+# --- STATE ---
+# classes[c, s] = rows of equivalence class c (generalized QI values) with sensitive
+# value s, over the whole history. Distinct l-diversity only grows when rows are
+# added, so a class is released (l >= min_l) for good: its future rows are released
+# immediately. The rows of the other classes are held back in "pending" (per class)
+# until their class is released.
+#
+# On disk (state_dir), in STORE_FORMAT:
+#   snapshot_classes_<b> / snapshot_pending_<b>   full state after batch b (state.json "snapshot")
+#   classes_<b>      absolute counts of the classes batch b touched (long: QIs, sensitive, count)
+#   pending_<b>      rows batch b held back
+# A batch only writes its own deltas; loading replays the deltas after the snapshot and
+# drops the pending rows whose class has been released since.
+
+@dataclass
+class BatchResult:
+    rows: int
+    generalized: pd.DataFrame       # the batch after generalization (pre-suppression)
+    released: pd.DataFrame          # rows to append to the release (this batch + newly released pending ones)
+    newly_released: pd.Index        # classes reaching l >= min_l with this batch
+    newly_violating: pd.Index       # classes first seen in this batch, held back (l < min_l)
+    touched: int = 0
+    pending_rows: int = 0
+
+
+class ClassTable:
+    """Sensitive histogram of every class, keyed by class: merges update the rows in place.
+
+    The counts array grows by doubling, so adding classes never copies the table per batch.
+    """
+
+    def __init__(self):
+        self.keys = []          # class key (tuple of QI labels) of every row
+        self.rows = {}          # class key -> row
+        self.values = []        # sensitive value of every column
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _reserve(self, n_rows, n_values):
+        capacity, width = self.counts.shape
+        if n_rows > capacity or n_values > width:
+            grown = np.zeros((max(n_rows, 2 * capacity), max(n_values, width)), dtype=np.int64)
+            grown[:capacity, :width] = self.counts
+            self.counts = grown
+
+    def merge(self, batch):
+        """Adds a classes x sensitive values frame of counts. Returns (row of each class, counts before)."""
+        ids = np.empty(len(batch), dtype=np.int64)
+        for i, key in enumerate(batch.index):
+            row = self.rows.get(key)
+            if row is None:
+                row = self.rows[key] = len(self.keys)
+                self.keys.append(key)
+            ids[i] = row
+        self.values += [v for v in batch.columns if v not in self.values]
+        self._reserve(len(self.keys), len(self.values))
+        columns = [self.values.index(v) for v in batch.columns]
+        before = self.counts[ids]
+        self.counts[ids[:, None], columns] += batch.to_numpy()
+        return ids, before
+
+    def l_distinct(self, ids):
+        return np.count_nonzero(self.counts[ids, :len(self.values)], axis=1)
+
+    def to_long(self, ids=None):
+        """(QIs..., sensitive, count) rows of the given classes (all by default), zero counts left out."""
+        ids = np.arange(len(self.keys)) if ids is None else np.asarray(ids)
+        counts = self.counts[ids, :len(self.values)]
+        nonzero = np.nonzero(counts)
+        keys = [self.keys[i] for i in ids[nonzero[0]]]
+        return keys, np.asarray(self.values, dtype=object)[nonzero[1]], counts[nonzero]
+
+
+class IncrementalAnonymiser:
+    """Full-domain generalization + l-diversity suppression of an append-only feed.
+
+    Every batch is generalized with the fixed levels, merged into the persisted
+    class histograms and released class by class. The work per batch (persistence
+    included) is proportional to the batch, the classes it touches and the held-back
+    rows of the classes it releases, never to the history already released.
+    """
+
+    def __init__(self, state_dir=STATE_DIR, qi_list=QUASI_IDENTIFIERS, sensitive_col=SENSITIVE_ATTRIBUTE,
+                 min_l=MIN_L, levels=GENERALIZATION_LEVELS, compact_every=COMPACT_EVERY):
+        self.state_dir = state_dir
+        self.qi_list = list(qi_list)
+        self.sensitive_col = sensitive_col
+        self.min_l = min_l
+        self.levels = dict(levels)
+        self.compact_every = compact_every
+        self.batches = 0
+        self.snapshot = 0
+        self.classes = ClassTable()
+        self.pending = {}           # class key -> held-back rows (list of frames)
+        self.pending_rows = 0
+        self._load()
+
+    # --- PERSISTENCE ---
+    def _path(self, name, batch=None):
+        return os.path.join(self.state_dir, name if batch is None else f"{name}_{batch:06d}.csv")
+
+    def _config(self):
+        return {"quasi_identifiers": self.qi_list, "sensitive": self.sensitive_col,
+                "min_l": self.min_l, "levels": self.levels}
+
+    def _long_names(self):
+        return self.qi_list + [self.sensitive_col, "count"]
+
+    def _load(self):
+        if not os.path.exists(self._path("state.json")): return
+        with open(self._path("state.json")) as f:
+            state = json.load(f)
+        if state["config"] != self._config():
+            raise ValueError(f"Incremental state in {self.state_dir} was built with {state['config']}, "
+                             f"not {self._config()}: reset it to change the settings")
+        self.batches, self.snapshot = state["batches"], state.get("snapshot", 0)
+        # The snapshot, then the deltas in batch order (the last count of a class is its current one)
+        parts = [("snapshot_classes", "snapshot_pending", self.snapshot)] if self.snapshot else []
+        parts += [("classes", "pending", b) for b in range(self.snapshot + 1, self.batches + 1)]
+        longs, pending = [], []
+        for classes_name, pending_name, batch in parts:
+            long, _ = load_dataset(self._path(classes_name, batch), self._long_names())
+            rows, _ = load_dataset(self._path(pending_name, batch), COLUMNS)
+            if long is not None: longs.append(long)
+            if rows is not None: pending.append(rows)
+        if longs:
+            long = pd.concat(longs, ignore_index=True).astype({c: str for c in self.qi_list + [self.sensitive_col]})
+            long = long.drop_duplicates(self.qi_list + [self.sensitive_col], keep="last")
+            self.classes.merge(long.set_index(self.qi_list + [self.sensitive_col])["count"].unstack(fill_value=0))
+        if pending:
+            rows = pd.concat(pending, ignore_index=True)
+            ids = np.array([self.classes.rows[key] for key in self._class_index(rows)], dtype=np.int64)
+            held = self.classes.l_distinct(ids) < self.min_l
+            self._hold(rows[held], ids[held])
+
+    def _save_deltas(self, ids, held):
+        os.makedirs(self.state_dir, exist_ok=True)
+        keys, values, counts = self.classes.to_long(ids)
+        long = pd.DataFrame(keys, columns=self.qi_list)
+        long[self.sensitive_col] = values
+        long["count"] = counts
+        save_dataset(long, self._path("classes", self.batches), STORE_FORMAT)
+        if len(held):
+            save_dataset(held, self._path("pending", self.batches), STORE_FORMAT)
+
+    def _write_state(self):
+        with open(self._path("state.json"), "w") as f:
+            json.dump({"config": self._config(), "batches": self.batches, "snapshot": self.snapshot,
+                       "rows": int(self.classes.counts.sum())}, f, indent=2)
+
+    def _remove(self, name, batch):
+        path = dataset_path(self._path(name, batch))
+        if path: os.remove(path)
+
+    def compact(self):
+        """Folds the deltas into a new snapshot (the only write proportional to the whole state)."""
+        os.makedirs(self.state_dir, exist_ok=True)
+        keys, values, counts = self.classes.to_long()
+        long = pd.DataFrame(keys, columns=self.qi_list)
+        long[self.sensitive_col] = values
+        long["count"] = counts
+        save_dataset(long, self._path("snapshot_classes", self.batches), STORE_FORMAT)
+        pending = [rows for frames in self.pending.values() for rows in frames]
+        if pending:
+            save_dataset(pd.concat(pending, ignore_index=True), self._path("snapshot_pending", self.batches), STORE_FORMAT)
+        # The old files go only once state.json points at the new snapshot
+        previous, self.snapshot = self.snapshot, self.batches
+        self._write_state()
+        for name in ("snapshot_classes", "snapshot_pending"):
+            if previous: self._remove(name, previous)
+        for batch in range(previous + 1, self.batches + 1):
+            self._remove("classes", batch)
+            self._remove("pending", batch)
+
+    # --- BATCHES ---
+    def _class_index(self, df):
+        return pd.MultiIndex.from_frame(df[self.qi_list].astype(str))
+
+    def _hold(self, rows, ids):
+        for row_id, group in rows.groupby(ids, sort=False):
+            self.pending.setdefault(self.classes.keys[row_id], []).append(group)
+        self.pending_rows += len(rows)
+
+    def add_batch(self, df):
+        """Generalizes and merges a batch of raw rows. Returns a BatchResult (state saved)."""
+        gen = anonymize_dataset(df, self.levels, verbose=False).reset_index(drop=True)
+        keys = self._class_index(gen)
+        batch = (gen[self.qi_list + [self.sensitive_col]].astype(str)
+                 .groupby(self.qi_list + [self.sensitive_col]).size().unstack(fill_value=0))
+        batch.columns.name = None
+
+        n_before = len(self.classes)
+        ids, before = self.classes.merge(batch)
+        seen = ids < n_before
+        released_before = np.count_nonzero(before, axis=1) >= self.min_l
+        released_after = self.classes.l_distinct(ids) >= self.min_l
+
+        newly_released = batch.index[released_after & ~released_before]
+        from_pending = [rows for key in newly_released for rows in self.pending.pop(key, [])]
+        self.pending_rows -= sum(len(rows) for rows in from_pending)
+        row_class = batch.index.get_indexer(keys)
+        row_released = released_after[row_class]
+        released = pd.concat(from_pending + [gen[row_released]], ignore_index=True)
+        held = gen[~row_released]
+        self._hold(held, ids[row_class[~row_released]])
+
+        self.batches += 1
+        self._save_deltas(ids, held)
+        self._write_state()
+        if self.batches - self.snapshot >= self.compact_every:
+            self.compact()
+        return BatchResult(rows=len(gen), generalized=gen, released=released, newly_released=newly_released,
+                           newly_violating=batch.index[~seen & ~released_after], touched=len(batch),
+                           pending_rows=self.pending_rows)
+
+def reset_state(state_dir=STATE_DIR):
+    for name in os.listdir(state_dir) if os.path.isdir(state_dir) else []:
+        os.remove(os.path.join(state_dir, name))
+
+def append_batch(df, anonymiser=None, intermediate_path=INTERMEDIATE_PATH, final_path=FINAL_PATH, overwrite=False):
+    """Runs one batch and appends its generalized rows and its released rows to the CSV outputs.
+
+    The first batch of a feed starts the outputs afresh: it refuses to replace an existing
+    file unless overwrite is set.
+    """
+    anonymiser = anonymiser or IncrementalAnonymiser()
+    first = anonymiser.batches == 0
+    if first and not overwrite:
+        existing = [p for p in (intermediate_path, final_path) if os.path.exists(p)]
+        if existing:
+            raise FileExistsError(f"{', '.join(existing)} already exists: pass overwrite=True (--overwrite) to replace it")
+    result = anonymiser.add_batch(df)
+    mode = 'w' if first else 'a'
+    result.generalized.to_csv(intermediate_path, index=False, header=False, mode=mode)
+    result.released.to_csv(final_path, index=False, header=False, mode=mode)
+
+    print(f"[*] Batch {anonymiser.batches}: {result.rows} rows, {result.touched} classes touched.")
+    print(f"   ✅ Released {len(result.released)} rows ({len(result.newly_released)} classes newly l-diverse).")
+    print(f"   ⏸️  Held back: {result.pending_rows} rows in total.")
+    if len(result.newly_violating):
+        print(f"   ⚠️  {len(result.newly_violating)} new classes violate l >= {anonymiser.min_l}:")
+        for key in result.newly_violating[:10]:
+            print(f"      {dict(zip(anonymiser.qi_list, key))}")
+    return result
+
+if __name__ == "__main__":
+    # python incremental.py [--reset] [--overwrite] batch.csv [batch.csv ...]  (raw rows, same layout as adult.data)
+    print("\n🧩 --- INCREMENTAL ANONYMIZER ---")
+    args = sys.argv[1:]
+    if "--reset" in args:
+        reset_state()
+        args.remove("--reset")
+    overwrite = "--overwrite" in args
+    if overwrite:
+        args.remove("--overwrite")
+    if not args:
+        sys.exit("❌ Error: no batch file given.")
+    anonymiser = IncrementalAnonymiser()
+    for path in args:
+        if not os.path.exists(path):
+            sys.exit(f"❌ Error: {path} not found.")
+        try:
+            append_batch(pd.read_csv(path, names=COLUMNS, skipinitialspace=True), anonymiser, overwrite=overwrite)
+        except FileExistsError as e:
+            sys.exit(f"❌ Error: {e}")
+    print(f"💾 Appended to: {FINAL_PATH}")
@@ -0,0 +1,192 @@
+import pandas as pd
+import numpy as np
+import itertools
+import time
+import os
+import sys
+from dataclasses import dataclass, field
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import load_data, QUASI_IDENTIFIERS
+    from hierarchies import compile_hierarchies
+except ImportError:
+    sys.exit("❌ Error: risk_analyser.py / hierarchies.py not found")
+
+# CONFIGURATION
+SENSITIVE_ATTRIBUTE = "income"
+TARGET_K = 5
+TARGET_L = 2
+# Share of rows that may be suppressed (dropped) to satisfy k/l
+MAX_SUPPRESSION = 0.05
+# Ranking of the satisfying nodes: "height" (precision_loss) or a utility_metrics report
+# metric ("ncp", "entropy_bits", "discernibility", "c_avg")
+LOSS_METRIC = "height"
+
+# --- CLASS TABLES ---
+# A node of the lattice is a tuple of levels (one per QI). Its "class table" is
+# (keys, counts): keys[c] are the QI codes of equivalence class c and
+# counts[c, s] the number of rows of class c with sensitive value s.
+
+def group_keys(keys, cards):
+    """Dense group id of every row of keys (n x n_qi codes in [0, card)). Returns (ids, first_row)."""
+    if np.prod(np.asarray(cards, dtype=float)) >= 2 ** 62:
+        _, first, ids = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        return ids.ravel(), first
+    composite = np.zeros(len(keys), dtype=np.int64)
+    for i, card in enumerate(cards):
+        composite = composite * card + keys[:, i]
+    # factorize numbers groups by first appearance, so a new running max marks a first row
+    ids, _ = pd.factorize(composite)
+    running = np.maximum.accumulate(ids)
+    is_first = np.ones(len(ids), dtype=bool)
+    is_first[1:] = running[1:] > running[:-1]
+    return ids, np.flatnonzero(is_first)
+
+def aggregate(ids, n_groups, counts):
+    """Sums the rows of a count matrix that share a group id."""
+    n_values = counts.shape[1]
+    flat = (ids[:, None] * n_values + np.arange(n_values)).ravel()
+    return np.bincount(flat, weights=counts.ravel(), minlength=n_groups * n_values).reshape(n_groups, n_values).astype(np.int64)
+
+def cardinalities(compiled, qi_list, node):
+    return [len(compiled[qi].labels[lvl]) + (1 if lvl == 0 else 0) for qi, lvl in zip(qi_list, node)]
+
+def bottom_table(compiled, qi_list, sensitive_codes, n_values):
+    """Class table of the raw data (all QIs at level 0) - the only pass over the rows."""
+    node = tuple(0 for _ in qi_list)
+    cards = cardinalities(compiled, qi_list, node)
+    # Missing raw values (-1) go to the extra last slot
+    keys = np.column_stack([compiled[qi].codes % card for qi, card in zip(qi_list, cards)])
+    ids, first = group_keys(keys, cards)
+    counts = np.bincount(ids * n_values + sensitive_codes, minlength=len(first) * n_values)
+    return keys[first], counts.reshape(len(first), n_values)
+
+def rollup_table(table, compiled, qi_list, src, dst):
+    """Class table of node dst computed from the finer node src (classes merge, rows are never touched)."""
+    keys, counts = table
+    new_keys = keys.copy()
+    for i, qi in enumerate(qi_list):
+        if src[i] != dst[i]:
+            new_keys[:, i] = compiled[qi].rollup(src[i], dst[i])[keys[:, i]]
+    ids, first = group_keys(new_keys, cardinalities(compiled, qi_list, dst))
+    return new_keys[first], aggregate(ids, len(first), counts)
+
+# --- PRIVACY & LOSS ---
+def discernibility(sizes, suppressed, n_rows):
+    """Discernibility metric: every released row costs its class size, every suppressed row n."""
+    return int((np.asarray(sizes, dtype=np.int64) ** 2).sum()) + int(suppressed) * int(n_rows)
+
+def evaluate_table(counts, k, l=None):
+    """k, l and suppression of a class table when the classes violating k/l are suppressed."""
+    sizes = counts.sum(axis=1)
+    l_values = (counts > 0).sum(axis=1)
+    violating = sizes < k
+    if l: violating |= l_values < l
+    kept = sizes[~violating]
+    suppressed = int(sizes[violating].sum())
+    n_rows = int(sizes.sum())
+    return {
+        "k": int(kept.min()) if len(kept) else 0,
+        "l": int(l_values[~violating].min()) if len(kept) else 0,
+        "classes": int(len(kept)),
+        "suppressed": suppressed,
+        "discernibility": discernibility(kept, suppressed, n_rows),
+    }
+
+def precision_loss(node, heights):
+    """Average normalised generalization height (0 = raw data, 1 = everything suppressed)."""
+    return float(np.mean([lvl / h if h else 0.0 for lvl, h in zip(node, heights)]))
+
+@dataclass
+class LatticeResult:
+    levels: dict
+    loss: float
+    stats: dict
+    minimal_nodes: list = field(default_factory=list)
+    evaluated: int = 0
+    pruned: int = 0
+    total_nodes: int = 0
+    seconds: float = 0.0
+
+# --- SEARCH ---
+def search_lattice(df, qi_list, sensitive_col, k, l=None, max_suppression=0.0, registry=None, loss=precision_loss):
+    """Finds the minimal-loss node of the generalization lattice satisfying k (and l).
+
+    Bottom-up, breadth-first over the lattice height (Incognito style):
+      - k-anonymity, distinct l-diversity and the suppressed-row count are
+        monotone, so every generalization of a satisfying node is skipped;
+      - the class table of a node is rolled up from a direct predecessor
+        evaluated at the previous height, never from the raw rows.
+    Returns None when even the top node does not satisfy the constraints.
+    """
+    start = time.perf_counter()
+    compiled = compile_hierarchies(df, qi_list, registry)
+    heights = [compiled[qi].height for qi in qi_list]
+    sensitive_codes, sensitive_values = pd.factorize(df[sensitive_col])
+    max_rows = max_suppression * len(df)
+
+    nodes_by_height = {}
+    for node in itertools.product(*(range(h + 1) for h in heights)):
+        nodes_by_height.setdefault(sum(node), []).append(node)
+
+    minimal = []
+    previous = {}
+    evaluated = pruned = 0
+    for height in sorted(nodes_by_height):
+        current = {}
+        for node in nodes_by_height[height]:
+            if any(all(a >= b for a, b in zip(node, m)) for m, _ in minimal):
+                pruned += 1
+                continue
+            if height == 0:
+                table = bottom_table(compiled, qi_list, sensitive_codes, len(sensitive_values))
+            else:
+                preds = [node[:i] + (node[i] - 1,) + node[i + 1:] for i in range(len(node)) if node[i] > 0]
+                src = min((p for p in preds if p in previous), key=lambda p: len(previous[p][0]))
+                table = rollup_table(previous[src], compiled, qi_list, src, node)
+            evaluated += 1
+            stats = evaluate_table(table[1], k, l)
+            if stats["suppressed"] <= max_rows:
+                minimal.append((node, stats))
+            else:
+                current[node] = table
+        previous = current
+
+    if not minimal:
+        return None
+    best, stats = min(minimal, key=lambda m: (loss(m[0], heights), m[1]["discernibility"]))
+    return LatticeResult(
+        levels=dict(zip(qi_list, best)),
+        loss=loss(best, heights),
+        stats=stats,
+        minimal_nodes=[(dict(zip(qi_list, m)), loss(m, heights), s) for m, s in minimal],
+        evaluated=evaluated,
+        pruned=pruned,
+        total_nodes=sum(len(v) for v in nodes_by_height.values()),
+        seconds=time.perf_counter() - start,
+    )
+
+if __name__ == "__main__":
+    print("\n🧭 --- OPTIMAL GENERALIZATION SEARCH ---")
+    df = load_data()
+    if df is None: sys.exit(1)
+
+    loss = precision_loss
+    if LOSS_METRIC != "height":
+        from utility_metrics import UtilityModel
+        loss = UtilityModel(df, QUASI_IDENTIFIERS, SENSITIVE_ATTRIBUTE).loss(LOSS_METRIC, TARGET_K, TARGET_L)
+    print(f"[*] Searching the lattice for k >= {TARGET_K}, l >= {TARGET_L}, suppression <= {MAX_SUPPRESSION:.0%}...")
+    result = search_lattice(df, QUASI_IDENTIFIERS, SENSITIVE_ATTRIBUTE, TARGET_K, TARGET_L, MAX_SUPPRESSION, loss=loss)
+    if result is None:
+        sys.exit("❌ No combination of levels satisfies the constraints.")
+
+    print(f"   👉 Nodes: {result.total_nodes} | Evaluated: {result.evaluated} | Pruned: {result.pruned} | Time: {result.seconds:.2f}s")
+    print(f"\n{'Levels':<40} | {'Loss':<6} | {'k':<5} | {'l':<3} | {'Suppressed'}")
+    print("-" * 75)
+    for levels, node_loss, stats in sorted(result.minimal_nodes, key=lambda m: m[1])[:10]:
+        print(f"{str(tuple(levels.values())):<40} | {node_loss:.3f}  | {stats['k']:<5} | {stats['l']:<3} | {stats['suppressed']}")
+    print("-" * 75)
+    print(f"✅ OPTIMAL LEVELS: {result.levels} (k={result.stats['k']}, suppressed {result.stats['suppressed']} rows)")
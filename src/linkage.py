@@ -0,0 +1,180 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import load_data, DATA_PATH, QUASI_IDENTIFIERS
+    from anonymiser import anonymize_dataset, FINAL_PATH, GENERALIZATION_LEVELS, SENSITIVE_ATTRIBUTE, STORE_FORMAT
+    from artefact_store import save_dataset, read_columnar, read_metadata, store_path
+    from class_index import open_index
+    from synthetic_data import generate_chunk, load_model, model_fingerprint, SYNTHETIC_DIR, SEED
+    from tracing import span
+except ImportError:
+    sys.exit("❌ Error: risk_analyser.py / anonymiser.py / class_index.py not found")
+
+# CONFIGURATION
+# Written in STORE_FORMAT (data/linkage_results.parquet by default)
+RESULTS_PATH = store_path(os.path.join(current_dir, "../data/linkage_results.csv"), STORE_FORMAT)
+# Share of the voter list drawn from the real respondents of the raw file (the rest is synthetic)
+VOTER_OVERLAP = 0.5
+# Match-set sizes reported as buckets
+MATCH_BUCKETS = [1, 2, 5, 10, 100]
+CONFIDENT = 0.9
+
+# --- ATTACK ---
+# The attacker knows the QIs of every voter, and the hierarchies and levels of the
+# release (published in its metadata). Each voter is generalized exactly as
+# anonymize_dataset generalized the release, then looked up in the release's class index
+# (sorted 64-bit keys of the encoded QI labels, class_index.py): one vectorized
+# searchsorted for the whole list. The voter's match set is the class it falls in, and
+# the class's sensitive histogram / size is the inferred distribution of its value.
+
+def voter_path(n_rows, overlap=VOTER_OVERLAP, seed=SEED):
+    # Keyed on everything the list depends on, so a cached list is only reused when identical
+    return os.path.join(SYNTHETIC_DIR, f"voters_{n_rows}_{overlap:g}_{seed}_{model_fingerprint()}.csv")
+
+def make_voter_list(n_rows, overlap=VOTER_OVERLAP, raw_path=DATA_PATH, seed=SEED):
+    """A voter list: voter_id + QIs, `overlap` of it drawn from the raw file's respondents.
+
+    The income of every voter is kept in its own column to score the attack; the attack never reads it.
+    """
+    raw = load_data(raw_path, columns=QUASI_IDENTIFIERS + [SENSITIVE_ATTRIBUTE])
+    if raw is None: return None
+    rng = np.random.default_rng(seed)
+    n_real = int(round(n_rows * overlap))
+    real = raw.iloc[rng.integers(0, len(raw), n_real)].assign(respondent=True)
+    synthetic = generate_chunk(n_rows - n_real, load_model(), seed)[QUASI_IDENTIFIERS + [SENSITIVE_ATTRIBUTE]]
+    voters = pd.concat([real, synthetic.assign(respondent=False)], ignore_index=True)
+    voters = voters.astype({c: "category" for c in QUASI_IDENTIFIERS + [SENSITIVE_ATTRIBUTE]})
+    voters = voters.iloc[rng.permutation(len(voters))].reset_index(drop=True)
+    voters.insert(0, "voter_id", np.arange(len(voters)))
+    return voters
+
+def load_auxiliary(path, qi_list=QUASI_IDENTIFIERS):
+    """Auxiliary table from Parquet / Arrow, or from a CSV with a header; the QI columns must be raw values."""
+    with span("io.load_auxiliary", path=path) as s:
+        if path.endswith((".parquet", ".arrow")):
+            aux, _ = read_columnar(path)
+        else:
+            aux = pd.read_csv(path, skipinitialspace=True, dtype={qi: "category" for qi in qi_list if qi != "age"})
+        missing = [qi for qi in qi_list if qi not in aux.columns]
+        if missing:
+            raise ValueError(f"auxiliary table has no {', '.join(missing)} column")
+        s.rows_out = len(aux)
+    return aux
+
+def release_levels(release_path=FINAL_PATH):
+    """Generalization levels of the release, from its metadata (the configured ones for a CSV-only release)."""
+    copy = store_path(release_path, STORE_FORMAT)
+    metadata = read_metadata(copy) if STORE_FORMAT != "csv" and os.path.exists(copy) else {}
+    if metadata.get("mode") == "mondrian":
+        raise ValueError("Mondrian releases have per-partition ranges, not hierarchy levels: nothing to generalize the voters with")
+    return metadata.get("levels") or GENERALIZATION_LEVELS
+
+def link(index, aux, levels):
+    """Match-set size and inferred sensitive distribution of every auxiliary record.
+
+    Returns a frame aligned with aux: match_size (0 = not in the release) and one
+    probability column per sensitive value (NaN when unmatched).
+    """
+    with span("linkage.generalize", rows_in=len(aux)):
+        generalized = anonymize_dataset(aux[list(levels)], levels, verbose=False)
+    with span("linkage.lookup", rows_in=len(aux)):
+        class_ids = index.lookup(generalized)
+    with span("linkage.probabilities", rows_in=len(aux)):
+        matched = class_ids >= 0
+        counts = np.zeros((len(aux), len(index.values)))
+        counts[matched] = index.counts[class_ids[matched]]
+        sizes = counts.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            probabilities = counts / sizes[:, None]
+    result = pd.DataFrame(probabilities, columns=[f"p({v})" for v in index.values], index=aux.index)
+    result.insert(0, "match_size", sizes.astype(np.int64))
+    result.insert(1, "class_id", class_ids)
+    return result
+
+def summarise(result, truth=None, values=None):
+    """Share of voters per match-set bucket, confident inferences and (with the truth) their accuracy."""
+    n = len(result)
+    sizes = result["match_size"].to_numpy()
+    p = result.filter(like="p(").to_numpy()
+    matched = sizes > 0
+    edges = [0] + MATCH_BUCKETS + [np.inf]
+    buckets = {("not in release" if lo == 0 else f"{lo}" if hi == lo + 1 else f"{lo}-{hi - 1}" if hi < np.inf else f"{lo}+"):
+               int(np.count_nonzero((sizes >= lo) & (sizes < hi))) for lo, hi in zip(edges[:-1], edges[1:])}
+    best = np.where(matched, np.nanargmax(np.where(matched[:, None], p, 0), axis=1), -1)
+    confidence = np.where(matched, np.nanmax(np.where(matched[:, None], p, 0), axis=1), 0.0)
+    summary = {
+        "voters": n,
+        "matched": int(matched.sum()),
+        "buckets": buckets,
+        "confident": int(np.count_nonzero(confidence >= CONFIDENT)),
+        "certain": int(np.count_nonzero(confidence == 1.0)),
+    }
+    if truth is not None:
+        truth_codes = pd.Index(values).get_indexer(truth.astype(object))
+        correct = matched & (best == truth_codes)
+        # Baseline: always guessing the most frequent value of the release
+        prior = int(np.argmax(np.asarray(result.filter(like="p(")[matched].mean())))
+        summary["accuracy"] = float(correct.sum() / matched.sum()) if matched.any() else 0.0
+        summary["baseline"] = float(np.mean(truth_codes[matched] == prior)) if matched.any() else 0.0
+    return summary
+
+def print_summary(summary):
+    n = summary["voters"]
+    print(f"\n🎯 LINKAGE ATTACK ({n:,} auxiliary records):")
+    print(f"   Matched a class of the release: {summary['matched']:,} ({summary['matched'] / n:.1%})")
+    print(f"   {'Match-set size':<16} | {'Records':>10} | {'Share':>6}")
+    for bucket, count in summary["buckets"].items():
+        print(f"   {bucket:<16} | {count:>10,} | {count / n:>6.1%}")
+    print(f"   Sensitive value inferred with p >= {CONFIDENT}: {summary['confident']:,} records "
+          f"({summary['certain']:,} with certainty)")
+    if "accuracy" in summary:
+        print(f"   Inference accuracy on the matched records: {summary['accuracy']:.1%} "
+              f"(majority-value baseline {summary['baseline']:.1%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Linkage attack of the anonymized release with an auxiliary table.")
+    parser.add_argument("--aux", help="auxiliary CSV (with header) / Parquet with raw QI columns (default: a synthetic voter list)")
+    parser.add_argument("--voters", type=float, default=100_000, help="size of the generated voter list")
+    parser.add_argument("--overlap", type=float, default=VOTER_OVERLAP, help="share of voters who are respondents")
+    parser.add_argument("--release", default=FINAL_PATH, help="anonymized release (CSV path; its index is built next to it)")
+    parser.add_argument("--no-save", action="store_true", help="do not write the per-record results")
+    args = parser.parse_args()
+
+    print("\n🕵️  --- LINKAGE ATTACK SIMULATOR ---")
+    aux_path = args.aux
+    if aux_path is None:
+        aux_path = voter_path(int(args.voters), args.overlap)
+        if not os.path.exists(aux_path):
+            voters = make_voter_list(int(args.voters), args.overlap)
+            if voters is None: sys.exit(1)
+            os.makedirs(SYNTHETIC_DIR, exist_ok=True)
+            voters.to_csv(aux_path, index=False)
+            print(f"💾 Synthetic voter list written to {aux_path}")
+    start = time.perf_counter()
+    try:
+        index = open_index(path=args.release)
+        levels = release_levels(args.release)
+        aux = load_auxiliary(aux_path, list(levels))
+    except (FileNotFoundError, ValueError) as e:
+        sys.exit(f"❌ Error: {e}")
+    loaded = time.perf_counter()
+    result = link(index, aux, levels)
+    linked = time.perf_counter()
+    print(f"[*] Release: {index.n_rows:,} rows in {index.n_classes:,} classes; levels {levels}")
+    print(f"[*] Loaded in {loaded - start:.2f}s, linked in {linked - loaded:.2f}s "
+          f"({len(aux) / max(linked - loaded, 1e-9):,.0f} records/s)")
+
+    truth = aux[SENSITIVE_ATTRIBUTE] if SENSITIVE_ATTRIBUTE in aux.columns else None
+    print_summary(summarise(result, truth, index.values))
+    if not args.no_save:
+        keep = [c for c in ("voter_id",) if c in aux.columns]
+        saved = save_dataset(pd.concat([aux[keep], result], axis=1), RESULTS_PATH, STORE_FORMAT)
+        print(f"💾 Per-record results saved to {saved}")
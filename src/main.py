@@ -1,82 +1,338 @@
-import subprocess
 import sys
 import os
 import time
+import threading
+import io
+import pickle
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
 
-# Define the sequence of scripts to run
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import load_data, report_risk, DATA_PATH, QUASI_IDENTIFIERS
+    import anonymiser
+    from anonymiser import run_anonymization, save_outputs
+    from artefact_store import store_path
+    from hierarchies import HIERARCHIES
+    from result_cache import ResultCache, make_key, code_version
+    import tracing
+    import visualise_k_anonimity
+    import visualise_l_diversity
+    import visualise_t_closeness
+    import utility_metrics
+except ImportError:
+    sys.exit("❌ Error: pipeline scripts not found in src/")
+
+# CONFIGURATION
+WRITE_DATASETS = True     # Save the intermediate/final datasets (optional sink, see anonymiser.STORE_FORMAT)
+MAX_PARALLEL_STEPS = 3    # Independent steps (e.g. the three charts) run concurrently
+TRACK_MEMORY = False      # Peak memory per step with tracemalloc (roughly doubles the runtime)
+USE_CACHE = True          # Skip the steps whose inputs, configuration and code are unchanged (see result_cache.py)
+# Spans (see tracing.py): "trace.json" = Chrome trace, "trace.jsonl" = JSON lines; None = disabled
+TRACE_PATH = None
+TRACE_MEMORY = False      # tracemalloc peaks in the spans (slower)
+PROFILE = None            # "cprofile" / "pyinstrument": one profile per step, next to the trace
+
+# --- STEPS ---
+# Every step receives the artefacts named in "inputs" as keyword arguments and
+# returns a dict with the artefacts named in "outputs". Artefacts stay in memory.
+def step_load():
+    df = load_data()
+    if df is None: raise FileNotFoundError("raw dataset not found, run setup_data.py first")
+    print(f"[*] Loaded dataset with {len(df)} rows.")
+    return {"raw": df}
+
+def step_risk(raw):
+    return {"raw_k": report_risk(raw)}
+
+def step_anonymize(raw):
+    df_gen, df_final, stats = run_anonymization(raw, save=False)
+    return {
+        "generalized": df_gen,
+        "anonymized": df_final,
+        "generalized_stats": stats,
+        "anonymized_stats": stats.subset(stats.l_distinct() >= 2),
+    }
+
+def step_export(generalized, anonymized, generalized_stats, anonymized_stats):
+    save_outputs(generalized, anonymized, generalized_stats, anonymized_stats)
+    return {}
+
+def step_plot_k(raw):
+    visualise_k_anonimity.plot_history(visualise_k_anonimity.simulate_steps(raw))
+    return {"k_chart": visualise_k_anonimity.OUTPUT_PATH}
+
+def step_plot_l(generalized_stats, anonymized_stats):
+    before = visualise_l_diversity.distribution_from_stats(generalized_stats, "Before (Risk)")
+    after = visualise_l_diversity.distribution_from_stats(anonymized_stats, "After (Safe)")
+    visualise_l_diversity.plot_distributions(before, after)
+    return {"l_chart": visualise_l_diversity.OUTPUT_PATH}
+
+def step_plot_t(anonymized, anonymized_stats):
+    return {"max_t": visualise_t_closeness.audit_t_closeness(anonymized, stats=anonymized_stats)}
+
+def step_utility(raw, generalized_stats):
+    # Same suppression as run_anonymization (classes with l >= 2 are released)
+    levels = anonymiser.GENERALIZATION_LEVELS if anonymiser.ANONYMIZATION_MODE != "mondrian" else None
+    report = utility_metrics.release_utility(raw, generalized_stats, generalized_stats.l_distinct() >= 2, levels)
+    utility_metrics.print_report(report)
+    print(f"💾 Trade-off report saved to: {utility_metrics.save_report(report)}")
+    return {"utility": report}
+
+def export_files():
+    formats = (["csv"] if anonymiser.EXPORT_CSV or anonymiser.STORE_FORMAT == "csv" else []) + \
+              ([anonymiser.STORE_FORMAT] if anonymiser.STORE_FORMAT != "csv" else [])
+    # Same order as save_outputs, so that restored copies keep their relative mtimes
+    return [store_path(path, fmt) for path in (anonymiser.INTERMEDIATE_PATH, anonymiser.FINAL_PATH) for fmt in formats]
+
+def cache_config():
+    """Everything outside the step inputs that the results depend on."""
+    return {
+        "code": code_version(),
+        "quasi_identifiers": QUASI_IDENTIFIERS,
+        "sensitive": anonymiser.SENSITIVE_ATTRIBUTE,
+        "hierarchies": {name: h.to_dict() for name, h in HIERARCHIES.items()},
+        "mode": anonymiser.ANONYMIZATION_MODE,
+        "levels": anonymiser.GENERALIZATION_LEVELS,
+        "mondrian": [anonymiser.MONDRIAN_K, anonymiser.MONDRIAN_L],
+        "store": [anonymiser.STORE_FORMAT, anonymiser.EXPORT_CSV],
+        "t_closeness": [visualise_t_closeness.T_METRIC, visualise_t_closeness.THRESHOLDS_TO_TEST],
+    }
+
+# Optional step keys: "sink" (skipped when WRITE_DATASETS is off), "files" (files the
+# step writes, cached with its outputs) and "sources" (input files hashed into its cache key).
 PIPELINE = [
     {
-        "script": "risk_analyser.py",
+        "step": "load", "run": step_load, "inputs": [], "outputs": ["raw"], "sources": [DATA_PATH],
+        "title": "STEP 0: LOAD DATA",
+        "desc": "Reading the raw 'Adult' dataset once; every step shares it in memory."
+    },
+    {
+        "step": "risk", "run": step_risk, "inputs": ["raw"], "outputs": ["raw_k"],
         "title": "STEP 1: INITIAL RISK ASSESSMENT",
         "desc": "Analyzing the raw 'Adult' dataset to identify privacy violations (k=1)."
     },
     {
-        "script": "anonymiser.py",
+        "step": "anonymize", "run": step_anonymize, "inputs": ["raw"],
+        "outputs": ["generalized", "anonymized", "generalized_stats", "anonymized_stats"],
         "title": "STEP 2: ANONYMIZATION ENGINE",
         "desc": "Applying Generalization and Suppression to achieve k-anonymity and l-diversity."
     },
     {
-        "script": "visualise_k_anonimity.py",
+        "step": "export", "run": step_export, "outputs": [], "sink": True, "files": export_files,
+        "inputs": ["generalized", "anonymized", "generalized_stats", "anonymized_stats"],
+        "title": "EXPORT: DATASETS",
+        "desc": "Writing the intermediate and final anonymized datasets (columnar copy + CSV)."
+    },
+    {
+        "step": "plot_k", "run": step_plot_k, "inputs": ["raw"], "outputs": ["k_chart"],
+        "files": [visualise_k_anonimity.OUTPUT_PATH],
         "title": "STEP 3: VISUALIZING K-ANONYMITY",
         "desc": "Generating the chart showing the trade-off between Risk (unique rows) and Safety (k-value)."
     },
     {
-        "script": "visualise_l_diversity.py",
+        "step": "plot_l", "run": step_plot_l, "inputs": ["generalized_stats", "anonymized_stats"], "outputs": ["l_chart"],
+        "files": [visualise_l_diversity.OUTPUT_PATH],
         "title": "STEP 4: VISUALIZING L-DIVERSITY",
         "desc": "Comparing the distribution of sensitive attributes before and after anonymization."
     },
     {
-        "script": "visualise_t_closeness.py",
+        "step": "plot_t", "run": step_plot_t, "inputs": ["anonymized", "anonymized_stats"], "outputs": ["max_t"],
+        "files": [visualise_t_closeness.OUTPUT_CHART_PATH],
         "title": "STEP 5: T-CLOSENESS AUDIT",
         "desc": "Calculating Variational Distance to ensure sensitive attributes follow global distribution."
+    },
+    {
+        "step": "utility", "run": step_utility, "inputs": ["raw", "generalized_stats"], "outputs": ["utility"],
+        "files": [utility_metrics.REPORT_PATH],
+        "title": "STEP 6: PRIVACY / UTILITY TRADE-OFF",
+        "desc": "Measuring the information lost to generalization and suppression (discernibility, C_avg, NCP, entropy)."
     }
 ]
 
-def run_script(script_name, description):
-    """Executes a python script and handles output."""
-    print(f"\n{'='*60}")
-    print(f"📄 RUNNING: {script_name}")
-    print(f"ℹ️  INFO:    {description}")
-    print(f"{'='*60}\n")
-    
-    start_time = time.time()
-    
-    # Check if file exists
-    if not os.path.exists(script_name):
-        print(f"❌ ERROR: File '{script_name}' not found in current directory.")
-        return False
-
-    # Run the script
+# --- RUNNER ---
+class ThreadOutput:
+    """sys.stdout stand-in: a thread with a buffer set writes there (and to the real stream
+    if it echoes), the others to the real stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is None: return self.stream.write(text)
+        if self.local.echo: self.stream.write(text)
+        return buffer.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+class CachedArtefact:
+    """Output of a step replayed from the cache, unpickled only if a step that runs needs it."""
+
+    def __init__(self, cache, key, name):
+        self.cache, self.key, self.name = cache, key, name
+
+    def load(self):
+        return self.cache.load(self.key, self.name)
+
+def plan_stages(pipeline, available=()):
+    """Orders the steps in stages: a step runs once every input it declares has been produced."""
+    produced = set(available)
+    pending = list(pipeline)
+    stages = []
+    while pending:
+        ready = [s for s in pending if all(i in produced for i in s["inputs"])]
+        if not ready:
+            missing = {i for s in pending for i in s["inputs"]} - produced
+            raise ValueError(f"Unresolvable step inputs: {sorted(missing)}")
+        stages.append(ready)
+        produced.update(o for s in ready for o in s["outputs"])
+        pending = [s for s in pending if s not in ready]
+    return stages
+
+def step_files(step):
+    files = step.get("files", [])
+    return list(files() if callable(files) else files)
+
+def run_step(step, artefacts, output, echo=False):
+    """Runs one step and returns (outputs, wall seconds, CPU seconds of its thread, log text)."""
+    output.local.buffer, output.local.echo = buffer, _ = io.StringIO(), echo
+    print(f"\n\n>>> {step['title']}")
+    print(f"ℹ️  INFO:    {step['desc']}")
+    start_wall, start_cpu = time.perf_counter(), time.thread_time()
     try:
-        # We use sys.executable to ensure we use the same python interpreter
-        result = subprocess.run([sys.executable, script_name], check=True)
-        
-        elapsed = time.time() - start_time
-        print(f"\n✅ SUCCESS: {script_name} completed in {elapsed:.2f}s.")
-        return True
-        
-    except subprocess.CalledProcessError as e:
-        print(f"\n❌ FAILURE: {script_name} crashed with exit code {e.returncode}.")
-        return False
-    except Exception as e:
-        print(f"\n❌ ERROR: An unexpected error occurred: {e}")
-        return False
+        with tracing.span(f"step.{step['step']}"):
+            outputs = step["run"](**{name: artefacts[name] for name in step["inputs"]})
+    finally:
+        del output.local.buffer
+    return outputs, time.perf_counter() - start_wall, time.thread_time() - start_cpu, buffer.getvalue()
+
+def run_pipeline(pipeline, write_datasets=WRITE_DATASETS, max_parallel=MAX_PARALLEL_STEPS, track_memory=TRACK_MEMORY,
+                 cache=None):
+    """Runs the steps in-process, stage by stage. Returns (artefacts, per-step report).
+
+    With a ResultCache, the key of a step hashes its name, the keys of its inputs (so
+    a change upstream invalidates everything downstream), its source files and
+    cache_config(). Steps whose key is cached are replayed: log, outputs and files.
+    Their outputs are returned as CachedArtefact placeholders (call .load()).
+    """
+    steps = [s for s in pipeline if write_datasets or not s.get("sink")]
+    artefacts, report, keys = {}, [], {}
+    config = cache_config() if cache is not None else None
+    output = ThreadOutput(sys.stdout)
+    sys.stdout = output
+    if track_memory: tracemalloc.start()
+    try:
+        for stage in plan_stages(steps):
+            todo = []
+            for step in stage:
+                if cache is None:
+                    todo.append((step, None))
+                    continue
+                key = make_key(step["step"], config, [keys[i] for i in step["inputs"]],
+                               [cache.file_digest(p) for p in step.get("sources", [])])
+                keys.update({name: make_key(key, name) for name in step["outputs"]})
+                if not cache.has(key):
+                    todo.append((step, key))
+                    continue
+                print(cache.hit(key), end="")
+                artefacts.update({name: CachedArtefact(cache, key, name) for name in step["outputs"]})
+                report.append({"step": step["step"], "wall": 0.0, "cpu": 0.0, "peak_mb": None,
+                               "shared": False, "cached": True})
+                print(f"\n♻️  CACHED:  {step['step']} unchanged, results restored.")
+            # Steps that run need their cached inputs in memory
+            for step, _ in todo:
+                for name in step["inputs"]:
+                    if isinstance(artefacts[name], CachedArtefact):
+                        artefacts[name] = artefacts[name].load()
+
+            if track_memory:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            if len(todo) == 1:
+                results = [run_step(todo[0][0], artefacts, output, echo=True)]
+            else:
+                with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+                    futures = [pool.submit(run_step, step, artefacts, output) for step, _ in todo]
+                    results = [f.result() for f in futures]
+            peak_mb = (tracemalloc.get_traced_memory()[1] - base) / 2**20 if track_memory else None
+            for (step, key), (outputs, wall, cpu, log) in zip(todo, results):
+                if len(todo) > 1: print(log, end="")
+                if set(outputs) != set(step["outputs"]):
+                    raise ValueError(f"Step '{step['step']}' returned {sorted(outputs)}, declared {step['outputs']}")
+                artefacts.update(outputs)
+                report.append({"step": step["step"], "wall": wall, "cpu": cpu, "peak_mb": peak_mb,
+                               "shared": len(todo) > 1, "cached": False})
+                print(f"\n✅ SUCCESS: {step['step']} completed in {wall:.2f}s.")
+                if key is not None:
+                    try:
+                        cache.store(key, outputs, step_files(step), log)
+                    except (OSError, pickle.PicklingError) as e:
+                        print(f"⚠️  Could not cache {step['step']}: {e}")
+    finally:
+        sys.stdout = output.stream
+        if track_memory: tracemalloc.stop()
+    return artefacts, report
+
+def print_report(report):
+    print(f"\n{'Step':<12} | {'Wall (s)':>8} | {'CPU (s)':>8} | {'Peak memory (MB)':>16}")
+    print("-" * 54)
+    for r in report:
+        peak = "-" if r["peak_mb"] is None else f"{r['peak_mb']:.1f}" + (" *" if r["shared"] else "")
+        if r["cached"]:
+            print(f"{r['step']:<12} | {'cached':>8} | {'-':>8} | {'-':>16}")
+        else:
+            print(f"{r['step']:<12} | {r['wall']:>8.2f} | {r['cpu']:>8.2f} | {peak:>16}")
+    if any(r["shared"] and r["peak_mb"] is not None for r in report):
+        print("* concurrent steps: peak measured for the whole stage")
+    if resource is not None:
+        # ru_maxrss is in KB on Linux, in bytes on macOS
+        scale = 2**20 if sys.platform == "darwin" else 2**10
+        print(f"Process peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale:.1f} MB")
+
+def cli_option(name, default=None):
+    """Value of a --name=value command line option."""
+    prefix = f"--{name}="
+    return next((arg[len(prefix):] for arg in sys.argv[1:] if arg.startswith(prefix)), default)
 
 if __name__ == "__main__":
     print("\n🔐 STARTING PRIVACY PRESERVATION PIPELINE 🔐")
     print("--------------------------------------------------")
 
-    success_count = 0
-    
-    for step in PIPELINE:
-        print(f"\n\n>>> {step['title']}")
-        if run_script(step['script'], step['desc']):
-            success_count += 1
-        else:
-            print("\n⛔ PIPELINE HALTED DUE TO ERROR.")
-            sys.exit(1)
+    # --trace=PATH [--trace-memory] [--profile=cprofile|pyinstrument]
+    trace_path = cli_option("trace", TRACE_PATH)
+    if trace_path:
+        tracing.enable(trace_path, memory=TRACE_MEMORY or "--trace-memory" in sys.argv,
+                       profile=cli_option("profile", PROFILE))
+
+    start = time.perf_counter()
+    try:
+        # --no-cache: run every step, without reading or writing the cache
+        cache = ResultCache() if USE_CACHE else None
+        artefacts, report = run_pipeline(PIPELINE, cache=cache if "--no-cache" not in sys.argv else None)
+    except Exception as e:
+        print(f"\n❌ FAILURE: {type(e).__name__}: {e}")
+        print("\n⛔ PIPELINE HALTED DUE TO ERROR.")
+        sys.exit(1)
+    finally:
+        tracing.disable()
+    if trace_path:
+        print(f"🧭 Trace written to: {trace_path}")
 
     print(f"\n{'='*60}")
-    print(f"🎉 PIPELINE COMPLETED SUCCESSFULLY ({success_count}/{len(PIPELINE)} steps)")
+    print(f"🎉 PIPELINE COMPLETED SUCCESSFULLY ({len(report)} steps in {time.perf_counter() - start:.2f}s)")
+    print_report(report)
     print(f"📊 Check the '../data/' folder for generated charts and CSVs.")
-    print(f"{'='*60}\n")
\ No newline at end of file
+    print(f"{'='*60}\n")
@@ -0,0 +1,141 @@
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from class_stats import EquivalenceClassStats
+
+# CONFIGURATION
+# Below this many rows the pool start-up costs more than it saves: run in-process
+PARALLEL_MIN_ROWS = 200_000
+# Row ranges per worker (smaller ranges balance better, larger ones merge less)
+RANGES_PER_WORKER = 4
+
+# --- SHARED MEMORY ---
+# The arrays are copied once into shared memory blocks; the pool initializer maps
+# them into every worker, so tasks only carry row ranges and small tables.
+SHARED = {}  # name -> (SharedMemory, ndarray view), in the workers
+
+def attach_shared(specs):
+    """Pool initializer: maps the shared arrays into the worker."""
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        SHARED[name] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+class SharedArrays:
+    """Shared memory copies of arrays, released on exit. specs goes to attach_shared."""
+
+    def __init__(self):
+        self.blocks, self.specs = [], {}
+
+    def add(self, name, arr):
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        self.blocks.append(shm)
+        view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+        view[:] = arr
+        self.specs[name] = (shm.name, arr.shape, arr.dtype.str)
+        return view
+
+    def pool(self, workers):
+        return ProcessPoolExecutor(max_workers=workers, initializer=attach_shared, initargs=(self.specs,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+
+def row_ranges(n, workers):
+    bounds = np.linspace(0, n, min(n, workers * RANGES_PER_WORKER) + 1).astype(np.int64)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+def use_workers(n_rows, workers):
+    return workers > 1 and n_rows >= PARALLEL_MIN_ROWS
+
+# --- GENERALIZATION ---
+def _generalize_range(lo, hi, maps):
+    codes, out = SHARED["codes"][1], SHARED["out"][1]
+    for j, level_map in enumerate(maps):
+        out[lo:hi, j] = level_map[codes[lo:hi, j]]
+
+def generalize_codes(compiled, levels, workers):
+    """Label codes of every row at the given levels (rows x QIs), computed by the workers over row ranges."""
+    qis = list(levels)
+    maps = [compiled[qi].maps[levels[qi]] for qi in qis]
+    with SharedArrays() as shared:
+        codes = shared.add("codes", np.column_stack([compiled[qi].codes for qi in qis]).astype(np.int32))
+        out = shared.add("out", np.empty_like(codes))
+        with shared.pool(workers) as pool:
+            list(pool.map(_generalize_range, *zip(*[(a, b, maps) for a, b in row_ranges(len(codes), workers)])))
+        return out.copy()
+
+# --- EQUIVALENCE CLASSES ---
+# Every row gets a composite key (mixed-radix number of its QI codes) times the
+# number of sensitive values plus its sensitive code. Map: each worker counts the
+# distinct keys of its row range. Reduce: the partial counts are merged by key,
+# which gives the classes in sorted QI order; the workers then number the rows.
+def _composite(codes, cards):
+    key = np.zeros(len(codes), dtype=np.int64)
+    for j, card in enumerate(cards):
+        key = key * card + codes[:, j]
+    return key
+
+def _count_range(lo, hi, cards, n_values):
+    codes, sensitive = SHARED["codes"][1], SHARED["sensitive"][1]
+    flat = _composite(codes[lo:hi], cards) * n_values + sensitive[lo:hi]
+    return np.unique(flat, return_counts=True)
+
+def _assign_range(lo, hi, cards, classes):
+    codes, ids = SHARED["codes"][1], SHARED["ids"][1]
+    ids[lo:hi] = np.searchsorted(classes, _composite(codes[lo:hi], cards))
+
+def _reduce_counts(partials, n_values):
+    keys, inverse = np.unique(np.concatenate([k for k, _ in partials]), return_inverse=True)
+    totals = np.bincount(inverse.ravel(), weights=np.concatenate([c for _, c in partials])).astype(np.int64)
+    classes, class_of_key = np.unique(keys // n_values, return_inverse=True)
+    counts = np.zeros((len(classes), n_values), dtype=np.int64)
+    counts[class_of_key.ravel(), keys % n_values] = totals
+    return classes, counts
+
+def _decode_keys(classes, cards, uniques, qi_list):
+    columns = {}
+    rest = classes.copy()
+    for j in reversed(range(len(cards))):
+        columns[qi_list[j]] = uniques[j].take(rest % cards[j])
+        rest //= cards[j]
+    return pd.DataFrame({qi: np.asarray(columns[qi]) if isinstance(columns[qi], pd.Index) else columns[qi]
+                         for qi in qi_list})
+
+def equivalence_class_stats(df, qi_list, sensitive_col=None, workers=1):
+    """EquivalenceClassStats of df, built by a process pool when workers > 1 (same result)."""
+    qi_list = list(qi_list)
+    if not use_workers(len(df), workers):
+        return EquivalenceClassStats(df, qi_list, sensitive_col)
+
+    # Encoding stays in the parent (one factorize per column, cheap on categoricals)
+    encoded = [pd.factorize(df[qi], sort=True, use_na_sentinel=False) for qi in qi_list]
+    cards = [max(len(uniques), 1) for _, uniques in encoded]
+    if sensitive_col is None:
+        sensitive, values = np.zeros(len(df), dtype=np.int64), pd.Index(["*"])
+    else:
+        sensitive, values = pd.factorize(df[sensitive_col], sort=True, use_na_sentinel=False)
+    n_values = len(values)
+    if np.prod(np.asarray(cards, dtype=float)) * n_values >= 2 ** 62:
+        return EquivalenceClassStats(df, qi_list, sensitive_col)
+
+    ranges = row_ranges(len(df), workers)
+    with SharedArrays() as shared:
+        shared.add("codes", np.column_stack([codes for codes, _ in encoded]).astype(np.int32))
+        shared.add("sensitive", np.asarray(sensitive, dtype=np.int32))
+        ids = shared.add("ids", np.empty(len(df), dtype=np.int64))
+        with shared.pool(workers) as pool:
+            partials = list(pool.map(_count_range, *zip(*[(a, b, cards, n_values) for a, b in ranges])))
+            classes, counts = _reduce_counts(partials, n_values)
+            list(pool.map(_assign_range, *zip(*[(a, b, cards, classes) for a, b in ranges])))
+        group_ids = ids.copy()
+
+    keys = _decode_keys(classes, cards, [uniques for _, uniques in encoded], qi_list)
+    keys = keys.astype({qi: df[qi].dtype for qi in qi_list if isinstance(df[qi].dtype, pd.CategoricalDtype)})
+    return EquivalenceClassStats.from_arrays(qi_list, sensitive_col, group_ids, keys, counts, pd.Index(values))
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import glob
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# CONFIGURATION
+CACHE_DIR = os.path.join(current_dir, "../data/.cache")
+MAX_CACHE_BYTES = 2 * 2**30  # Least recently used entries are evicted above this size
+
+def make_key(*parts):
+    """Stable sha256 of any JSON-serialisable parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+def code_version(src_dir=current_dir):
+    """Hash of every module in src/: any code change invalidates the cached results."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(src_dir, "*.py"))):
+        with open(path, "rb") as f:
+            digest.update(os.path.basename(path).encode() + f.read())
+    return digest.hexdigest()
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+class ResultCache:
+    """Step outputs on local disk, one directory per key.
+
+    Each entry holds one pickle per output artefact, copies of the files the step
+    wrote (charts, datasets) and its log. Entries are evicted least recently used
+    first once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.root, key)
+
+    def file_digest(self, path):
+        """sha256 of a file, memoized on (size, mtime) so that large inputs are hashed once."""
+        index_path = os.path.join(self.root, "digests.json")
+        index = {}
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                index = json.load(f)
+        st = os.stat(path)
+        known = index.get(os.path.abspath(path))
+        if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+            return known["sha256"]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(2**20), b""):
+                digest.update(block)
+        index[os.path.abspath(path)] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest.hexdigest()}
+        with open(index_path, "w") as f:
+            json.dump(index, f)
+        return digest.hexdigest()
+
+    def has(self, key):
+        return os.path.exists(os.path.join(self._entry(key), "manifest.json"))
+
+    def load(self, key, name):
+        with open(os.path.join(self._entry(key), f"{name}.pkl"), "rb") as f:
+            return pickle.load(f)
+
+    def hit(self, key):
+        """Marks an entry as used, puts its files back in place and returns its log."""
+        entry = self._entry(key)
+        os.utime(entry)
+        with open(os.path.join(entry, "manifest.json")) as f:
+            manifest = json.load(f)
+        for i, path in enumerate(manifest["files"]):
+            shutil.copyfile(os.path.join(entry, "files", str(i)), path)
+        with open(os.path.join(entry, "log.txt"), encoding="utf-8") as f:
+            return f.read()
+
+    def store(self, key, outputs, files=(), log=""):
+        entry = self._entry(key)
+        tmp = f"{entry}.tmp-{os.getpid()}-{time.monotonic_ns()}"
+        os.makedirs(os.path.join(tmp, "files"))
+        for name, value in outputs.items():
+            with open(os.path.join(tmp, f"{name}.pkl"), "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        files = [p for p in files if os.path.exists(p)]
+        for i, path in enumerate(files):
+            shutil.copyfile(path, os.path.join(tmp, "files", str(i)))
+        with open(os.path.join(tmp, "log.txt"), "w", encoding="utf-8") as f:
+            f.write(log)
+        with open(os.path.join(tmp, "manifest.json"), "w") as f:
+            json.dump({"outputs": list(outputs), "files": files}, f)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+        self.evict()
+
+    def evict(self):
+        entries = [e for e in os.scandir(self.root) if e.is_dir()]
+        sizes = {e.path: _dir_size(e.path) for e in entries}
+        total = sum(sizes.values())
+        for e in sorted(entries, key=lambda e: e.stat().st_mtime):
+            if total <= self.max_bytes: break
+            shutil.rmtree(e.path, ignore_errors=True)
+            total -= sizes[e.path]
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
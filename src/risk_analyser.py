@@ -2,6 +2,22 @@ import pandas as pd
 import os
 import sys
 
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from parallel import equivalence_class_stats
+    from tracing import span
+    from artefact_store import save_dataset, read_columnar, read_metadata, store_path
+except ImportError:
+    sys.exit("❌ Error: parallel.py / tracing.py / artefact_store.py not found")
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
 # CONFIGURATION
 # Relative path to the raw file
 DATA_PATH = os.path.join(os.path.dirname(__file__), "../data/adult.data")
@@ -14,36 +30,142 @@ COLUMNS = [
 
 # Quasi-Identifiers
 QUASI_IDENTIFIERS = ["age", "sex", "race", "native-country", "marital-status"]
+# The only columns the privacy steps read (load_data(columns=PRIVACY_COLUMNS))
+PRIVACY_COLUMNS = QUASI_IDENTIFIERS + ["income"]
+
+# Parsed dtypes: numbers as int32, text as categoricals (one small code per row instead of a string)
+INTEGER_COLUMNS = ["age", "fnlwgt", "education-num", "capital-gain", "capital-loss", "hours-per-week"]
+DTYPES = {col: "int32" if col in INTEGER_COLUMNS else "category" for col in COLUMNS}
+
+# "pyarrow": multi-threaded parser over the memory-mapped file; "c": pandas (fallback without pyarrow)
+CSV_ENGINE = "pyarrow"
+# Keeps the parsed file as an uncompressed Arrow copy next to the raw one (adult.arrow): while the
+# raw file is unchanged, loads map that copy instead of parsing
+CACHE_PARSED = True
+
+def parsed_path(path=DATA_PATH):
+    return store_path(path, "feather")
 
-def load_data():
-    """Loads the raw dataset handling spaces."""
-    if not os.path.exists(DATA_PATH):
-        print(f"❌ ERROR: File not found in {DATA_PATH}")
+def source_signature(path):
+    st = os.stat(path)
+    return {"source_size": st.st_size, "source_mtime_ns": st.st_mtime_ns}
+
+def _sorted_categories(col, strip=False):
+    # Same categories (sorted) as astype("category"), stripping the separator spaces if asked
+    if strip:
+        stripped = col.cat.categories.str.strip()
+        if not stripped.is_unique:
+            return col.astype(object).str.strip().astype("category")
+        col = col.cat.rename_categories(stripped)
+    return col.cat.reorder_categories(sorted(col.cat.categories))
+
+def _parse(path, columns, engine):
+    if engine == "pyarrow" and pa is not None:
+        # No skipinitialspace in pyarrow: text is read as dictionaries, whose few values are stripped
+        types = {c: pa.int32() if DTYPES[c] == "int32" else pa.dictionary(pa.int32(), pa.string()) for c in columns}
+        table = pa_csv.read_csv(pa.memory_map(path), read_options=pa_csv.ReadOptions(column_names=COLUMNS),
+                                convert_options=pa_csv.ConvertOptions(include_columns=columns, column_types=types))
+        df = table.to_pandas()
+        for c in columns:
+            if DTYPES[c] == "category":
+                df[c] = _sorted_categories(df[c], strip=True)
+        return df
+    return pd.read_csv(path, names=COLUMNS, usecols=columns, dtype={c: DTYPES[c] for c in columns},
+                       skipinitialspace=True, memory_map=True)
+
+def _read_parsed(path, columns):
+    cached = parsed_path(path)
+    if pa is None or not os.path.exists(cached):
+        return None
+    try:
+        if read_metadata(cached) != source_signature(path):
+            return None
+        df, _ = read_columnar(cached, columns)
+    except (OSError, pa.ArrowException):
         return None
-    
-    # Reads the original raw file
-    df = pd.read_csv(DATA_PATH, names=COLUMNS, skipinitialspace=True)
     return df
 
-def analyze_k_anonymity(df, qi_list):
-    """Calculates k-anonymity and counts rows at risk."""
-    groups = df.groupby(qi_list).size().reset_index(name='group_size')
-    k_val = groups['group_size'].min()
-    rows_at_risk_1 = groups[groups['group_size'] == 1]['group_size'].count()
-    return k_val, groups, rows_at_risk_1
+def load_data(path=DATA_PATH, columns=None, engine=CSV_ENGINE, cache=CACHE_PARSED):
+    """Loads the raw dataset with compact dtypes (DTYPES), handling spaces.
+
+    columns: only these columns, in file order (all by default).
+    cache: reuse / keep the parsed Arrow copy next to the raw file (see CACHE_PARSED).
+    """
+    if not os.path.exists(path):
+        print(f"❌ ERROR: File not found in {path}")
+        return None
+
+    columns = [c for c in COLUMNS if columns is None or c in columns]
+    with span("load", path=path) as s:
+        df = _read_parsed(path, columns) if cache else None
+        s.set(parsed_copy=df is not None)
+        if df is None and cache and pa is not None:
+            # The copy holds every column, so that any projection can be served from it
+            df = _parse(path, COLUMNS, engine)
+            try:
+                save_dataset(df, path, fmt="feather", metadata=source_signature(path))
+            except OSError as e:
+                print(f"⚠️  Could not write the parsed copy of {os.path.basename(path)}: {e}")
+            df = df[columns]
+        elif df is None:
+            df = _parse(path, columns, engine)
+        s.rows_out = len(df)
+    return df
+
+def iter_data(chunksize, path=DATA_PATH):
+    """Reads the raw dataset lazily, chunksize rows at a time."""
+    if not os.path.exists(path):
+        print(f"❌ ERROR: File not found in {path}")
+        return None
+    return pd.read_csv(path, names=COLUMNS, skipinitialspace=True, chunksize=chunksize)
+
+def iter_batches(path=DATA_PATH, columns=None, batch_bytes=64 * 2**20):
+    """Streams the raw file as frames of about batch_bytes of CSV, with DTYPES (memory bounded by one batch).
+
+    Categorical categories differ between batches: combine them by value, not by code.
+    """
+    if not os.path.exists(path):
+        print(f"❌ ERROR: File not found in {path}")
+        return
+    columns = [c for c in COLUMNS if columns is None or c in columns]
+    if pa is None:
+        yield from pd.read_csv(path, names=COLUMNS, usecols=columns, dtype={c: DTYPES[c] for c in columns},
+                               skipinitialspace=True, chunksize=max(batch_bytes // 100, 1))
+        return
+    types = {c: pa.int32() if DTYPES[c] == "int32" else pa.dictionary(pa.int32(), pa.string()) for c in columns}
+    reader = pa_csv.open_csv(pa.memory_map(path), read_options=pa_csv.ReadOptions(column_names=COLUMNS, block_size=batch_bytes),
+                             convert_options=pa_csv.ConvertOptions(include_columns=columns, column_types=types))
+    for batch in reader:
+        df = batch.to_pandas()
+        for c in columns:
+            if DTYPES[c] == "category":
+                df[c] = _sorted_categories(df[c], strip=True)
+        yield df
+
+def analyze_k_anonymity(df, qi_list, workers=1):
+    """Calculates k-anonymity and counts rows at risk (workers > 1: on a process pool)."""
+    with span("metric.k", rows_in=len(df)) as s:
+        stats = equivalence_class_stats(df, qi_list, workers=workers)
+        s.set(classes=stats.n_classes)
+    return stats.k, stats.groups_frame(), stats.uniques
+
+def report_risk(df, qi_list=QUASI_IDENTIFIERS):
+    """Prints the risk report of a dataset and returns its k."""
+    k, grouped_df, risk_count = analyze_k_anonymity(df, qi_list)
+    
+    print(f"\n📊 RISK REPORT:")
+    print(f"   Current k-anonymity: {k}")
+    
+    if k == 1:
+        print(f"⚠️  CRITICAL RISK: {risk_count} unique records found.")
+        print("   These individuals are re-identifiable with 100% probability.")
+    else:
+        print(f"✅ DATA IS SAFE (k={k})")
+    return k
 
 if __name__ == "__main__":
     print("\n🕵️  --- RISK ANALYZER ENGINE ---")
     df = load_data()
     if df is not None:
         print(f"[*] Loaded dataset with {len(df)} rows.")
-        k, grouped_df, risk_count = analyze_k_anonymity(df, QUASI_IDENTIFIERS)
-        
-        print(f"\n📊 RISK REPORT:")
-        print(f"   Current k-anonymity: {k}")
-        
-        if k == 1:
-            print(f"⚠️  CRITICAL RISK: {risk_count} unique records found.")
-            print("   These individuals are re-identifiable with 100% probability.")
-        else:
-            print(f"✅ DATA IS SAFE (k={k})")
\ No newline at end of file
+        report_risk(df)
\ No newline at end of file
@@ -0,0 +1,138 @@
+import argparse
+import itertools
+import os
+import sys
+import time
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import load_data, analyze_k_anonymity, QUASI_IDENTIFIERS
+    from hierarchies import compile_hierarchies, CategoricalHierarchy, HIERARCHIES, SUPPRESSED
+    from lattice_search import bottom_table, rollup_table
+except ImportError:
+    sys.exit("❌ Error: risk_analyser.py / hierarchies.py / lattice_search.py not found")
+
+# CONFIGURATION
+# Columns considered for QUASI_IDENTIFIERS besides the current ones
+CANDIDATE_COLUMNS = ["education", "occupation"]
+K = 5
+TOP = 15
+
+# --- THE CUBE ---
+# Every column gets a hierarchy whose top level is a single label ("*"); columns
+# without one (the candidates) get the one-level hierarchy below. A column at its top
+# level puts every row in the same class, i.e. it is dropped from the QIs, so the
+# generalization lattice over all the columns holds every QI subset (all columns at
+# level 0 or top) and every hierarchy level of every subset.
+# The raw class sizes are counted once (bottom_table); each cell is then rolled up from
+# a cell one step finer (rollup_table), never from the rows.
+DROPPED = CategoricalHierarchy([({}, SUPPRESSED)])
+
+def cube_registry(columns):
+    return {c: HIERARCHIES.get(c, DROPPED) for c in columns}
+
+def _risk(sizes, k):
+    return {
+        "classes": int(len(sizes)),
+        "k": int(sizes.min()),
+        "uniques": int(np.count_nonzero(sizes == 1)),
+        "rows_at_risk": int(sizes[sizes < k].sum()),
+    }
+
+@dataclass
+class RiskCube:
+    columns: list
+    heights: list
+    cells: pd.DataFrame     # one row per node: a level per column + classes, k, uniques, rows_at_risk
+    n_rows: int
+    seconds: float
+
+    def subsets(self):
+        """Cells of the QI subsets: every column raw (level 0) or dropped (top level)."""
+        levels = self.cells[self.columns].to_numpy()
+        raw_or_dropped = ((levels == 0) | (levels == np.asarray(self.heights))).all(axis=1)
+        return self.cells[raw_or_dropped]
+
+    def label(self, cell):
+        """'age@1 + sex + race': the kept columns, with their level when generalized."""
+        kept = [c + (f"@{cell[c]}" if cell[c] else "") for c, h in zip(self.columns, self.heights) if cell[c] < h]
+        return " + ".join(kept) or "(none)"
+
+def risk_cube(df, columns, k=K):
+    """k, uniques and rows at risk of every node of the lattice over `columns` (QI subsets included)."""
+    start = time.perf_counter()
+    compiled = compile_hierarchies(df, columns, cube_registry(columns))
+    heights = [compiled[c].height for c in columns]
+    nodes_by_height = {}
+    for node in itertools.product(*(range(h + 1) for h in heights)):
+        nodes_by_height.setdefault(sum(node), []).append(node)
+
+    rows = []
+    previous = {}
+    for height in sorted(nodes_by_height):
+        current = {}
+        for node in nodes_by_height[height]:
+            if height == 0:
+                table = bottom_table(compiled, columns, np.zeros(len(df), dtype=np.int64), 1)
+            else:
+                preds = [node[:i] + (node[i] - 1,) + node[i + 1:] for i in range(len(node)) if node[i] > 0]
+                src = min(preds, key=lambda p: len(previous[p][0]))
+                table = rollup_table(previous[src], compiled, columns, src, node)
+            current[node] = table
+            rows.append((*node, *_risk(table[1][:, 0], k).values()))
+        previous = current
+    cells = pd.DataFrame(rows, columns=columns + ["classes", "k", "uniques", "rows_at_risk"])
+    return RiskCube(list(columns), heights, cells, len(df), time.perf_counter() - start)
+
+def ranked(cells, top=TOP):
+    """Most identifying cells first: most uniques, then most rows at risk, then most classes."""
+    return cells.sort_values(["uniques", "rows_at_risk", "classes"], ascending=False).head(top)
+
+def print_cells(cube, cells, k=K):
+    print(f"{'Columns':<80} | {'Classes':>7} | {'k':>5} | {'Uniques':>7} | {f'Rows k<{k}':>12}")
+    print("-" * 124)
+    for _, cell in cells.iterrows():
+        print(f"{cube.label(cell):<80} | {cell['classes']:>7} | {cell['k']:>5} | {cell['uniques']:>7} | "
+              f"{cell['rows_at_risk']:>6} ({cell['rows_at_risk'] / cube.n_rows:>4.0%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="k / uniques / rows at risk of every QI subset and hierarchy level.")
+    parser.add_argument("--columns", help="comma-separated columns (default: QUASI_IDENTIFIERS + CANDIDATE_COLUMNS)")
+    parser.add_argument("-k", type=int, default=K)
+    parser.add_argument("--top", type=int, default=TOP)
+    parser.add_argument("--confirm", action="store_true", help="check every subset against a groupby of the rows")
+    args = parser.parse_args()
+    columns = args.columns.split(",") if args.columns else QUASI_IDENTIFIERS + CANDIDATE_COLUMNS
+
+    print("\n🧊 --- QI RISK CUBE ---")
+    df = load_data(columns=columns)
+    if df is None: sys.exit(1)
+    cube = risk_cube(df, columns, args.k)
+    subsets = cube.subsets()
+    print(f"[*] {len(cube.cells)} cells ({len(subsets)} QI subsets) of {len(columns)} columns in {cube.seconds:.2f}s")
+
+    print(f"\n🔝 MOST IDENTIFYING QI SUBSETS (raw values):")
+    print_cells(cube, ranked(subsets, args.top), args.k)
+    # Smallest subsets that already single out records: the first columns to generalize
+    print(f"\n🔍 WORST SUBSET OF EACH SIZE:")
+    sizes = (subsets[columns].to_numpy() < np.asarray(cube.heights)).sum(axis=1)
+    print_cells(cube, pd.concat([ranked(subsets[sizes == n], 1) for n in range(1, len(columns) + 1)]), args.k)
+    print(f"\n🪜 MOST IDENTIFYING CELLS AT ANY HIERARCHY LEVEL (with at least one generalized column):")
+    generalized = ~cube.cells.index.isin(subsets.index)
+    print_cells(cube, ranked(cube.cells[generalized], args.top), args.k)
+
+    if args.confirm:
+        start = time.perf_counter()
+        mismatches = 0
+        for _, cell in subsets.iterrows():
+            qis = [c for c, h in zip(columns, cube.heights) if cell[c] < h]
+            if not qis: continue
+            k_exact, _, uniques = analyze_k_anonymity(df, qis)
+            mismatches += (k_exact, uniques) != (cell["k"], cell["uniques"])
+        print(f"\n🔎 One groupby per subset: {time.perf_counter() - start:.2f}s, "
+              f"{'✅ identical' if not mismatches else f'❌ {mismatches} mismatches'}")
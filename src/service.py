@@ -0,0 +1,350 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import load_data, DATA_PATH, INTEGER_COLUMNS
+    from anonymiser import anonymize_dataset, GENERALIZATION_LEVELS, SENSITIVE_ATTRIBUTE
+    from class_stats import EquivalenceClassStats, t_variational, t_emd
+    from parallel import equivalence_class_stats
+except ImportError:
+    sys.exit("❌ Error: risk_analyser.py / anonymiser.py not found")
+
+# CONFIGURATION
+HOST = "127.0.0.1"   # local only
+PORT = 8765
+# Processes holding the warm state; 0 = compute in threads of the service process
+WORKERS = min(4, os.cpu_count() or 1)
+# Micro-batching: concurrent requests of one endpoint are merged into one call of up to
+# MAX_BATCH_RECORDS records, waiting at most MAX_WAIT_MS for company
+MAX_BATCH_RECORDS = 20_000
+MAX_WAIT_MS = 5
+MAX_BODY_BYTES = 32 * 2**20
+LATENCY_WINDOW = 10_000  # last requests per endpoint used for p50 / p99
+# A scored record is at risk when its class (reference population + batch) is below these
+K_THRESHOLD = 5
+MIN_L = 2
+T_THRESHOLD = 0.20
+T_METRIC = "variational"  # as visualise_t_closeness.T_METRIC
+
+# --- WARM STATE ---
+# Loaded once per worker process by the pool initializer: the hierarchy registry is
+# bound through anonymize_dataset, the reference population is generalized once and
+# reduced to its class table (QI labels -> sensitive histogram). Requests only pay for
+# their own records.
+_STATE = None
+
+class ReferenceState:
+    def __init__(self, path=None, levels=GENERALIZATION_LEVELS):
+        self.levels = dict(levels)
+        self.qi_list = list(levels)
+        df = load_data(path or DATA_PATH, columns=self.qi_list + [SENSITIVE_ATTRIBUTE])
+        if df is None:
+            raise FileNotFoundError("reference dataset not found, run setup_data.py first")
+        stats = equivalence_class_stats(anonymize_dataset(df, self.levels, verbose=False), self.qi_list, SENSITIVE_ATTRIBUTE)
+        self.rows, self.n_classes, self.k = stats.n_rows, stats.n_classes, stats.k
+        self.index = pd.MultiIndex.from_frame(stats.keys.astype(object))
+        self.values = pd.Index(stats.values)
+        self.counts = stats.counts
+        self.global_dist = stats.global_distribution().to_numpy()
+
+    def info(self):
+        return {"rows": self.rows, "classes": self.n_classes, "k": self.k, "levels": self.levels,
+                "quasi_identifiers": self.qi_list, "sensitive": SENSITIVE_ATTRIBUTE,
+                "values": self.values.tolist(), "pid": os.getpid()}
+
+def _init_worker(path=None):
+    global _STATE
+    _STATE = ReferenceState(path)
+
+def _info():
+    return _STATE.info()
+
+def _concat(batches):
+    """One frame for all the requests of a micro-batch, with the request number of every row."""
+    df = pd.DataFrame.from_records([r for records in batches for r in records])
+    request = np.repeat(np.arange(len(batches)), [len(records) for records in batches])
+    return df, request
+
+def score_batches(batches):
+    """k / l / t of every record as if its request's batch joined the reference population."""
+    state = _STATE
+    df, request = _concat(batches)
+    gen = anonymize_dataset(df, state.levels, verbose=False)
+    gen["_request"] = request
+    # Classes of the batch are counted per request, then matched against the reference table
+    batch = EquivalenceClassStats(gen, state.qi_list + ["_request"], SENSITIVE_ATTRIBUTE)
+    ref_ids = state.index.get_indexer(pd.MultiIndex.from_frame(batch.keys[state.qi_list].astype(object)))
+    counts = np.zeros((batch.n_classes, len(state.values)), dtype=np.int64)
+    counts[:, state.values.get_indexer(batch.values)] = batch.counts
+    counts[ref_ids >= 0] += state.counts[ref_ids[ref_ids >= 0]]
+    sizes = counts.sum(axis=1)
+    l_values = np.count_nonzero(counts, axis=1)
+    t_values = (t_emd if T_METRIC == "emd" else t_variational)(counts, state.global_dist)
+    risky = (sizes < K_THRESHOLD) | (l_values < MIN_L) | (t_values > T_THRESHOLD)
+
+    results = []
+    offsets = np.concatenate([[0], np.cumsum([len(records) for records in batches])])
+    labels = gen[state.qi_list].astype(object).to_numpy()
+    for i in range(len(batches)):
+        rows = np.arange(offsets[i], offsets[i + 1])
+        classes = batch.group_ids[rows]
+        new_classes = np.unique(classes[ref_ids[classes] < 0])
+        results.append({
+            "records": [{"class": dict(zip(state.qi_list, labels[r].tolist())), "k": int(sizes[c]),
+                         "l": int(l_values[c]), "t": round(float(t_values[c]), 4), "at_risk": bool(risky[c])}
+                        for r, c in zip(rows, classes)],
+            "summary": {"rows": len(rows), "k": int(sizes[classes].min()) if len(rows) else 0,
+                        "l": int(l_values[classes].min()) if len(rows) else 0,
+                        "t": round(float(t_values[classes].max()), 4) if len(rows) else 0.0,
+                        "at_risk": int(risky[classes].sum()), "new_classes": len(new_classes)},
+        })
+    return results
+
+def anonymize_batches(batches):
+    """The records of every request generalized at the configured levels (other fields unchanged)."""
+    df, request = _concat(batches)
+    gen = anonymize_dataset(df, _STATE.levels, verbose=False)
+    # Missing values are NaN in the frame; None serialises as JSON null (NaN is not JSON)
+    gen = gen.astype(object).where(gen.notna(), None)
+    offsets = np.concatenate([[0], np.cumsum([len(records) for records in batches])])
+    return [{"records": gen.iloc[offsets[i]:offsets[i + 1]].to_dict(orient="records")} for i in range(len(batches))]
+
+
+# --- MICRO-BATCHING ---
+class MicroBatcher:
+    """Queues the requests of one endpoint and runs them in merged calls, at most `slots` at a time."""
+
+    def __init__(self, func, executor, slots):
+        self.func, self.executor = func, executor
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(max(slots, 1))
+        self.calls = self.requests = 0
+        self.running = set()  # references to the executing calls
+
+    async def submit(self, records):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((records, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.slots.acquire()
+            items = [await self.queue.get()]
+            n_records, deadline = len(items[0][0]), loop.time() + MAX_WAIT_MS / 1000
+            while n_records < MAX_BATCH_RECORDS:
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                n_records += len(item[0])
+            self.calls += 1
+            self.requests += len(items)
+            task = asyncio.create_task(self._execute(items))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _call(self, items):
+        results = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.func, [records for records, _ in items])
+        for (_, future), result in zip(items, results):
+            if not future.done(): future.set_result(result)
+
+    async def _execute(self, items):
+        try:
+            await self._call(items)
+        except Exception as e:
+            if len(items) == 1:
+                if not items[0][1].done(): items[0][1].set_exception(e)
+                return
+            # A failing request fails the whole merged call: rerun every request on its
+            # own, so that only the failing one gets the error
+            for item in items:
+                try:
+                    await self._call([item])
+                except Exception as e:
+                    if not item[1].done(): item[1].set_exception(e)
+        finally:
+            self.slots.release()
+
+
+# --- SERVICE ---
+def _qi_value(qi, value, i):
+    """The QI value of record i converted to its column type; ValueError (-> 400) when it has none."""
+    if qi in INTEGER_COLUMNS:
+        # bool is an int subclass, null / NaN / "abc" have no age
+        if not isinstance(value, bool) and isinstance(value, (int, float, str)):
+            try:
+                number = float(value)
+            except ValueError:
+                number = None
+            if number is not None and np.isfinite(number) and number == int(number):
+                return int(number)
+        raise ValueError(f"record {i}: {qi} must be an integer, got {value!r}")
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"record {i}: {qi} must be a non-empty string, got {value!r}")
+    return value.strip()
+
+class RiskService:
+    """Routes the HTTP requests to the batchers and keeps the latency windows."""
+
+    def __init__(self, workers=WORKERS, path=None):
+        self.workers = workers
+        self.path = path
+        self.latencies = {}
+        self.started = time.time()
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self.workers > 0:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.path,))
+            # Warm every worker now rather than on the first requests
+            infos = await asyncio.gather(*[loop.run_in_executor(self.executor, _info) for _ in range(self.workers)])
+        else:
+            _init_worker(self.path)
+            self.executor = None  # default thread pool
+            infos = [_info()]
+        self.info = infos[0]
+        self.batchers = {
+            "/score": MicroBatcher(score_batches, self.executor, max(self.workers, 1)),
+            "/anonymize": MicroBatcher(anonymize_batches, self.executor, max(self.workers, 1)),
+        }
+        self.tasks = [asyncio.create_task(b.run()) for b in self.batchers.values()]
+
+    def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    def _validate(self, target, payload):
+        records = payload.get("records") if isinstance(payload, dict) else None
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            raise ValueError('body must be {"records": [{column: value, ...}, ...]}')
+        required = self.info["quasi_identifiers"] + ([self.info["sensitive"]] if target == "/score" else [])
+        known = set(self.info["values"])
+        for i, record in enumerate(records):
+            missing = [c for c in required if c not in record]
+            if missing:
+                raise ValueError(f"record {i} lacks {', '.join(missing)}")
+            for qi in self.info["quasi_identifiers"]:
+                record[qi] = _qi_value(qi, record[qi], i)
+            if target == "/score" and record[self.info["sensitive"]] not in known:
+                raise ValueError(f"record {i}: unknown {self.info['sensitive']} value {record[self.info['sensitive']]!r}")
+        return records
+
+    def latency_report(self):
+        report = {}
+        for endpoint, window in self.latencies.items():
+            ms = np.asarray(window) * 1000
+            batcher = self.batchers.get(endpoint)
+            report[endpoint] = {"requests": len(ms), "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                                "p99_ms": round(float(np.percentile(ms, 99)), 2),
+                                "requests_per_call": round(batcher.requests / batcher.calls, 2) if batcher and batcher.calls else None}
+        return report
+
+    async def dispatch(self, method, target, body):
+        """Returns (HTTP status, JSON payload)."""
+        start = time.perf_counter()
+        try:
+            if target in self.batchers:
+                if method != "POST":
+                    return 405, {"error": f"{target} expects POST"}
+                try:
+                    records = self._validate(target, json.loads(body or b"null"))
+                except (ValueError, TypeError) as e:
+                    return 400, {"error": str(e)}
+                if not records:
+                    return 200, {"records": []}
+                return 200, await self.batchers[target].submit(records)
+            if method != "GET":
+                return 405, {"error": f"{target} expects GET"}
+            if target == "/health":
+                return 200, {"status": "ok", "uptime_s": round(time.time() - self.started, 1), "workers": self.workers,
+                             "reference": {k: self.info[k] for k in ("rows", "classes", "k", "levels")}}
+            if target == "/stats":
+                return 200, self.latency_report()
+            return 404, {"error": f"unknown endpoint {target}"}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            if target in ENDPOINTS:
+                self.latencies.setdefault(target, deque(maxlen=LATENCY_WINDOW)).append(time.perf_counter() - start)
+
+
+ENDPOINTS = ("/score", "/anonymize", "/health", "/stats")
+
+# --- HTTP ---
+# Minimal HTTP/1.1 with keep-alive: JSON in, JSON out.
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+async def handle_connection(service, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                status, payload = 413, {"error": f"body larger than {MAX_BODY_BYTES} bytes"}
+            else:
+                status, payload = await service.dispatch(method, target.split("?")[0], await reader.readexactly(length))
+            data = json.dumps(payload, default=str).encode()
+            keep_alive = headers.get("connection", "").lower() != "close" and status != 413
+            writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                         .encode() + data)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError, asyncio.CancelledError):
+        pass  # client gone, malformed request or shutdown
+    finally:
+        writer.close()
+
+async def serve(host=HOST, port=PORT, workers=WORKERS, path=None):
+    service = RiskService(workers, path)
+    start = time.perf_counter()
+    await service.start()
+    server = await asyncio.start_server(lambda r, w: handle_connection(service, r, w), host, port)
+    print(f"[*] Reference: {service.info['rows']} rows, {service.info['classes']} classes "
+          f"(warm in {time.perf_counter() - start:.1f}s, {workers or 'no'} worker processes).")
+    print(f"🌐 Listening on http://{host}:{port} (POST /score, POST /anonymize, GET /health, GET /stats)")
+
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+    async with server:
+        await stop.wait()
+    service.stop()
+    print("\n📊 Latency:")
+    for endpoint, r in service.latency_report().items():
+        print(f"   {endpoint:<11} {r['requests']:>7} requests  p50 {r['p50_ms']:>8.2f} ms  p99 {r['p99_ms']:>8.2f} ms")
+
+if __name__ == "__main__":
+    # python service.py [port] [workers]
+    print("\n🛰️  --- RISK SERVICE ---")
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else WORKERS
+    asyncio.run(serve(port=port, workers=workers))
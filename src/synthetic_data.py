@@ -0,0 +1,276 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import COLUMNS, DATA_PATH
+except ImportError:
+    sys.exit("❌ Error: risk_analyser.py not found")
+
+# CONFIGURATION
+SYNTHETIC_DIR = os.path.join(current_dir, "../data/synthetic")
+# Fitted model (python synthetic_data.py --fit); the built-in DEFAULT_MODEL is used when missing
+MODEL_PATH = os.path.join(SYNTHETIC_DIR, "model.json")
+SEED = 42
+CHUNK_ROWS = 1_000_000
+# Age bands the marital status and the income are conditioned on: <20, 20-29, ..., 60-69, 70+
+AGE_BANDS = [20, 30, 40, 50, 60, 70]
+MARRIED = ["Married-civ-spouse", "Married-AF-spouse"]
+
+# --- MODEL ---
+# A small Bayesian network over the Adult columns, as JSON-able tables:
+#   sex -> age -> marital-status, race -> native-country,
+#   (sex, married, age band) -> income -> workclass / education / occupation / numeric columns,
+#   (sex, married) -> relationship, education -> education-num.
+# Categorical tables are {condition: {value: weight}} (weights are normalised);
+# numeric columns are inverse CDFs {"q": [...], "v": [...]} sampled with interpolation.
+# The defaults approximate the published marginals of the 1994 Census extract.
+DEFAULT_MODEL = {
+    "sex": {"": {"Male": 0.669, "Female": 0.331}},
+    "age": {
+        "Male": {"q": [0, .1, .2, .3, .4, .5, .6, .7, .8, .9, 1], "v": [17, 23, 27, 31, 34, 38, 42, 46, 51, 58, 90]},
+        "Female": {"q": [0, .1, .2, .3, .4, .5, .6, .7, .8, .9, 1], "v": [17, 20, 24, 28, 31, 35, 39, 43, 48, 56, 90]},
+    },
+    "marital-status": {
+        "0": {"Married-civ-spouse": .01, "Never-married": .98, "Divorced": .002, "Separated": .003, "Widowed": .001, "Married-spouse-absent": .004},
+        "1": {"Married-civ-spouse": .25, "Never-married": .655, "Divorced": .05, "Separated": .03, "Widowed": .002, "Married-spouse-absent": .013, "Married-AF-spouse": .001},
+        "2": {"Married-civ-spouse": .53, "Never-married": .23, "Divorced": .15, "Separated": .045, "Widowed": .006, "Married-spouse-absent": .015, "Married-AF-spouse": .001},
+        "3": {"Married-civ-spouse": .60, "Never-married": .10, "Divorced": .20, "Separated": .045, "Widowed": .02, "Married-spouse-absent": .015, "Married-AF-spouse": .001},
+        "4": {"Married-civ-spouse": .63, "Never-married": .05, "Divorced": .19, "Separated": .04, "Widowed": .06, "Married-spouse-absent": .015, "Married-AF-spouse": .001},
+        "5": {"Married-civ-spouse": .60, "Never-married": .04, "Divorced": .14, "Separated": .025, "Widowed": .17, "Married-spouse-absent": .015},
+        "6": {"Married-civ-spouse": .45, "Never-married": .04, "Divorced": .09, "Separated": .01, "Widowed": .40, "Married-spouse-absent": .01},
+    },
+    "race": {"": {"White": .854, "Black": .096, "Asian-Pac-Islander": .032, "Amer-Indian-Eskimo": .010, "Other": .008}},
+    "native-country": {
+        "White": {"United-States": .92, "Mexico": .025, "?": .015, "Germany": .005, "Canada": .004, "Puerto-Rico": .003,
+                  "El-Salvador": .003, "Cuba": .003, "England": .003, "Italy": .002, "Poland": .002, "Columbia": .002,
+                  "Dominican-Republic": .002, "Guatemala": .002, "Portugal": .001, "Ireland": .001, "France": .001},
+        "Black": {"United-States": .90, "Jamaica": .02, "?": .02, "Haiti": .01, "Dominican-Republic": .005,
+                  "Puerto-Rico": .005, "Trinadad&Tobago": .005, "England": .003},
+        "Asian-Pac-Islander": {"United-States": .35, "Philippines": .19, "India": .09, "China": .07, "South": .07,
+                               "Vietnam": .06, "Taiwan": .05, "Japan": .04, "?": .05, "Hong": .02, "Cambodia": .02,
+                               "Laos": .02, "Thailand": .02},
+        "Amer-Indian-Eskimo": {"United-States": .97, "?": .01, "Mexico": .01, "Canada": .01},
+        "Other": {"United-States": .55, "Mexico": .12, "Puerto-Rico": .08, "Columbia": .05, "Dominican-Republic": .05,
+                  "El-Salvador": .05, "?": .04, "Ecuador": .03, "Peru": .03},
+    },
+    # P(>50K) by "sex|married" and age band
+    "income": {
+        "Male|1": [0.0, .12, .40, .52, .52, .40, .28],
+        "Male|0": [0.0, .02, .10, .17, .17, .13, .09],
+        "Female|1": [0.0, .20, .40, .50, .48, .38, .25],
+        "Female|0": [0.0, .01, .06, .10, .10, .08, .06],
+    },
+    "workclass": {
+        "<=50K": {"Private": .72, "Self-emp-not-inc": .075, "Local-gov": .060, "?": .067, "State-gov": .040,
+                  "Self-emp-inc": .020, "Federal-gov": .024, "Without-pay": .0006, "Never-worked": .0003},
+        ">50K": {"Private": .63, "Self-emp-not-inc": .093, "Local-gov": .079, "?": .024, "State-gov": .045,
+                 "Self-emp-inc": .080, "Federal-gov": .047},
+    },
+    "education": {
+        "<=50K": {"Bachelors": .127, "Some-college": .237, "11th": .045, "HS-grad": .357, "Prof-school": .006,
+                  "Assoc-acdm": .032, "Assoc-voc": .042, "9th": .019, "7th-8th": .025, "12th": .017, "Masters": .031,
+                  "1st-4th": .007, "10th": .035, "Doctorate": .004, "5th-6th": .013, "Preschool": .002},
+        ">50K": {"Bachelors": .283, "Some-college": .177, "11th": .008, "HS-grad": .214, "Prof-school": .054,
+                 "Assoc-acdm": .034, "Assoc-voc": .046, "9th": .004, "7th-8th": .005, "12th": .004, "Masters": .122,
+                 "1st-4th": .001, "10th": .008, "Doctorate": .039, "5th-6th": .002},
+    },
+    "education-num": {"Preschool": 1, "1st-4th": 2, "5th-6th": 3, "7th-8th": 4, "9th": 5, "10th": 6, "11th": 7,
+                      "12th": 8, "HS-grad": 9, "Some-college": 10, "Assoc-voc": 11, "Assoc-acdm": 12,
+                      "Bachelors": 13, "Masters": 14, "Prof-school": 15, "Doctorate": 16},
+    "occupation": {
+        "<=50K": {"Tech-support": .029, "Craft-repair": .129, "Other-service": .132, "Sales": .113,
+                  "Exec-managerial": .085, "Prof-specialty": .091, "Handlers-cleaners": .055, "Machine-op-inspct": .072,
+                  "Adm-clerical": .132, "Farming-fishing": .036, "Transport-moving": .049, "Priv-house-serv": .006,
+                  "Protective-serv": .018, "Armed-Forces": .0003, "?": .067},
+        ">50K": {"Tech-support": .036, "Craft-repair": .119, "Other-service": .017, "Sales": .126,
+                 "Exec-managerial": .252, "Prof-specialty": .237, "Handlers-cleaners": .011, "Machine-op-inspct": .032,
+                 "Adm-clerical": .065, "Farming-fishing": .015, "Transport-moving": .041, "Priv-house-serv": .0001,
+                 "Protective-serv": .027, "Armed-Forces": .0001, "?": .025},
+    },
+    "relationship": {
+        "Male|1": {"Husband": .99, "Other-relative": .01},
+        "Female|1": {"Wife": .97, "Other-relative": .03},
+        "Male|0": {"Own-child": .30, "Not-in-family": .52, "Unmarried": .10, "Other-relative": .08},
+        "Female|0": {"Own-child": .25, "Not-in-family": .42, "Unmarried": .28, "Other-relative": .05},
+    },
+    "fnlwgt": {"": {"q": [0, .1, .2, .3, .4, .5, .6, .7, .8, .9, 1],
+                    "v": [12285, 65716, 106648, 132222, 158688, 178356, 197303, 220187, 259873, 329054, 1484705]}},
+    "capital-gain": {
+        "<=50K": {"q": [0, .97, .9701, .99, 1], "v": [0, 0, 1000, 4000, 41310]},
+        ">50K": {"q": [0, .80, .8001, .90, .98, 1], "v": [0, 0, 3000, 7298, 15024, 99999]},
+    },
+    "capital-loss": {
+        "<=50K": {"q": [0, .97, .9701, 1], "v": [0, 0, 1400, 2600]},
+        ">50K": {"q": [0, .95, .9501, 1], "v": [0, 0, 1500, 3700]},
+    },
+    "hours-per-week": {
+        "<=50K": {"q": [0, .1, .2, .3, .4, .5, .6, .7, .8, .9, 1], "v": [1, 20, 30, 38, 40, 40, 40, 40, 40, 48, 99]},
+        ">50K": {"q": [0, .1, .2, .3, .4, .5, .6, .7, .8, .9, 1], "v": [1, 35, 40, 40, 40, 45, 48, 50, 50, 60, 99]},
+    },
+}
+
+NUMERIC_BY_INCOME = ["capital-gain", "capital-loss", "hours-per-week"]
+CATEGORICAL_BY_INCOME = ["workclass", "education", "occupation"]
+
+def _married(marital):
+    return np.isin(np.asarray(marital), MARRIED).astype(int)
+
+def _age_band(age):
+    return np.searchsorted(AGE_BANDS, np.asarray(age), side="right")
+
+# --- SAMPLING ---
+# Conditions are categoricals: tables are looked up once per category, rows by code.
+def _condition_rows(n, table, cond):
+    """Index of the table entry of every row (all rows -> the "" entry without condition)."""
+    if cond is None:
+        return np.zeros(n, dtype=np.int64)
+    entries = pd.Index(list(table)).get_indexer(cond.categories.astype(str))
+    rows = entries[cond.codes]
+    if (rows < 0).any():
+        missing = sorted(set(cond.categories.astype(str)[entries < 0]))
+        raise KeyError(f"No distribution for condition(s) {missing}")
+    return rows
+
+def _categorical(rng, n, table, cond=None):
+    """One value per row from the distribution of its condition (vectorised inverse CDF)."""
+    values = sorted({v for dist in table.values() for v in dist})
+    probs = np.array([[dist.get(v, 0.0) for v in values] for dist in table.values()], dtype=float)
+    cdf = np.cumsum(probs / probs.sum(axis=1, keepdims=True), axis=1)
+    cdf[:, -1] = 1.0
+    rows = _condition_rows(n, table, cond)
+    u = rng.random(n)
+    picks = np.empty(n, dtype=np.int64)
+    for i in range(len(table)):
+        mask = rows == i
+        picks[mask] = np.searchsorted(cdf[i], u[mask], side="right")
+    return pd.Categorical.from_codes(np.minimum(picks, len(values) - 1), categories=values)
+
+def _numeric(rng, n, table, cond=None):
+    rows = _condition_rows(n, table, cond)
+    out = np.empty(n, dtype=np.int64)
+    for i, spec in enumerate(table.values()):
+        mask = rows == i
+        out[mask] = np.rint(np.interp(rng.random(int(mask.sum())), spec["q"], spec["v"]))
+    return out
+
+def generate_chunk(n, model=DEFAULT_MODEL, seed=SEED, chunk_index=0):
+    """n synthetic rows with the COLUMNS schema. Same (seed, chunk_index) -> same rows."""
+    rng = np.random.default_rng([seed, chunk_index])
+    sex = _categorical(rng, n, model["sex"])
+    age = _numeric(rng, n, model["age"], sex)
+    n_bands = len(AGE_BANDS) + 1
+    band = _age_band(age)
+    marital = _categorical(rng, n, model["marital-status"],
+                           pd.Categorical.from_codes(band, categories=[str(b) for b in range(n_bands)]))
+    married = np.isin(marital.categories, MARRIED)[marital.codes].astype(np.int64)
+    race = _categorical(rng, n, model["race"])
+    country = _categorical(rng, n, model["native-country"], race)
+
+    sex_married = pd.Categorical.from_codes(sex.codes * 2 + married,
+                                            categories=[f"{s}|{m}" for s in sex.categories for m in (0, 1)])
+    p_high = np.array([model["income"].get(key, [0.0] * n_bands) for key in sex_married.categories], dtype=float)
+    income = pd.Categorical.from_codes((rng.random(n) < p_high[sex_married.codes, band]).astype(np.int8),
+                                       categories=["<=50K", ">50K"])
+
+    columns = {"age": age, "sex": sex, "race": race, "native-country": country, "marital-status": marital,
+               "income": income, "relationship": _categorical(rng, n, model["relationship"], sex_married),
+               "fnlwgt": _numeric(rng, n, model["fnlwgt"])}
+    for col in CATEGORICAL_BY_INCOME:
+        columns[col] = _categorical(rng, n, model[col], income)
+    for col in NUMERIC_BY_INCOME:
+        columns[col] = _numeric(rng, n, model[col], income)
+    edu_num = model["education-num"]
+    columns["education-num"] = np.array([edu_num[v] for v in columns["education"].categories])[columns["education"].codes]
+    return pd.DataFrame({col: columns[col] for col in COLUMNS})
+
+def generate(n_rows, path, model=None, seed=SEED, chunk_rows=CHUNK_ROWS):
+    """Writes n_rows synthetic rows to path (raw adult.data layout), chunk by chunk (memory: one chunk)."""
+    model = model or load_model()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    start = time.perf_counter()
+    for i, lo in enumerate(range(0, n_rows, chunk_rows)):
+        chunk = generate_chunk(min(chunk_rows, n_rows - lo), model, seed, i)
+        chunk.to_csv(path, index=False, header=False, mode='w' if i == 0 else 'a')
+    print(f"💾 {n_rows} synthetic rows written to {path} ({time.perf_counter() - start:.1f}s)")
+    return path
+
+# --- FITTING ---
+def _distribution(series):
+    counts = series.value_counts(normalize=True)
+    return {str(k): round(float(v), 6) for k, v in counts.items()}
+
+def _quantiles(series, points=101):
+    q = np.linspace(0, 1, points)
+    return {"q": [round(float(x), 4) for x in q], "v": [float(v) for v in np.quantile(series.to_numpy(), q)]}
+
+def fit_model(df):
+    """Estimates the DEFAULT_MODEL tables from a real dataset (columns named as COLUMNS)."""
+    df = df.copy()
+    df["_band"] = _age_band(df["age"]).astype(str)
+    df["_sex_married"] = df["sex"].astype(str) + "|" + _married(df["marital-status"]).astype(str)
+    by = lambda col, cond: {str(k): _distribution(g[col]) for k, g in df.groupby(cond, observed=True)}
+    model = {
+        "sex": {"": _distribution(df["sex"])},
+        "age": {str(k): _quantiles(g["age"]) for k, g in df.groupby("sex", observed=True)},
+        "marital-status": by("marital-status", "_band"),
+        "race": {"": _distribution(df["race"])},
+        "native-country": by("native-country", "race"),
+        "relationship": by("relationship", "_sex_married"),
+        "education-num": {str(k): int(v) for k, v in df.groupby("education")["education-num"]
+                          .agg(lambda s: s.mode().iloc[0]).items()},
+        "fnlwgt": {"": _quantiles(df["fnlwgt"])},
+    }
+    high = (df["income"].astype(str).str.strip(".") == ">50K")
+    model["income"] = {}
+    for key, g in high.groupby(df["_sex_married"]):
+        rates = g.groupby(df.loc[g.index, "_band"].astype(int)).mean()
+        model["income"][key] = [round(float(rates.get(b, 0.0)), 6) for b in range(len(AGE_BANDS) + 1)]
+    df["income"] = np.where(high, ">50K", "<=50K")
+    for col in CATEGORICAL_BY_INCOME:
+        model[col] = by(col, "income")
+    for col in NUMERIC_BY_INCOME:
+        model[col] = {str(k): _quantiles(g[col]) for k, g in df.groupby("income")}
+    return model
+
+def load_model(path=MODEL_PATH):
+    if not os.path.exists(path):
+        return DEFAULT_MODEL
+    with open(path) as f:
+        return json.load(f)
+
+def save_model(model, path=MODEL_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(model, f, indent=1)
+
+def model_fingerprint(path=MODEL_PATH):
+    """Short hash of the fitted model file, "default" for DEFAULT_MODEL: a new fit gets new files."""
+    if not os.path.exists(path):
+        return "default"
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+def synthetic_path(n_rows, seed=SEED, model_path=MODEL_PATH):
+    return os.path.join(SYNTHETIC_DIR, f"adult_synthetic_{n_rows}_{seed}_{model_fingerprint(model_path)}.data")
+
+if __name__ == "__main__":
+    # python synthetic_data.py [--fit] [rows] [seed]
+    print("\n🧪 --- SYNTHETIC ADULT DATA ---")
+    args = sys.argv[1:]
+    if "--fit" in args:
+        args.remove("--fit")
+        if not os.path.exists(DATA_PATH):
+            sys.exit(f"❌ Error: {DATA_PATH} not found, run setup_data.py first.")
+        save_model(fit_model(pd.read_csv(DATA_PATH, names=COLUMNS, skipinitialspace=True)))
+        print(f"✅ Model fitted on {DATA_PATH} and saved to {MODEL_PATH}")
+    n_rows = int(float(args[0])) if args else 1_000_000
+    seed = int(args[1]) if len(args) > 1 else SEED
+    generate(n_rows, synthetic_path(n_rows, seed), seed=seed)
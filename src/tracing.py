@@ -0,0 +1,202 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --- SPANS ---
+# with span("generalize.age", rows_in=len(df)) as s:
+#     ...
+#     s.rows_out = len(result)
+#     s.set(classes=n)         # any extra attribute
+#
+# Every span records wall time, CPU time of its thread, rows in/out, the growth of
+# the process peak RSS and (with memory=True) the tracemalloc peak above the memory
+# in use at its start. Finished spans go to a JSON-lines file or to a Chrome trace
+# (chrome://tracing, https://ui.perfetto.dev). While tracing is disabled, span()
+# returns a shared no-op object: the cost is one attribute check.
+# tracemalloc and RSS are process-wide: spans running concurrently in threads share them.
+
+class _NoSpan:
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+    def set(self, **attrs):
+        pass
+
+_NOOP = _NoSpan()
+
+class _Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def start(self, path, fmt, memory, profile, profile_dir):
+        self.path, self.fmt, self.memory = path, fmt, memory
+        self.profile, self.profile_dir = profile, profile_dir
+        self.origin = time.perf_counter_ns()
+        self.events = []
+        self.file = open(path, "w") if fmt == "jsonl" else None
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.own_tracemalloc = True
+        else:
+            self.own_tracemalloc = False
+        self.enabled = True
+
+    def stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def emit(self, record):
+        with self.lock:
+            if not self.enabled: return
+            if self.file is not None:
+                self.file.write(json.dumps(record, default=str) + "\n")
+            else:
+                args = {k: v for k, v in record.items() if k not in ("name", "start_us", "wall_s", "thread")}
+                self.events.append({"name": record["name"], "cat": record["name"].split(".")[0], "ph": "X",
+                                    "ts": record["start_us"], "dur": round(record["wall_s"] * 1e6, 1),
+                                    "pid": os.getpid(), "tid": record["thread"], "args": args})
+
+    def stop(self):
+        if not self.enabled: return
+        self.enabled = False
+        if self.file is not None:
+            self.file.close()
+        else:
+            with open(self.path, "w") as f:
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        if self.own_tracemalloc:
+            tracemalloc.stop()
+
+_TRACER = _Tracer()
+
+def _max_rss_mb():
+    if resource is None: return None
+    # ru_maxrss is in KB on Linux, in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+
+class Span:
+    def __init__(self, name, rows_in, attrs):
+        self.name, self.rows_in, self.attrs = name, rows_in, attrs
+        self.rows_out = None
+        self.child_peak = 0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        tracer = _TRACER
+        stack = tracer.stack()
+        self.depth = len(stack)
+        if tracer.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:  # the parent keeps the peak reached so far, then this span measures its own
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+            tracemalloc.reset_peak()
+            self.mem_start = current
+        stack.append(self)
+        self.profiler = _start_profiler(self) if tracer.profile and self.depth == 0 else None
+        self.rss_start = _max_rss_mb()
+        self.start_ns, self.cpu_start = time.perf_counter_ns(), time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = (time.perf_counter_ns() - self.start_ns) / 1e9
+        cpu = time.thread_time() - self.cpu_start
+        tracer = _TRACER
+        if self.profiler is not None:
+            _stop_profiler(self)
+        record = {"name": self.name, "start_us": round((self.start_ns - tracer.origin) / 1e3, 1),
+                  "wall_s": round(wall, 6), "cpu_s": round(cpu, 6), "depth": self.depth,
+                  "thread": threading.get_ident(), "rows_in": self.rows_in, "rows_out": self.rows_out}
+        rss_end = _max_rss_mb()
+        if rss_end is not None:
+            record["peak_rss_mb"] = round(rss_end, 1)
+            record["peak_rss_delta_mb"] = round(rss_end - self.rss_start, 1)
+        stack = tracer.stack()
+        stack.pop()
+        if tracer.memory:
+            peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            record["tracemalloc_peak_mb"] = round((peak - self.mem_start) / 2**20, 2)
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+            tracemalloc.reset_peak()
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        record.update(self.attrs)
+        tracer.emit(record)
+        return False
+
+def span(name, rows_in=None, **attrs):
+    """Context manager timing a block (see above). No-op unless tracing is enabled."""
+    if not _TRACER.enabled:
+        return _NOOP
+    return Span(name, rows_in, attrs)
+
+# --- PROFILER HOOK ---
+# Top-level spans (pipeline stages) can run under cProfile or pyinstrument (optional
+# dependency); one report per stage is written to profile_dir.
+def _start_profiler(s):
+    if _TRACER.profile == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("⚠️  pyinstrument not installed, stage not profiled.")
+            return None
+        profiler = Profiler()
+    else:
+        import cProfile
+        profiler = cProfile.Profile()
+    try:
+        profiler.start() if _TRACER.profile == "pyinstrument" else profiler.enable()
+    except ValueError:  # another profiler is active (concurrent stage)
+        return None
+    return profiler
+
+def _stop_profiler(s):
+    os.makedirs(_TRACER.profile_dir, exist_ok=True)
+    base = os.path.join(_TRACER.profile_dir, s.name.replace("/", "_"))
+    if _TRACER.profile == "pyinstrument":
+        s.profiler.stop()
+        with open(base + ".html", "w") as f:
+            f.write(s.profiler.output_html())
+    else:
+        s.profiler.disable()
+        s.profiler.dump_stats(base + ".prof")
+
+# --- CONTROL ---
+def enable(path, fmt=None, memory=False, profile=None, profile_dir=None):
+    """Starts recording spans to path: "chrome" trace (default for .json) or "jsonl" lines.
+
+    memory: also track tracemalloc peaks (slows the traced code down noticeably).
+    profile: None, "cprofile" or "pyinstrument" - profiles every top-level span.
+    """
+    if _TRACER.enabled: disable()
+    fmt = fmt or ("jsonl" if path.endswith(".jsonl") else "chrome")
+    profile_dir = profile_dir or os.path.splitext(path)[0] + "_profiles"
+    _TRACER.start(path, fmt, memory, profile, profile_dir)
+
+def disable():
+    """Stops recording and writes the trace file."""
+    _TRACER.stop()
+
+def enabled():
+    return _TRACER.enabled
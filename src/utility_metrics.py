@@ -0,0 +1,213 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+try:
+    from risk_analyser import load_data, QUASI_IDENTIFIERS
+    from hierarchies import compile_hierarchies, IntervalHierarchy
+    from lattice_search import bottom_table, group_keys, aggregate, cardinalities, discernibility
+    from class_stats import l_distinct, t_variational
+except ImportError:
+    sys.exit("❌ Error: risk_analyser.py / hierarchies.py not found")
+
+# CONFIGURATION
+REPORT_PATH = os.path.join(current_dir, "../data/tradeoff_report.json")
+SENSITIVE_ATTRIBUTE = "income"
+
+# --- METRICS ON CLASS SIZES ---
+# (discernibility is lattice_search.discernibility, shared with the search)
+def c_avg(sizes, k):
+    """Normalised average class size (released rows / classes) / k: 1 when every class has exactly k rows."""
+    return float(np.sum(sizes) / len(sizes) / k) if len(sizes) and k else 0.0
+
+# --- METRICS PER QI ---
+# A QI's loss is computed from its (raw value, released label) pairs and the rows of
+# each pair, never from the rows themselves:
+#   NCP: a label costs (leaves - 1) / (domain - 1) for categorical QIs, and its value
+#        span / the domain span for numeric ones (spans of the observed raw values);
+#   non-uniform entropy: a raw value u released as label L costs -log2 P(u | L), with
+#        P taken from the raw value frequencies.
+# Suppressed rows are released as "*": NCP 1, entropy -log2 P(u).
+class QIDomain:
+    """Raw value frequencies of one QI (missing values in the last slot), plus the values of numeric QIs."""
+
+    def __init__(self, compiled):
+        n = len(compiled.uniques)
+        self.freq = np.bincount(compiled.codes % (n + 1), minlength=n + 1)
+        self.n_rows = int(self.freq.sum())
+        self.size = int(np.count_nonzero(self.freq))
+        self.values = None
+        if isinstance(compiled.hierarchy, IntervalHierarchy):
+            self.values = np.append(pd.to_numeric(pd.Series(compiled.uniques)).to_numpy(dtype=float), np.nan)
+            self.span = float(np.nanmax(self.values) - np.nanmin(self.values)) if self.size else 0.0
+
+    def loss(self, raw, label, kept, suppressed):
+        """(NCP, entropy bits) summed over the rows of the unique pairs (raw[i], label[i])."""
+        _, label_ids = np.unique(label, return_inverse=True)
+        label_ids = label_ids.ravel()
+        n_labels = int(label_ids.max()) + 1 if len(label_ids) else 0
+        freq = self.freq[raw].astype(float)
+        mass = np.bincount(label_ids, weights=freq, minlength=n_labels)
+        bits = -np.log2(freq / mass[label_ids])
+        suppressed_bits = -np.log2(freq / self.n_rows)
+        if self.values is not None:
+            values = self.values[raw]
+            low, high = np.full(n_labels, np.inf), np.full(n_labels, -np.inf)
+            np.fmin.at(low, label_ids, values)
+            np.fmax.at(high, label_ids, values)
+            width = np.where(np.isfinite(high - low), high - low, 0.0)
+            ncp = width[label_ids] / self.span if self.span > 0 else np.zeros(len(raw))
+        else:
+            leaves = np.bincount(label_ids, minlength=n_labels)
+            ncp = (leaves[label_ids] - 1) / (self.size - 1) if self.size > 1 else np.zeros(len(raw))
+        return float(kept @ ncp + suppressed.sum()), float(kept @ bits + suppressed @ suppressed_bits)
+
+def _report(qi_list, losses, n_rows, counts, kept, k=None, levels=None, heights=None):
+    """Privacy + utility summary of a release: counts = class table, kept = released classes."""
+    sizes = counts.sum(axis=1)
+    kept_sizes, kept_counts = sizes[kept], counts[kept]
+    suppressed = n_rows - int(kept_sizes.sum())
+    achieved_k = int(kept_sizes.min()) if len(kept_sizes) else 0
+    per_qi = {}
+    for i, qi in enumerate(qi_list):
+        ncp, bits = losses[i]
+        per_qi[qi] = {"level": None if levels is None else int(levels[i]),
+                      "height": None if levels is None else (levels[i] / heights[i] if heights[i] else 0.0),
+                      "ncp": ncp / n_rows if n_rows else 0.0, "entropy_bits": bits / n_rows if n_rows else 0.0}
+    released = kept_counts.sum(axis=0)
+    return {
+        "rows": n_rows,
+        "classes": int(len(kept_sizes)),
+        "suppressed": suppressed,
+        "suppression": suppressed / n_rows if n_rows else 0.0,
+        "k": achieved_k,
+        "l": int(l_distinct(kept_counts).min()) if len(kept_sizes) else 0,
+        "t": float(t_variational(kept_counts, released / released.sum()).max()) if len(kept_sizes) else 0.0,
+        "discernibility": discernibility(kept_sizes, suppressed, n_rows),
+        "c_avg": c_avg(kept_sizes, k if k and k > 1 else achieved_k),
+        "height": None if levels is None else float(np.mean([q["height"] for q in per_qi.values()])),
+        "ncp": float(np.mean([q["ncp"] for q in per_qi.values()])),
+        "entropy_bits": float(sum(q["entropy_bits"] for q in per_qi.values())),
+        "per_qi": per_qi,
+    }
+
+# --- NODES OF THE LATTICE ---
+class UtilityModel:
+    """Privacy and utility of any full-domain node of one dataset.
+
+    Built once from the raw class table (the only pass over the rows); every node is
+    then evaluated by rolling that table up, so evaluate() fits inside a search loop.
+    """
+
+    def __init__(self, df, qi_list=QUASI_IDENTIFIERS, sensitive_col=SENSITIVE_ATTRIBUTE, registry=None):
+        self.qi_list = list(qi_list)
+        self.compiled = compile_hierarchies(df, self.qi_list, registry)
+        sensitive_codes, values = pd.factorize(df[sensitive_col])
+        self.keys, self.counts = bottom_table(self.compiled, self.qi_list, sensitive_codes, len(values))
+        self.sizes = self.counts.sum(axis=1)
+        self.n_rows = int(self.sizes.sum())
+        self.heights = [self.compiled[qi].height for qi in self.qi_list]
+        self.domains = [QIDomain(self.compiled[qi]) for qi in self.qi_list]
+
+    def evaluate(self, node, k=1, l=None):
+        """Report of a node ({qi: level} or levels in qi_list order) when classes violating k / l are suppressed."""
+        node = tuple(node[qi] for qi in self.qi_list) if isinstance(node, dict) else tuple(node)
+        keys = self.keys.copy()
+        for i, qi in enumerate(self.qi_list):
+            if node[i]:
+                keys[:, i] = self.compiled[qi].rollup(0, node[i])[keys[:, i]]
+        ids, first = group_keys(keys, cardinalities(self.compiled, self.qi_list, node))
+        counts = aggregate(ids, len(first), self.counts)
+        kept = counts.sum(axis=1) >= k
+        if l: kept &= l_distinct(counts) >= l
+
+        # Full-domain: the label of a raw value is fixed, so the pairs are the raw values
+        kept_rows = np.where(kept[ids], self.sizes, 0)
+        losses = []
+        for i, (qi, domain) in enumerate(zip(self.qi_list, self.domains)):
+            n = len(domain.freq)
+            released = np.bincount(self.keys[:, i], weights=kept_rows, minlength=n)
+            dropped = np.bincount(self.keys[:, i], weights=self.sizes - kept_rows, minlength=n)
+            raw = np.flatnonzero(domain.freq)
+            losses.append(domain.loss(raw, self.compiled[qi].maps[node[i]][raw], released[raw], dropped[raw]))
+        return _report(self.qi_list, losses, self.n_rows, counts, kept, k, node, self.heights)
+
+    def loss(self, metric="ncp", k=1, l=None):
+        """Loss function for lattice_search.search_lattice ranking the nodes by a report metric."""
+        memo = {}
+        def node_loss(node, heights):
+            if node not in memo:
+                memo[node] = self.evaluate(node, k, l)[metric]
+            return memo[node]
+        return node_loss
+
+# --- A RELEASE ---
+def release_utility(df_raw, stats, kept, levels=None, registry=None):
+    """Report of a release from the class stats of its generalized frame (any mode, Mondrian included).
+
+    stats: EquivalenceClassStats of the generalized rows (same order as df_raw);
+    kept: released classes; levels: the full-domain levels, if any (for the heights).
+    """
+    qi_list = stats.qi_list
+    compiled = compile_hierarchies(df_raw, qi_list, registry)
+    kept = np.asarray(kept)
+    kept_rows = kept[stats.group_ids]
+    losses = []
+    for qi in qi_list:
+        domain = QIDomain(compiled[qi])
+        label_ids, _ = pd.factorize(stats.keys[qi], use_na_sentinel=False)
+        n_labels = int(label_ids.max()) + 1 if len(label_ids) else 1
+        # Rows of every (raw code, label) pair, counted directly in the pair space
+        pair_of_row = (compiled[qi].codes % len(domain.freq)).astype(np.int64) * n_labels + label_ids[stats.group_ids]
+        size = len(domain.freq) * n_labels
+        released = np.bincount(pair_of_row[kept_rows], minlength=size)
+        dropped = np.bincount(pair_of_row[~kept_rows], minlength=size)
+        pairs = np.flatnonzero(released + dropped)
+        losses.append(domain.loss(pairs // n_labels, pairs % n_labels, released[pairs], dropped[pairs]))
+    node = None if levels is None else [levels[qi] for qi in qi_list]
+    heights = [compiled[qi].height for qi in qi_list]
+    return _report(qi_list, losses, stats.n_rows, stats.counts, kept, None, node, heights)
+
+def print_report(report):
+    print(f"\n⚖️  PRIVACY / UTILITY TRADE-OFF:")
+    print(f"   Privacy: k={report['k']}  l={report['l']}  t={report['t']:.3f}  "
+          f"suppressed {report['suppressed']} rows ({report['suppression']:.1%}), {report['classes']} classes")
+    print(f"   Utility: discernibility={report['discernibility']:,}  C_avg={report['c_avg']:.2f}  "
+          f"NCP={report['ncp']:.3f}  entropy={report['entropy_bits']:.2f} bits/row"
+          + ("" if report["height"] is None else f"  height={report['height']:.2f}"))
+    print(f"   {'QI':<16} | {'Level':>5} | {'Height':>6} | {'NCP':>6} | {'Entropy (bits)':>14}")
+    for qi, q in report["per_qi"].items():
+        level = "-" if q["level"] is None else q["level"]
+        height = "-" if q["height"] is None else f"{q['height']:.2f}"
+        print(f"   {qi:<16} | {level:>5} | {height:>6} | {q['ncp']:>6.3f} | {q['entropy_bits']:>14.3f}")
+
+def save_report(report, path=REPORT_PATH):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+if __name__ == "__main__":
+    # Trade-off of every node of the lattice with the suppression of the pipeline (l >= 2)
+    print("\n⚖️  --- UTILITY METRICS ---")
+    df = load_data(columns=QUASI_IDENTIFIERS + [SENSITIVE_ATTRIBUTE])
+    if df is None: sys.exit(1)
+    start = time.perf_counter()
+    model = UtilityModel(df)
+    built = time.perf_counter()
+    nodes = list(np.ndindex(*[h + 1 for h in model.heights]))
+    reports = [(node, model.evaluate(node, l=2)) for node in nodes]
+    elapsed = time.perf_counter() - built
+    print(f"[*] Model built in {built - start:.3f}s; {len(nodes)} nodes evaluated in {elapsed:.3f}s "
+          f"({elapsed / len(nodes) * 1000:.2f} ms per node).")
+
+    print(f"\n{'Levels':<18} | {'k':>5} | {'Suppr.':>6} | {'Discernibility':>15} | {'C_avg':>7} | {'NCP':>5} | {'Entropy':>7}")
+    print("-" * 82)
+    for node, r in sorted(reports, key=lambda nr: nr[1]["ncp"])[:15]:
+        print(f"{str(tuple(int(v) for v in node)):<18} | {r['k']:>5} | {r['suppression']:>6.1%} | "
+              f"{r['discernibility']:>15,} | {r['c_avg']:>7.2f} | {r['ncp']:>5.3f} | {r['entropy_bits']:>7.2f}")
@@ -1,6 +1,8 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
+import itertools
+import math
+import random
 import os
 import sys
 
@@ -9,69 +11,172 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
 try:
-    from risk_analyser import load_data, analyze_k_anonymity, QUASI_IDENTIFIERS
+    from risk_analyser import load_data, QUASI_IDENTIFIERS
+    from hierarchies import compile_hierarchies
+    from class_stats import EquivalenceClassStats
+    from anonymiser import GENERALIZATION_LEVELS
+    from lattice_search import bottom_table, rollup_table
+    from tracing import span
 except ImportError:
-    sys.exit("❌ Error: risk_analyser.py not found.")
+    sys.exit("❌ Error: risk_analyser.py / hierarchies.py / anonymiser.py not found.")
 
-# --- TRANSFORMATION LOGIC (For Visualization) ---
-def age_strong(age):
-    age = int(age)
-    if age < 30: return "<30"
-    elif age < 50: return "30-49"
-    elif age < 70: return "50-69"
-    else: return "70+"
+OUTPUT_PATH = os.path.join(current_dir, "../data/k_anonimity_chart.png")
+PATHS_OUTPUT_PATH = os.path.join(current_dir, "../data/k_anonimity_paths.png")
+SENSITIVE = "income"
+PLOT_CANDIDATE_PATHS = False  # Also chart every one-level-at-a-time path to GENERALIZATION_LEVELS
+MAX_CANDIDATE_PATHS = 500
 
 def get_stats(df, qi_list):
-    k, _, risk_count_1 = analyze_k_anonymity(df, qi_list)
-    return risk_count_1, k
+    stats = EquivalenceClassStats(df, qi_list)
+    return stats.uniques, stats.k
 
-if __name__ == "__main__":
-    print("\n📉 --- VISUALIZING K-ANONYMITY PROCESS ---")
-    df = load_data()
-    if df is None: sys.exit(1)
-    
+class ClassTableWalker:
+    """k / uniques of generalization nodes without touching the rows again.
+
+    The QIs are encoded once into the class table of the raw data (lattice_search);
+    every other node is rolled up from an already computed finer node, at a cost
+    proportional to the number of classes. Tables are memoized per node, so paths
+    sharing a prefix share its work.
+    """
+
+    def __init__(self, df, qi_list, sensitive_col):
+        self.qi_list = list(qi_list)
+        self.compiled = compile_hierarchies(df, self.qi_list)
+        codes, values = pd.factorize(df[sensitive_col])
+        self.bottom = tuple(0 for _ in self.qi_list)
+        self.tables = {self.bottom: bottom_table(self.compiled, self.qi_list, codes, len(values))}
+
+    def node(self, levels):
+        """Lattice node (tuple in qi_list order) of a {QI: level} dict, missing QIs at level 0."""
+        return tuple(levels.get(qi, 0) for qi in self.qi_list)
+
+    def table(self, node, parent=None):
+        if node not in self.tables:
+            if parent is None or parent not in self.tables:
+                parent = max((n for n in self.tables if all(a <= b for a, b in zip(n, node))), key=sum)
+            self.tables[node] = rollup_table(self.tables[parent], self.compiled, self.qi_list, parent, node)
+        return self.tables[node]
+
+    def stats(self, node, parent=None, min_l=None):
+        """(uniques, k) of a node; with min_l, after suppressing the classes with fewer sensitive values."""
+        counts = self.table(node, parent)[1]
+        if min_l: counts = counts[(counts > 0).sum(axis=1) >= min_l]
+        sizes = counts.sum(axis=1)
+        return int((sizes == 1).sum()), int(sizes.min()) if len(sizes) else 0
+
+    def trajectory(self, path):
+        """[(uniques, k)] after every node of a path (a list of nodes, each coarser than the previous)."""
+        result, previous = [], None
+        for node in path:
+            result.append(self.stats(node, previous))
+            previous = node
+        return result
+
+def candidate_paths(target, limit=MAX_CANDIDATE_PATHS, seed=0):
+    """Paths from the raw node to target raising one QI by one level per step (sampled above limit)."""
+    moves = [i for i, lvl in enumerate(target) for _ in range(lvl)]
+    n_orders = math.factorial(len(moves)) // math.prod(math.factorial(lvl) for lvl in target)
+    if n_orders <= limit:
+        orders = sorted(set(itertools.permutations(moves)))
+    else:
+        rng, orders = random.Random(seed), set()
+        while len(orders) < limit:
+            orders.add(tuple(rng.sample(moves, len(moves))))
+        orders = sorted(orders)
+    paths = []
+    for order in orders:
+        node = [0] * len(target)
+        path = [tuple(node)]
+        for i in order:
+            node[i] += 1
+            path.append(tuple(node))
+        paths.append(path)
+    return paths
+
+def simulate_steps(df, walker=None):
+    """Uniques and k after every generalization step and after suppression."""
     history = []
-    df_current = df.astype(str)
+    walker = walker or ClassTableWalker(df, QUASI_IDENTIFIERS, SENSITIVE)
 
     # --- PHASE 1: GENERALIZATION STEPS ---
+    # (label, QI, level from hierarchies.HIERARCHIES) - same levels as anonymiser.py
     steps_config = [
         ("1. Raw", None, None), 
-        ("2. Country", 'native-country', lambda x: "US" if x.strip() == "United-States" else "Non-US"),
-        ("3. Marital", 'marital-status', lambda x: "Married" if x.strip().startswith("Married") else "Single"),
-        ("4. Race", 'race', lambda x: "White" if x.strip() == "White" else "Other"),
-        ("5. Age", 'age', age_strong),
-        ("6. Sex", 'sex', lambda x: "Person")
+        ("2. Country", 'native-country', GENERALIZATION_LEVELS['native-country']),
+        ("3. Marital", 'marital-status', GENERALIZATION_LEVELS['marital-status']),
+        ("4. Race", 'race', GENERALIZATION_LEVELS['race']),
+        ("5. Age", 'age', GENERALIZATION_LEVELS['age']),
+        ("6. Sex", 'sex', GENERALIZATION_LEVELS['sex'])
     ]
 
     print("[*] Simulating anonymization steps for plotting...")
-    for label, col, func in steps_config:
-        if col and func:
-            if col == 'age': 
-                df_current[col] = df['age'].apply(func) 
-            else:
-                df_current[col] = df_current[col].apply(func)
-        
-        uniques, k = get_stats(df_current, QUASI_IDENTIFIERS)
+    levels, previous = {}, None
+    for label, col, level in steps_config:
+        if col:
+            levels[col] = level
+        node = walker.node(levels)
+        uniques, k = walker.stats(node, previous)
+        previous = node
         print(f"   👉 {label:<15} | Uniques: {uniques:<5} | k: {k}")
         history.append({"Step": label, "Uniques": uniques, "k": k})
 
     # --- PHASE 2: SUPPRESSION ---
-    SENSITIVE = "income"
-    df_current['l_score'] = df_current.groupby(QUASI_IDENTIFIERS)[SENSITIVE].transform('nunique')
-    df_suppressed = df_current[df_current['l_score'] >= 2].copy()
-    
-    uniques, k = get_stats(df_suppressed, QUASI_IDENTIFIERS)
+    uniques, k = walker.stats(previous, min_l=2)
     print(f"   👉 {'7. Suppression':<15} | Uniques: {uniques:<5} | k: {k}")
     history.append({"Step": "7. Suppression", "Uniques": uniques, "k": k})
+    return history
+
+def simulate_paths(df, target=None, limit=MAX_CANDIDATE_PATHS, walker=None):
+    """k / uniques trajectories of the candidate paths to target (default: GENERALIZATION_LEVELS)."""
+    walker = walker or ClassTableWalker(df, QUASI_IDENTIFIERS, SENSITIVE)
+    target = walker.node(target or GENERALIZATION_LEVELS)
+    paths = candidate_paths(target, limit)
+    trajectories = [walker.trajectory(path) for path in paths]
+    print(f"[*] {len(paths)} candidate paths, {len(walker.tables)} class tables computed.")
+    return paths, trajectories
+
+def plot_paths(trajectories, out_path=PATHS_OUTPUT_PATH):
+    """Uniques per step of every candidate path; the envelope shows the best and worst order."""
+    # Plotting libraries load only when a chart is rendered (audits never pay for them)
+    from matplotlib.figure import Figure
+    import seaborn as sns
+    print("[*] Rendering candidate paths chart...")
+    uniques = np.array([[u for u, _ in t] for t in trajectories])
+    steps = np.arange(uniques.shape[1])
+
+    sns.set_theme(style="white")
+    fig = Figure(figsize=(14, 9))
+    ax = fig.subplots()
+    ax.grid(axis='y', linestyle='--', alpha=0.5, color='gray', zorder=0)
+    for row in uniques:
+        ax.plot(steps, row, color='#c0392b', alpha=max(0.02, 1 / len(uniques)), linewidth=1, zorder=2)
+    ax.fill_between(steps, uniques.min(axis=0), uniques.max(axis=0), color='#c0392b', alpha=0.1, zorder=1)
+    ax.plot(steps, uniques.min(axis=0), color='#27ae60', linewidth=3, zorder=3, label='Best order')
+    ax.plot(steps, uniques.max(axis=0), color='#2c3e50', linewidth=3, zorder=3, label='Worst order')
+
+    ax.set_title(f'Risk Reduction of {len(uniques)} Generalization Orders', fontsize=18, fontweight='bold', pad=20)
+    ax.set_xlabel('Generalization Step (one hierarchy level)', fontsize=14, fontweight='bold')
+    ax.set_ylabel('Unique Records (Risk)', fontsize=14, fontweight='bold')
+    ax.set_xticks(steps)
+    ax.legend(loc='upper right', frameon=True, edgecolor='black')
+
+    with span("chart.k_paths"):
+        fig.tight_layout()
+        fig.savefig(out_path, dpi=300)
+    print(f"✅ Chart saved to: {out_path}")
 
-    # --- PLOTTING ---
+def plot_history(history, out_path=OUTPUT_PATH):
+    # Plotting libraries load only when a chart is rendered (audits never pay for them)
+    from matplotlib.figure import Figure
+    import seaborn as sns
     print("[*] Rendering chart...")
     steps = [x['Step'] for x in history]
     values_uniques = [x['Uniques'] for x in history]
     values_k = [x['k'] for x in history]
 
     sns.set_theme(style="white")
-    fig, ax1 = plt.subplots(figsize=(14, 9))
+    fig = Figure(figsize=(14, 9))
+    ax1 = fig.subplots()
     ax1.grid(axis='y', linestyle='--', alpha=0.5, color='gray', zorder=0)
 
     # Risk Bars
@@ -104,11 +209,21 @@ if __name__ == "__main__":
                  bbox=dict(facecolor='white', edgecolor='#2980b9', boxstyle='round,pad=0.2', alpha=0.9))
 
     # Titles and Layout
-    plt.title('Anonymization Process: Risk Reduction vs K-Anonymity Increase', fontsize=18, fontweight='bold', pad=20)
+    ax2.set_title('Anonymization Process: Risk Reduction vs K-Anonymity Increase', fontsize=18, fontweight='bold', pad=20)
     ax1.set_xticks(range(len(steps)))
     ax1.set_xticklabels(steps, fontsize=11, fontweight='bold')
     
-    plt.tight_layout()
-    out_path = os.path.join(current_dir, "../data/k_anonimity_chart.png")
-    plt.savefig(out_path, dpi=300)
-    print(f"✅ Chart saved to: {out_path}")
\ No newline at end of file
+    with span("chart.k"):
+        fig.tight_layout()
+        fig.savefig(out_path, dpi=300)
+    print(f"✅ Chart saved to: {out_path}")
+
+if __name__ == "__main__":
+    print("\n📉 --- VISUALIZING K-ANONYMITY PROCESS ---")
+    df = load_data()
+    if df is None: sys.exit(1)
+    
+    walker = ClassTableWalker(df, QUASI_IDENTIFIERS, SENSITIVE)
+    plot_history(simulate_steps(df, walker))
+    if PLOT_CANDIDATE_PATHS:
+        plot_paths(simulate_paths(df, walker=walker)[1])
@@ -1,6 +1,4 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
 import sys
 
@@ -9,6 +7,9 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 try:
     from risk_analyser import QUASI_IDENTIFIERS, COLUMNS
+    from class_stats import EquivalenceClassStats
+    from artefact_store import load_dataset
+    from tracing import span
 except ImportError:
     sys.exit("❌ Error: risk_analyser.py not found.")
 
@@ -18,35 +19,32 @@ PATH_FINAL = os.path.join(current_dir, "../data/adult_anonymized.csv")
 OUTPUT_PATH = os.path.join(current_dir, "../data/l_diversity_chart.png")
 SENSITIVE = "income"
 
-def get_distribution(path, stage_label):
-    if not os.path.exists(path):
-        return pd.DataFrame()
-    
-    df = pd.read_csv(path, names=COLUMNS, skipinitialspace=True)
-    groups = df.groupby(QUASI_IDENTIFIERS)
-    l_vals = [g[SENSITIVE].nunique() for _, g in groups]
-    
-    counts = pd.Series(l_vals).value_counts().sort_index()
+def distribution_from_stats(stats, stage_label):
+    """Number of groups per l-value, from precomputed EquivalenceClassStats."""
+    with span("metric.l", classes=stats.n_classes):
+        counts = pd.Series(stats.l_distinct()).value_counts().sort_index()
     return pd.DataFrame({'l_value': counts.index, 'count': counts.values, 'Stage': stage_label})
 
-if __name__ == "__main__":
-    print("\n📊 --- VISUALIZING L-DIVERSITY DISTRIBUTION ---")
-    
-    # 1. Load Data
-    print("[*] Loading datasets (Intermediate vs Final)...")
-    df_before = get_distribution(PATH_INTERMEDIATE, "Before (Risk)")
-    df_after = get_distribution(PATH_FINAL, "After (Safe)")
+def get_distribution(path, stage_label):
+    # Only the QIs and the sensitive column are read (from the columnar copy when available)
+    df, _ = load_dataset(path, COLUMNS, QUASI_IDENTIFIERS + [SENSITIVE])
+    if df is None:
+        return pd.DataFrame()
     
-    if df_before.empty or df_after.empty:
-        sys.exit("❌ Error: Missing data. Run anonymizer.py first.")
+    return distribution_from_stats(EquivalenceClassStats(df, QUASI_IDENTIFIERS, SENSITIVE), stage_label)
 
+def plot_distributions(df_before, df_after, out_path=OUTPUT_PATH):
+    # Plotting libraries load only when a chart is rendered (audits never pay for them)
+    from matplotlib.figure import Figure
+    import seaborn as sns
     combined = pd.concat([df_before, df_after])
     combined['l_value'] = combined['l_value'].astype(int)
 
     # 2. Setup Plot
     print("[*] Generating comparison chart...")
     sns.set_theme(style="white")
-    fig, ax = plt.subplots(figsize=(12, 8))
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
     
     num_categories = combined['l_value'].nunique()
     max_idx = num_categories - 1
@@ -63,7 +61,7 @@ if __name__ == "__main__":
     # Bars
     palette = {"Before (Risk)": "#c0392b", "After (Safe)": "#2980b9"}
     sns.barplot(data=combined, x='l_value', y='count', hue='Stage', palette=palette, 
-                alpha=1, zorder=3, edgecolor='white', width=0.6)
+                alpha=1, zorder=3, edgecolor='white', width=0.6, ax=ax)
 
     # Text Labels
     ax.text(0, y_limit * 0.94, "DANGER ZONE\n(Attribute Disclosure)", 
@@ -98,9 +96,38 @@ if __name__ == "__main__":
     ax.set_ylabel("Number of Groups", fontsize=12, fontweight='bold')
     ax.set_xlabel("")
     
-    plt.legend(title="Dataset Version", loc='upper left', bbox_to_anchor=(0.02, 0.85), 
-               fontsize=10, title_fontsize=11, framealpha=0.9, edgecolor='#ccc')
+    ax.legend(title="Dataset Version", loc='upper left', bbox_to_anchor=(0.02, 0.85), 
+              fontsize=10, title_fontsize=11, framealpha=0.9, edgecolor='#ccc')
+
+    with span("chart.l"):
+        fig.tight_layout()
+        fig.savefig(out_path, dpi=300)
+    print(f"✅ Chart saved to: {out_path}")
 
-    plt.tight_layout()
-    plt.savefig(OUTPUT_PATH, dpi=300)
-    print(f"✅ Chart saved to: {OUTPUT_PATH}")
\ No newline at end of file
+def print_distributions(df_before, df_after, min_l=2):
+    """Groups per l-value before / after suppression. Returns the groups of the final file below min_l."""
+    table = pd.concat([df_before, df_after]).pivot_table(index='l_value', columns='Stage', values='count', fill_value=0)
+    print(f"\n{'l':>4} | {'Before (groups)':>15} | {'After (groups)':>14}")
+    print("-" * 40)
+    for l_value, row in table.iterrows():
+        print(f"{int(l_value):>4} | {int(row.get('Before (Risk)', 0)):>15} | {int(row.get('After (Safe)', 0)):>14}")
+    violations = int(df_after.loc[df_after['l_value'] < min_l, 'count'].sum())
+    print(f"{'✅' if not violations else '❌'} Final release: {violations} groups with l < {min_l}.")
+    return violations
+
+def audit_l_diversity(min_l=2, plot=True, out_path=OUTPUT_PATH):
+    """Loads both files, reports the l distribution and plots it unless plot=False. None if a file is missing."""
+    print("[*] Loading datasets (Intermediate vs Final)...")
+    df_before = get_distribution(PATH_INTERMEDIATE, "Before (Risk)")
+    df_after = get_distribution(PATH_FINAL, "After (Safe)")
+    if df_before.empty or df_after.empty:
+        return None
+    violations = print_distributions(df_before, df_after, min_l)
+    if plot:
+        plot_distributions(df_before, df_after, out_path)
+    return violations
+
+if __name__ == "__main__":
+    print("\n📊 --- VISUALIZING L-DIVERSITY DISTRIBUTION ---")
+    if audit_l_diversity() is None:
+        sys.exit("❌ Error: Missing data. Run anonymizer.py first.")
\ No newline at end of file
@@ -1,6 +1,4 @@
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 import numpy as np
 import os
 import sys
@@ -11,6 +9,9 @@ sys.path.append(current_dir)
 
 try:
     from risk_analyser import QUASI_IDENTIFIERS, COLUMNS
+    from class_stats import EquivalenceClassStats
+    from artefact_store import load_dataset
+    from tracing import span
 except ImportError:
     sys.exit("❌ Error: risk_analyser.py not found.")
 
@@ -19,52 +20,34 @@ INPUT_PATH = os.path.join(current_dir, "../data/adult_anonymized.csv")
 OUTPUT_CHART_PATH = os.path.join(current_dir, "../data/t_closeness_analysis.png")
 SENSITIVE_ATTR = "income"
 THRESHOLDS_TO_TEST = [0.15, 0.20, 0.25, 0.30]
-
-def calculate_t_values(df, sensitive_col):
-    global_dist = df[sensitive_col].value_counts(normalize=True).sort_index()
-    groups = df.groupby(QUASI_IDENTIFIERS)
-    
-    t_list = []
-    group_sizes = []
-    worst_t = -1
-
-    for name, group in groups:
-        local_dist = group[sensitive_col].value_counts(normalize=True)
-        local_dist = local_dist.reindex(global_dist.index, fill_value=0.0)
-        
-        # Variational Distance Formula
-        t = 0.5 * np.sum(np.abs(local_dist - global_dist))
-        
-        t_list.append(t)
-        group_sizes.append(len(group))
-        if t > worst_t: worst_t = t
-
-    return t_list, group_sizes, global_dist, worst_t
-
-if __name__ == "__main__":
-    print("\n🚀 --- T-CLOSENESS VISUALIZER & AUDITOR ---")
-
-    # 1. LOAD DATA
-    if not os.path.exists(INPUT_PATH):
-        sys.exit(f"❌ Error: {INPUT_PATH} not found.")
-    
-    df = pd.read_csv(INPUT_PATH, names=COLUMNS, skipinitialspace=True)
-    total_rows = len(df)
-    
-    # 2. CALCULATE METRICS
-    print("⚙️  Calculating t-closeness for all groups...")
-    t_values, sizes, glob_d, max_t = calculate_t_values(df, SENSITIVE_ATTR)
-    avg_t = np.mean(t_values)
-    
-    print(f"\n📊 CURRENT STATUS:")
-    print(f"   Max t-value: {max_t:.4f} (Worst Case)")
-    print(f"   Avg t-value: {avg_t:.4f}")
-
-    # 3. VISUALIZATION
+# "variational" (categorical sensitive attributes) or "emd" (ordered Earth Mover's Distance, numeric ones)
+T_METRIC = "variational"
+
+def calculate_t_values(df, sensitive_col, metric=T_METRIC, stats=None):
+    with span("metric.t", rows_in=len(df), metric=metric):
+        stats = stats or EquivalenceClassStats(df, QUASI_IDENTIFIERS, sensitive_col)
+
+        # Distance of every group at once, from the group x sensitive-value count matrix
+        t_list = stats.t_emd() if metric == "emd" else stats.t_variational()
+    return t_list, stats.sizes, stats.global_distribution(), t_list.max() if len(t_list) else -1
+
+def violations_per_threshold(t_values, sizes, thresholds):
+    """Groups and rows with t > threshold, for every threshold, from one sort + cumulative sum."""
+    order = np.argsort(t_values, kind='stable')
+    t_sorted = np.asarray(t_values)[order]
+    rows_cum = np.concatenate(([0], np.cumsum(np.asarray(sizes)[order])))
+    within = np.searchsorted(t_sorted, thresholds, side='right')
+    return len(t_sorted) - within, rows_cum[-1] - rows_cum[within]
+
+def plot_t_values(t_values, max_t, out_path=OUTPUT_CHART_PATH):
+    # Plotting libraries load only when a chart is rendered (audits never pay for them)
+    from matplotlib.figure import Figure
+    import seaborn as sns
     print(f"🎨 Generating distribution chart...")
     
     sns.set_theme(style="white") 
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = Figure(figsize=(12, 7))
+    ax = fig.subplots()
     
     plot_df = pd.DataFrame({'t-value': t_values})
 
@@ -78,23 +61,24 @@ if __name__ == "__main__":
         edgecolor=None,        
         alpha=0.85,            
         line_kws={'linewidth': 2},
-        zorder=3
+        zorder=3,
+        ax=ax
     )
 
     # Max Risk Line
-    plt.axvline(max_t, color='#c0392b', linestyle='--', linewidth=2.5, zorder=4,
-                label=f'Worst Group Risk (t={max_t:.3f})')
+    ax.axvline(max_t, color='#c0392b', linestyle='--', linewidth=2.5, zorder=4,
+               label=f'Worst Group Risk (t={max_t:.3f})')
     
     # Risk Zones
-    plt.axvspan(0, 0.2, color='#27ae60', alpha=0.3, zorder=1, label='Safe Zone (t < 0.2)')
-    plt.axvspan(0.2, 0.3, color='#f1c40f', alpha=0.3, zorder=1, label='Moderate Risk (0.2-0.3)')
-    plt.axvspan(0.3, 1.0, color='#e74c3c', alpha=0.1, zorder=0, label='High Risk (t > 0.3)')
+    ax.axvspan(0, 0.2, color='#27ae60', alpha=0.3, zorder=1, label='Safe Zone (t < 0.2)')
+    ax.axvspan(0.2, 0.3, color='#f1c40f', alpha=0.3, zorder=1, label='Moderate Risk (0.2-0.3)')
+    ax.axvspan(0.3, 1.0, color='#e74c3c', alpha=0.1, zorder=0, label='High Risk (t > 0.3)')
 
     # Labels
-    plt.title(f'T-Closeness Audit: Risk Distribution', fontsize=16, fontweight='bold', pad=20)
-    plt.xlabel('t-value (Divergence Level)', fontsize=12, fontweight='bold')
-    plt.ylabel('Frequency (Number of Groups)', fontsize=12, fontweight='bold')
-    plt.xlim(0, max(0.4, max_t + 0.1))
+    ax.set_title(f'T-Closeness Audit: Risk Distribution', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('t-value (Divergence Level)', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Frequency (Number of Groups)', fontsize=12, fontweight='bold')
+    ax.set_xlim(0, max(0.4, max_t + 0.1))
     
     # FULL BLACK BORDER (BOX STYLE)
     for spine in ['top', 'bottom', 'left', 'right']:
@@ -102,23 +86,22 @@ if __name__ == "__main__":
         ax.spines[spine].set_color('black')
         ax.spines[spine].set_linewidth(1.2)
 
-    plt.legend(loc='upper right', frameon=True, framealpha=0.9, shadow=True, edgecolor='black')
+    ax.legend(loc='upper right', frameon=True, framealpha=0.9, shadow=True, edgecolor='black')
     
-    plt.tight_layout()
-    plt.savefig(OUTPUT_CHART_PATH, dpi=300)
-    print(f"✅ Chart saved to: {OUTPUT_CHART_PATH}")
+    with span("chart.t"):
+        fig.tight_layout()
+        fig.savefig(out_path, dpi=300)
+    print(f"✅ Chart saved to: {out_path}")
 
-    # 4. FEASIBILITY CHECK
+def feasibility_check(t_values, sizes, total_rows):
     print("\n⚖️  FEASIBILITY CHECK (Can we tighten privacy?)")
     print(f"{'Target t':<10} | {'Violating Groups':<18} | {'Rows to Drop':<12} | {'Data Loss %':<12} | {'Verdict'}")
     print("-" * 75)
 
-    df_check = pd.DataFrame({'t': t_values, 'size': sizes})
+    n_violators, rows_to_drop = violations_per_threshold(t_values, sizes, THRESHOLDS_TO_TEST)
     recommendation = "Maintain current state."
 
-    for threshold in THRESHOLDS_TO_TEST:
-        violators = df_check[df_check['t'] > threshold]
-        rows_lost = violators['size'].sum()
+    for threshold, violators, rows_lost in zip(THRESHOLDS_TO_TEST, n_violators, rows_to_drop):
         loss_pct = (rows_lost / total_rows) * 100
         
         if loss_pct == 0: verdict = "✅ Already Met"
@@ -128,7 +111,37 @@ if __name__ == "__main__":
         elif loss_pct < 15: verdict = "🟡 Feasible"
         else: verdict = "❌ Too Costly"
 
-        print(f"t <= {threshold:<5} | {len(violators):<18} | {rows_lost:<12} | {loss_pct:6.2f}%      | {verdict}")
+        print(f"t <= {threshold:<5} | {violators:<18} | {rows_lost:<12} | {loss_pct:6.2f}%      | {verdict}")
 
     print("-" * 75)
-    print(f"💡 FINAL RECOMMENDATION: {recommendation}")
\ No newline at end of file
+    print(f"💡 FINAL RECOMMENDATION: {recommendation}")
+    return recommendation
+
+def audit_t_closeness(df, stats=None, out_path=OUTPUT_CHART_PATH, plot=True):
+    """Computes, plots (unless plot=False) and reports t-closeness. Returns the worst t-value."""
+    # 2. CALCULATE METRICS
+    print("⚙️  Calculating t-closeness for all groups...")
+    t_values, sizes, glob_d, max_t = calculate_t_values(df, SENSITIVE_ATTR, stats=stats)
+    avg_t = np.mean(t_values)
+    
+    print(f"\n📊 CURRENT STATUS ({T_METRIC}):")
+    print(f"   Max t-value: {max_t:.4f} (Worst Case)")
+    print(f"   Avg t-value: {avg_t:.4f}")
+
+    # 3. VISUALIZATION
+    if plot:
+        plot_t_values(t_values, max_t, out_path)
+
+    # 4. FEASIBILITY CHECK
+    feasibility_check(t_values, sizes, int(np.sum(sizes)))
+    return max_t
+
+if __name__ == "__main__":
+    print("\n🚀 --- T-CLOSENESS VISUALIZER & AUDITOR ---")
+
+    # 1. LOAD DATA
+    df, _ = load_dataset(INPUT_PATH, COLUMNS, QUASI_IDENTIFIERS + [SENSITIVE_ATTR])
+    if df is None:
+        sys.exit(f"❌ Error: {INPUT_PATH} not found.")
+    
+    audit_t_closeness(df)
\ No newline at end of file
@@ -0,0 +1,26 @@
+import functools
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src"))
+
+from benchmark_startup import startup, SUBCOMMANDS, STARTUP_BUDGET_S
+
+# --- CLI START-UP ---
+# Same checks as `python src/benchmark_startup.py`, one test per subcommand.
+# Each subcommand is timed once (startup runs it REPEATS times) and shared by both tests.
+@functools.lru_cache(maxsize=None)
+def _startup(command):
+    return startup(command.split())
+
+@pytest.mark.parametrize("command", list(SUBCOMMANDS))
+def test_startup_within_budget(command):
+    best, _, _ = _startup(command)
+    assert best <= STARTUP_BUDGET_S, f"datashield {command}: {best:.3f}s start-up, budget {STARTUP_BUDGET_S}s"
+
+@pytest.mark.parametrize("command", [c for c, may_plot in SUBCOMMANDS.items() if not may_plot])
+def test_no_plotting_libraries(command):
+    _, _, loaded = _startup(command)
+    assert not loaded["matplotlib"], f"datashield {command} imports matplotlib"
+    assert not loaded["seaborn"], f"datashield {command} imports seaborn"